@@ -0,0 +1 @@
+"""Synthetic datasets and performance benchmarks for the backend."""
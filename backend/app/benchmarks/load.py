@@ -0,0 +1,315 @@
+"""Concurrent load test of the HTTP API with per-endpoint latency percentiles.
+
+Usage::
+
+    python -m app.benchmarks.load --rows 1000000 --concurrency 16 --duration 30 --output load.json
+    python -m app.benchmarks.load --url http://localhost:8000 --concurrency 32 --mix events_per_day=3,raw_data=1
+
+Without ``--url`` a synthetic dataset is generated and the app returned by
+:func:`app.main.create_app` is driven in-process through an ASGI transport,
+so the report also includes the peak resident memory observed after the
+requests of each endpoint. With ``--url`` an already running server is
+loaded instead and memory is not reported. Request parameters (users,
+models, date windows) are drawn from the dataset the server exposes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import tempfile
+import time
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from app.benchmarks.suite import _format_bytes, _usage_csv_env
+from app.benchmarks.synthetic import SyntheticUsageSpec, write_usage_csv
+from app.main import create_app
+from app.observability.memory import current_rss_bytes, peak_rss_bytes
+
+
+@dataclass(frozen=True)
+class DatasetShape:
+    """Values request parameters are drawn from."""
+
+    users: list[str]
+    models: list[str]
+    days: list[str]
+
+
+ParamsFactory = Callable[[random.Random, DatasetShape], dict[str, Any]]
+
+
+def _window(rng: random.Random, shape: DatasetShape, days: int = 7) -> dict[str, Any]:
+    if not shape.days:
+        return {}
+    first = rng.randrange(max(len(shape.days) - days, 0) + 1)
+    return {"start_date": shape.days[first], "end_date": shape.days[min(first + days, len(shape.days)) - 1]}
+
+
+# A dashboard-like request mix: endpoint name -> (path, parameters).
+ENDPOINTS: dict[str, tuple[str, ParamsFactory]] = {
+    "events_per_day": ("/analytics/events_per_day", lambda rng, shape: {}),
+    "tokens_per_user": ("/analytics/tokens_per_user", lambda rng, shape: {}),
+    "tokens_by_model": ("/analytics/tokens_by_model", lambda rng, shape: {}),
+    "raw_data": (
+        "/analytics/raw_data",
+        lambda rng, shape: {**_window(rng, shape), "limit": 100, "offset": rng.choice((0, 0, 100, 200))},
+    ),
+    "raw_data[user]": (
+        "/analytics/raw_data",
+        lambda rng, shape: {"user": rng.choice(shape.users), "limit": 100} if shape.users else {"limit": 100},
+    ),
+    "raw_data_summary": ("/analytics/raw_data/summary", lambda rng, shape: _window(rng, shape, 30)),
+    "usage_series": (
+        "/analytics/usage_series",
+        lambda rng, shape: {"group_by": rng.choice(("user", "model")), "metric": "total_tokens", "max_points": 500},
+    ),
+    "anomalies": ("/analytics/anomalies", lambda rng, shape: {"group_by": rng.choice(("user", "model"))}),
+}
+DEFAULT_MIX = {
+    "events_per_day": 3,
+    "tokens_per_user": 3,
+    "tokens_by_model": 3,
+    "raw_data": 2,
+    "raw_data[user]": 1,
+    "raw_data_summary": 1,
+    "usage_series": 1,
+    "anomalies": 1,
+}
+
+
+@dataclass(frozen=True)
+class EndpointReport:
+    """Load-test measurements of a single endpoint."""
+
+    endpoint: str
+    requests: int
+    errors: int
+    error_rate: float
+    throughput_rps: float
+    p50_ms: float | None
+    p95_ms: float | None
+    p99_ms: float | None
+    max_ms: float | None
+    peak_rss_bytes: int | None
+
+
+@dataclass
+class _Samples:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    peak_rss: int | None = None
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """Parse ``name=weight,name=weight`` into a request mix."""
+
+    mix: dict[str, float] = {}
+    for entry in value.split(","):
+        name, _, weight = entry.strip().partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r}; expected one of {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight) if weight else 1.0
+        if mix[name] < 0:
+            raise ValueError(f"Weight of {name!r} must not be negative")
+    if not any(mix.values()):
+        raise ValueError("At least one endpoint needs a positive weight")
+    return mix
+
+
+async def discover_shape(client: httpx.AsyncClient) -> DatasetShape:
+    """Read the users, models and days the server has data for."""
+
+    responses = await asyncio.gather(
+        client.get("/analytics/tokens_per_user"),
+        client.get("/analytics/tokens_by_model"),
+        client.get("/analytics/events_per_day"),
+    )
+    for response in responses:
+        response.raise_for_status()
+    users, models, days = (response.json() for response in responses)
+    return DatasetShape(
+        users=[row["user"] for row in users],
+        models=[row["model"] for row in models],
+        days=sorted(str(row["date"])[:10] for row in days),
+    )
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    mix: Mapping[str, float],
+    concurrency: int,
+    duration: float,
+    seed: int = 0,
+    track_memory: bool = True,
+) -> tuple[list[EndpointReport], float]:
+    """Keep ``concurrency`` requests in flight for ``duration`` seconds.
+
+    Each virtual client draws the next endpoint from ``mix`` (relative
+    weights) and waits for the response before sending another request.
+    Returns the per-endpoint reports and the measured wall-clock seconds.
+    """
+
+    if concurrency <= 0 or duration <= 0:
+        raise ValueError("concurrency and duration must be positive")
+    shape = await discover_shape(client)
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+    samples = {name: _Samples() for name in names}
+    started = time.perf_counter()
+    deadline = started + duration
+
+    async def virtual_client(index: int) -> None:
+        rng = random.Random(seed * 1_000_003 + index)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            path, params = ENDPOINTS[name]
+            sample = samples[name]
+            sent = time.perf_counter()
+            try:
+                response = await client.get(path, params=params(rng, shape))
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            sample.latencies.append(time.perf_counter() - sent)
+            sample.errors += failed
+            if track_memory:
+                rss = current_rss_bytes()
+                if rss is not None and (sample.peak_rss is None or rss > sample.peak_rss):
+                    sample.peak_rss = rss
+
+    await asyncio.gather(*(virtual_client(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return [_report(name, samples[name], elapsed) for name in names], elapsed
+
+
+def _report(endpoint: str, sample: _Samples, elapsed: float) -> EndpointReport:
+    requests = len(sample.latencies)
+    if requests:
+        p50, p95, p99, peak = (np.percentile(sample.latencies, [50, 95, 99, 100]) * 1000).tolist()
+    else:
+        p50 = p95 = p99 = peak = None
+    return EndpointReport(
+        endpoint=endpoint,
+        requests=requests,
+        errors=sample.errors,
+        error_rate=sample.errors / requests if requests else 0.0,
+        throughput_rps=requests / elapsed if elapsed else 0.0,
+        p50_ms=p50,
+        p95_ms=p95,
+        p99_ms=p99,
+        max_ms=peak,
+        peak_rss_bytes=sample.peak_rss,
+    )
+
+
+def report_to_document(
+    reports: Sequence[EndpointReport],
+    elapsed: float,
+    config: Mapping[str, Any],
+    peak_rss: int | None = None,
+) -> dict[str, Any]:
+    """Serialise a load-test run together with its configuration and environment."""
+
+    requests = sum(report.requests for report in reports)
+    errors = sum(report.errors for report in reports)
+    return {
+        "environment": {"python": platform.python_version(), "pandas": pd.__version__, "machine": platform.machine()},
+        "config": dict(config),
+        "total": {
+            "requests": requests,
+            "errors": errors,
+            "error_rate": errors / requests if requests else 0.0,
+            "throughput_rps": requests / elapsed if elapsed else 0.0,
+            "seconds": elapsed,
+            "peak_rss_bytes": peak_rss,
+        },
+        "endpoints": {report.endpoint: asdict(report) for report in reports},
+    }
+
+
+async def _load_in_process(args: argparse.Namespace, mix: Mapping[str, float]) -> tuple[list[EndpointReport], float]:
+    with tempfile.TemporaryDirectory(prefix="usage-load-") as tmp_dir:
+        csv_path = write_usage_csv(
+            Path(args.work_dir or tmp_dir) / f"usage_{args.rows}.csv",
+            SyntheticUsageSpec(rows=args.rows, users=args.users, days=args.days, seed=args.seed),
+        )
+        with _usage_csv_env(csv_path, result_cache=not args.no_result_cache):
+            transport = httpx.ASGITransport(app=create_app())
+            async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=args.timeout) as client:
+                return await run_load(client, mix, args.concurrency, args.duration, args.seed)
+
+
+async def _load_remote(args: argparse.Namespace, mix: Mapping[str, float]) -> tuple[list[EndpointReport], float]:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        return await run_load(client, mix, args.concurrency, args.duration, args.seed, track_memory=False)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Run the load test, print a summary and return the process exit code."""
+
+    parser = argparse.ArgumentParser(description="Load-test the usage analytics API.")
+    parser.add_argument("--url", help="Base URL of a running server (default: drive create_app() in-process)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests kept in flight")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to keep sending requests")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="Weighted endpoints, e.g. raw_data=2,anomalies=1")
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows of the generated dataset (in-process only)")
+    parser.add_argument("--users", type=int, default=SyntheticUsageSpec.users, help="Users of the generated dataset")
+    parser.add_argument("--days", type=int, default=SyntheticUsageSpec.days, help="Days of the generated dataset")
+    parser.add_argument("--seed", type=int, default=SyntheticUsageSpec.seed, help="Seed for the dataset and request draws")
+    parser.add_argument("--no-result-cache", action="store_true", help="Disable the result cache (in-process only)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--max-error-rate", type=float, help="Exit with status 1 when the error rate exceeds this")
+    parser.add_argument("--output", type=Path, help="Write the JSON report to this path")
+    parser.add_argument("--work-dir", type=Path, help="Directory for the generated CSV (default: a temporary one)")
+    args = parser.parse_args(argv)
+
+    if args.concurrency <= 0 or args.duration <= 0:
+        parser.error("--concurrency and --duration must be positive")
+
+    if args.url is None:
+        reports, elapsed = asyncio.run(_load_in_process(args, args.mix))
+    else:
+        reports, elapsed = asyncio.run(_load_remote(args, args.mix))
+
+    config = {
+        "target": args.url or "in-process",
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "mix": dict(args.mix),
+        "rows": None if args.url else args.rows,
+        "seed": args.seed,
+    }
+    document = report_to_document(reports, elapsed, config, None if args.url else peak_rss_bytes())
+    for report in reports:
+        rss = _format_bytes(report.peak_rss_bytes) if report.peak_rss_bytes is not None else "-"
+        percentiles = (
+            f"{report.p50_ms:>9.1f} {report.p95_ms:>9.1f} {report.p99_ms:>9.1f} ms" if report.requests else "-"
+        )
+        print(
+            f"{report.endpoint:<20} {report.requests:>7} req {report.throughput_rps:>8.1f} rps "
+            f"{percentiles} {report.error_rate:>7.2%} err {rss:>12}"
+        )
+    total = document["total"]
+    print(f"{'total':<20} {total['requests']:>7} req {total['throughput_rps']:>8.1f} rps {total['error_rate']:.2%} err")
+    if args.output is not None:
+        args.output.write_text(json.dumps(document, indent=2), encoding="utf-8")
+
+    if args.max_error_rate is not None and total["error_rate"] > args.max_error_rate:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover - manual invocation
+    raise SystemExit(main())
@@ -0,0 +1,274 @@
+"""Benchmark suite timing the repository, service methods and HTTP routes.
+
+Usage::
+
+    python -m app.benchmarks.suite --sizes 10000 1000000 --baseline benchmarks/baseline.json
+    python -m app.benchmarks.suite --sizes 10000 --baseline benchmarks/baseline.json --update-baseline
+
+Each case is timed ``--repeat`` times (the fastest run is kept) and then run
+once more under :mod:`tracemalloc` to record its peak allocation. Results are
+compared with the stored baseline and the command exits with status 1 when a
+case got slower or hungrier than ``--threshold`` allows.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from app.benchmarks.synthetic import SyntheticUsageSpec, write_usage_csv
+from app.main import create_app
+from app.repositories import CSVUsageRepository
+from app.services import UsageAnalyticsService
+
+
+DEFAULT_SIZES = (10_000, 1_000_000, 10_000_000)
+DEFAULT_THRESHOLD = 0.2
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    """Measurement of a single benchmark case at a single dataset size."""
+
+    case: str
+    rows: int
+    seconds: float
+    peak_bytes: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.rows}/{self.case}"
+
+
+@dataclass(frozen=True)
+class Regression:
+    """A metric that exceeded its baseline by more than the allowed threshold."""
+
+    key: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline else float("inf")
+
+
+class _PreloadedRepository(CSVUsageRepository):
+    """Repository that hands out an already parsed frame so service cases exclude CSV parsing."""
+
+    def __init__(self, dataframe: pd.DataFrame) -> None:
+        self._dataframe = dataframe
+
+    def get_dataframe(self, columns: Sequence[str] | None = None) -> pd.DataFrame:
+        return self._dataframe if columns is None else self._dataframe[list(columns)]
+
+
+def _measure(case: str, rows: int, func: Callable[[], Any], repeat: int, track_memory: bool) -> BenchmarkResult:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+
+    peak = 0
+    if track_memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return BenchmarkResult(case=case, rows=rows, seconds=best, peak_bytes=peak)
+
+
+@contextmanager
+def _usage_csv_env(csv_path: Path, result_cache: bool = False) -> Iterator[None]:
+    # The result cache is switched off by default so that route cases keep
+    # measuring the aggregation work rather than dictionary lookups.
+    overrides = {"USAGE_CSV_PATH": str(csv_path)}
+    if not result_cache:
+        overrides["USAGE_RESULT_CACHE_SIZE"] = "0"
+    previous = {name: os.environ.get(name) for name in overrides}
+    os.environ.update(overrides)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def _service_cases(dataframe: pd.DataFrame, sample_user: str) -> dict[str, Callable[[], Any]]:
+    def run(method: str, **kwargs: Any) -> Callable[[], Any]:
+        return lambda: getattr(UsageAnalyticsService(_PreloadedRepository(dataframe)), method)(**kwargs)
+
+    return {
+        "service.events_per_day": run("events_per_day"),
+        "service.tokens_per_user": run("tokens_per_user"),
+        "service.tokens_by_model": run("tokens_by_model"),
+        "service.get_raw_data": run("get_raw_data"),
+        "service.get_raw_data[user]": run("get_raw_data", user=sample_user),
+    }
+
+
+def _route_cases(client: TestClient, sample_user: str) -> dict[str, Callable[[], Any]]:
+    def get(path: str, **params: Any) -> Callable[[], Any]:
+        def call() -> None:
+            response = client.get(path, params=params)
+            response.raise_for_status()
+
+        return call
+
+    return {
+        "route./analytics/events_per_day": get("/analytics/events_per_day"),
+        "route./analytics/tokens_per_user": get("/analytics/tokens_per_user"),
+        "route./analytics/tokens_by_model": get("/analytics/tokens_by_model"),
+        "route./analytics/raw_data": get("/analytics/raw_data"),
+        "route./analytics/raw_data[user]": get("/analytics/raw_data", user=sample_user),
+    }
+
+
+def run_suite(
+    sizes: Sequence[int],
+    work_dir: Path,
+    repeat: int = 3,
+    track_memory: bool = True,
+    seed: int = SyntheticUsageSpec.seed,
+) -> list[BenchmarkResult]:
+    """Generate a dataset per size and measure every case against it."""
+
+    results: list[BenchmarkResult] = []
+    for rows in sizes:
+        csv_path = write_usage_csv(work_dir / f"usage_{rows}.csv", SyntheticUsageSpec(rows=rows, seed=seed))
+        repository = CSVUsageRepository(csv_path)
+        results.append(_measure("repository.get_events", rows, repository.get_events, repeat, track_memory))
+        results.append(_measure("repository.get_dataframe", rows, repository.get_dataframe, repeat, track_memory))
+        untyped = CSVUsageRepository(csv_path, typed=False)
+        results.append(_measure("repository.get_dataframe[untyped]", rows, untyped.get_dataframe, repeat, track_memory))
+
+        dataframe = repository.get_dataframe()
+        sample_user = str(dataframe["user"].iloc[0])
+        for case, func in _service_cases(dataframe, sample_user).items():
+            results.append(_measure(case, rows, func, repeat, track_memory))
+        del dataframe
+
+        with _usage_csv_env(csv_path), TestClient(create_app()) as client:
+            for case, func in _route_cases(client, sample_user).items():
+                results.append(_measure(case, rows, func, repeat, track_memory))
+
+    return results
+
+
+def compare_to_baseline(
+    results: Sequence[BenchmarkResult],
+    baseline: dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> list[Regression]:
+    """Return the metrics that exceed the baseline by more than ``threshold`` (0.2 = 20%)."""
+
+    regressions: list[Regression] = []
+    stored = baseline.get("results", {})
+    for result in results:
+        reference = stored.get(result.key)
+        if reference is None:
+            continue
+        for metric in ("seconds", "peak_bytes"):
+            current = getattr(result, metric)
+            previous = reference.get(metric)
+            if previous and current > previous * (1 + threshold):
+                regressions.append(Regression(key=result.key, metric=metric, baseline=previous, current=current))
+    return regressions
+
+
+def results_to_document(results: Sequence[BenchmarkResult]) -> dict[str, Any]:
+    """Serialise results together with the environment they were measured in."""
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+        },
+        "results": {result.key: asdict(result) for result in results},
+    }
+
+
+def _format_bytes(value: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(value) < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TiB"
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Run the benchmark suite and return the process exit code."""
+
+    parser = argparse.ArgumentParser(description="Benchmark the usage analytics backend.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Dataset sizes in rows")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case; the fastest is kept")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak-memory run")
+    parser.add_argument("--baseline", type=Path, help="Baseline JSON file to compare against or update")
+    parser.add_argument("--update-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed relative slowdown")
+    parser.add_argument("--output", type=Path, help="Also write the results JSON to this path")
+    parser.add_argument("--work-dir", type=Path, help="Directory for generated CSVs (default: a temporary one)")
+    args = parser.parse_args(argv)
+
+    if args.repeat <= 0:
+        parser.error("--repeat must be positive")
+    if args.update_baseline and args.baseline is None:
+        parser.error("--update-baseline requires --baseline")
+
+    with tempfile.TemporaryDirectory(prefix="usage-bench-") as tmp_dir:
+        work_dir = args.work_dir or Path(tmp_dir)
+        results = run_suite(args.sizes, work_dir, repeat=args.repeat, track_memory=not args.no_memory)
+
+    for result in results:
+        print(f"{result.key:<48} {result.seconds * 1000:>12.2f} ms {_format_bytes(result.peak_bytes):>12}")
+
+    document = results_to_document(results)
+    if args.output is not None:
+        args.output.write_text(json.dumps(document, indent=2), encoding="utf-8")
+
+    if args.baseline is None:
+        return 0
+    if args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(document, indent=2), encoding="utf-8")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        parser.error(f"Baseline {args.baseline} does not exist; run with --update-baseline first")
+
+    regressions = compare_to_baseline(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.threshold)
+    for regression in regressions:
+        print(
+            f"REGRESSION {regression.key} {regression.metric}: "
+            f"{regression.baseline:.4g} -> {regression.current:.4g} ({regression.ratio:.2f}x)"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":  # pragma: no cover - manual invocation
+    raise SystemExit(main())
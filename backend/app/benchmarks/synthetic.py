@@ -0,0 +1,179 @@
+"""Seeded generator of realistic Cursor usage CSV exports.
+
+Usage::
+
+    python -m app.benchmarks.synthetic usage_1m.csv --rows 1000000 --users 200 --days 90
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+_DEFAULT_MODELS = (
+    "auto",
+    "claude-4-sonnet",
+    "claude-4-sonnet-thinking",
+    "gpt-5",
+    "gpt-4.1",
+    "gemini-2.5-pro",
+    "claude-4.1-opus",
+    "o3",
+)
+_KINDS = ("Included", "Usage-based", "Errored, Not Charged")
+_KIND_WEIGHTS = (0.85, 0.12, 0.03)
+_CHUNK_ROWS = 500_000
+
+
+@dataclass(frozen=True)
+class SyntheticUsageSpec:
+    """Shape of a generated usage export."""
+
+    rows: int = 10_000
+    users: int = 50
+    models: int = len(_DEFAULT_MODELS)
+    start: date = date(2025, 1, 1)
+    days: int = 90
+    skew: float = 1.1
+    seed: int = 42
+
+
+def _zipf_weights(count: int, skew: float) -> np.ndarray:
+    """Return normalised ``1 / rank**skew`` weights; ``skew=0`` gives a uniform distribution."""
+
+    weights = 1.0 / np.arange(1, count + 1, dtype=np.float64) ** skew
+    return weights / weights.sum()
+
+
+def _model_names(count: int) -> list[str]:
+    names = list(_DEFAULT_MODELS[:count])
+    names.extend(f"model-{index}" for index in range(len(names), count))
+    return names
+
+
+def iter_usage_chunks(spec: SyntheticUsageSpec, chunk_rows: int = _CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Yield the export in chunks with the exact column layout of a Cursor CSV.
+
+    Users and models follow Zipf-like popularity controlled by ``spec.skew``,
+    activity is concentrated in working hours on weekdays and token counts
+    are log-normal, so group sizes look like real exports rather than being
+    uniform. The same spec always yields the same rows.
+    """
+
+    rng = np.random.default_rng(spec.seed)
+    users = np.array([f"user{index:05d}@example.com" for index in range(spec.users)], dtype=object)
+    models = np.array(_model_names(spec.models), dtype=object)
+    user_weights = _zipf_weights(spec.users, spec.skew)
+    model_weights = _zipf_weights(spec.models, spec.skew)
+
+    day_offsets = np.arange(spec.days)
+    weekdays = (pd.Timestamp(spec.start).dayofweek + day_offsets) % 7
+    day_weights = np.where(weekdays < 5, 1.0, 0.2)
+    day_weights /= day_weights.sum()
+    hour_weights = np.exp(-0.5 * ((np.arange(24) - 13) / 3.5) ** 2) + 0.05
+    hour_weights /= hour_weights.sum()
+    start_ms = pd.Timestamp(spec.start, tz="UTC").value // 1_000_000
+
+    remaining = spec.rows
+    while remaining > 0:
+        size = min(chunk_rows, remaining)
+        remaining -= size
+
+        timestamps_ms = (
+            start_ms
+            + rng.choice(day_offsets, size=size, p=day_weights) * 86_400_000
+            + rng.choice(24, size=size, p=hour_weights) * 3_600_000
+            + rng.integers(0, 3_600_000, size=size)
+        )
+        kinds = rng.choice(len(_KINDS), size=size, p=_KIND_WEIGHTS)
+        input_with_cache = rng.lognormal(9.5, 1.2, size=size).astype(np.int64)
+        input_without_cache = np.where(rng.random(size) < 0.3, rng.lognormal(7.0, 1.5, size=size), 0).astype(np.int64)
+        cache_read = rng.lognormal(11.5, 1.3, size=size).astype(np.int64)
+        output_tokens = rng.lognormal(7.3, 0.8, size=size).astype(np.int64)
+        requests = np.where(kinds == _KINDS.index("Errored, Not Charged"), np.nan, 1.0)
+
+        chunk = pd.DataFrame(
+            {
+                "Date": np.char.add(
+                    np.datetime_as_string(timestamps_ms.astype("datetime64[ms]"), unit="ms"), "Z"
+                ),
+                "User": users[rng.choice(spec.users, size=size, p=user_weights)],
+                "Kind": np.array(_KINDS, dtype=object)[kinds],
+                "Model": models[rng.choice(spec.models, size=size, p=model_weights)],
+                "Max Mode": np.where(rng.random(size) < 0.1, "Yes", "No"),
+                "Input (w/ Cache Write)": input_with_cache,
+                "Input (w/o Cache Write)": input_without_cache,
+                "Cache Read": cache_read,
+                "Output Tokens": output_tokens,
+                "Total Tokens": input_with_cache + input_without_cache + cache_read + output_tokens,
+                "Requests": requests,
+            }
+        )
+        # Cursor exports list the newest events first; mimic that within each chunk.
+        yield chunk.sort_values("Date", ascending=False, ignore_index=True)
+
+
+def generate_usage_dataframe(spec: SyntheticUsageSpec) -> pd.DataFrame:
+    """Return the whole generated export as a single dataframe."""
+
+    return pd.concat(list(iter_usage_chunks(spec)), ignore_index=True)
+
+
+def write_usage_csv(csv_path: str | Path, spec: SyntheticUsageSpec) -> Path:
+    """Write the generated export to ``csv_path`` chunk by chunk and return the path.
+
+    A ``.gz`` suffix writes a gzip-compressed export.
+    """
+
+    csv_path = Path(csv_path)
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+    opener = gzip.open if csv_path.suffix == ".gz" else open
+    with opener(csv_path, "wt", encoding="utf-8", newline="") as handle:
+        for index, chunk in enumerate(iter_usage_chunks(spec)):
+            chunk.to_csv(handle, index=False, header=index == 0, float_format="%.0f")
+    return csv_path
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Generate a synthetic usage CSV and return the process exit code."""
+
+    defaults = SyntheticUsageSpec()
+    parser = argparse.ArgumentParser(description="Generate a synthetic Cursor usage CSV export.")
+    parser.add_argument("output", type=Path, help="Destination CSV path")
+    parser.add_argument("--rows", type=int, default=defaults.rows)
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--models", type=int, default=defaults.models)
+    parser.add_argument("--start", type=date.fromisoformat, default=defaults.start, help="First day, YYYY-MM-DD")
+    parser.add_argument("--days", type=int, default=defaults.days, help="Number of days covered")
+    parser.add_argument("--skew", type=float, default=defaults.skew, help="Zipf exponent for users and models")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args(argv)
+
+    for name in ("rows", "users", "models", "days"):
+        if getattr(args, name) <= 0:
+            parser.error(f"--{name} must be positive")
+
+    spec = SyntheticUsageSpec(
+        rows=args.rows,
+        users=args.users,
+        models=args.models,
+        start=args.start,
+        days=args.days,
+        skew=args.skew,
+        seed=args.seed,
+    )
+    write_usage_csv(args.output, spec)
+    print(f"Wrote {spec.rows} rows to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover - manual invocation
+    raise SystemExit(main())
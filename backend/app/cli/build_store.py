@@ -0,0 +1,68 @@
+"""Build the memory-mapped columnar store ahead of starting API workers.
+
+Usage::
+
+    python -m app.cli.build_store --store-dir /var/lib/usage-store
+
+Workers started with the same ``USAGE_STORE_DIR`` then map the prepared
+columns instead of each parsing the CSV on its first request. With
+``--watch SECONDS`` the command stays running as the single loader for a
+multi-worker deployment: it ingests every new version of the CSV and
+publishes it, and workers started with ``USAGE_STORE_ATTACH_ONLY=1`` re-map
+the published version without ever parsing the CSV themselves.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from collections.abc import Sequence
+from pathlib import Path
+
+from app.repositories import ChunkedCSVUsageRepository
+from app.repositories.shared_store import publish_version, read_version_header
+from app.settings import resolve_chunk_rows, resolve_csv_path, resolve_store_dir
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Ingest the configured CSV into the columnar store and return the process exit code."""
+
+    parser = argparse.ArgumentParser(description="Build the columnar usage store from a CSV export.")
+    parser.add_argument("--csv", type=Path, default=resolve_csv_path(), help="Usage CSV (default: USAGE_CSV_PATH)")
+    parser.add_argument("--store-dir", type=Path, default=resolve_store_dir(), help="Store root (default: USAGE_STORE_DIR)")
+    parser.add_argument("--chunk-rows", type=int, default=resolve_chunk_rows(), help="Rows parsed per chunk")
+    parser.add_argument("--watch", type=float, metavar="SECONDS", help="Keep publishing new CSV versions, polling every SECONDS")
+    args = parser.parse_args(argv)
+
+    if args.store_dir is None:
+        parser.error("--store-dir is required when USAGE_STORE_DIR is not set")
+    if args.chunk_rows <= 0:
+        parser.error("--chunk-rows must be positive")
+    if args.watch is not None and args.watch <= 0:
+        parser.error("--watch must be positive")
+
+    publish(args.csv, args.store_dir, args.chunk_rows)
+    while args.watch is not None:
+        time.sleep(args.watch)
+        publish(args.csv, args.store_dir, args.chunk_rows)
+    return 0
+
+
+def publish(csv_path: Path, store_dir: Path, chunk_rows: int) -> str:
+    """Ingest the current version of ``csv_path`` if needed and point the version header at it."""
+
+    repository = ChunkedCSVUsageRepository(csv_path, store_dir, chunk_rows)
+    version = repository.dataset_version()
+    header = read_version_header(store_dir, csv_path)
+    if header is not None and header["dataset_version"] == version:
+        return version
+    table = repository.get_columnar_table()
+    # The CSV may have changed since it was fingerprinted; publish what was actually stored.
+    version = table.metadata["dataset_version"]
+    publish_version(store_dir, csv_path, version, table.rows)
+    print(f"{csv_path}: {table.rows} rows in {store_dir / version}", flush=True)
+    return version
+
+
+if __name__ == "__main__":  # pragma: no cover - manual invocation
+    raise SystemExit(main())
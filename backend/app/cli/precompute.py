@@ -0,0 +1,87 @@
+"""Precompute report snapshots so the API can serve them without live queries.
+
+Usage::
+
+    python -m app.cli.precompute --output-dir snapshots --window 7 --window 30
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections.abc import Sequence
+from pathlib import Path
+
+from app.repositories import CSVUsageRepository
+from app.services import UsageAnalyticsService
+from app.services.report_snapshots import (
+    SNAPSHOT_FORMATS,
+    ReportSnapshotStore,
+    build_report_snapshots,
+)
+from app.settings import resolve_csv_path, resolve_snapshot_dir
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Precompute usage analytics report snapshots.")
+    parser.add_argument(
+        "--csv",
+        dest="csv_paths",
+        action="append",
+        type=Path,
+        help="Usage CSV to snapshot; may be repeated (default: USAGE_CSV_PATH or the bundled CSV)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=resolve_snapshot_dir(),
+        help="Snapshot root directory (default: USAGE_SNAPSHOT_DIR)",
+    )
+    parser.add_argument(
+        "--window",
+        dest="windows",
+        action="append",
+        type=int,
+        default=[],
+        help="Trailing window in days to precompute in addition to all-time reports; may be repeated",
+    )
+    parser.add_argument(
+        "--format",
+        dest="formats",
+        action="append",
+        choices=SNAPSHOT_FORMATS,
+        help="Output format; may be repeated (default: json)",
+    )
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Run the precompute command and return the process exit code."""
+
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+
+    if args.output_dir is None:
+        parser.error("--output-dir is required when USAGE_SNAPSHOT_DIR is not set")
+    if any(days <= 0 for days in args.windows):
+        parser.error("--window values must be positive")
+
+    formats = args.formats or ["json"]
+    if "parquet" in formats:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("--format parquet requires pyarrow to be installed")
+
+    store = ReportSnapshotStore(args.output_dir)
+    for csv_path in args.csv_paths or [resolve_csv_path()]:
+        repository = CSVUsageRepository(csv_path)
+        dataset_version = repository.dataset_version()
+        reports = build_report_snapshots(UsageAnalyticsService(repository), args.windows)
+        store.write(dataset_version, str(csv_path), reports, formats)
+        print(f"{csv_path}: wrote snapshot {dataset_version} to {store.snapshot_dir(dataset_version)}")
+
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover - manual invocation
+    raise SystemExit(main())
@@ -0,0 +1,6 @@
+"""HTTP response compression: codec negotiation, middleware and encoded payload caching."""
+
+from .codecs import CODECS, IDENTITY, EncodedPayloadCache, compress, negotiate_encoding
+from .middleware import CompressionMiddleware
+
+__all__ = ["CODECS", "IDENTITY", "CompressionMiddleware", "EncodedPayloadCache", "compress", "negotiate_encoding"]
@@ -0,0 +1,183 @@
+"""Content-encoding negotiation and body compression with optional codecs."""
+
+from __future__ import annotations
+
+import gzip
+import threading
+import time
+import weakref
+from collections.abc import Callable
+
+from app.observability import phase
+from app.observability.metrics import (
+    CACHE_REQUESTS,
+    COMPRESSION_BYTES,
+    COMPRESSION_CPU_SECONDS,
+    COMPRESSION_RATIO,
+)
+
+try:  # pragma: no cover - optional dependency
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:  # pragma: no cover - optional dependency
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+IDENTITY = "identity"
+
+_GZIP_LEVEL = 6
+_BROTLI_QUALITY = 5
+_ZSTD_LEVEL = 3
+
+
+def _gzip(payload: bytes) -> bytes:
+    # mtime=0 keeps the output deterministic, so identical payloads produce
+    # identical bytes (and ETags, should they be added).
+    return gzip.compress(payload, compresslevel=_GZIP_LEVEL, mtime=0)
+
+
+def _available_codecs() -> dict[str, Callable[[bytes], bytes]]:
+    codecs: dict[str, Callable[[bytes], bytes]] = {}
+    # Server preference when the client rates encodings equally: best ratio first.
+    if zstandard is not None:
+        codecs["zstd"] = lambda payload: zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(payload)
+    if brotli is not None:
+        codecs["br"] = lambda payload: brotli.compress(payload, quality=_BROTLI_QUALITY)
+    codecs["gzip"] = _gzip
+    return codecs
+
+
+CODECS = _available_codecs()
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str:
+    """Pick the best supported encoding for an ``Accept-Encoding`` header value.
+
+    Returns :data:`IDENTITY` when the client accepts none of the available
+    codecs. Quality values are honoured, ``q=0`` excludes a coding and ``*``
+    applies to every coding the client did not list explicitly.
+    """
+
+    if not accept_encoding:
+        return IDENTITY
+
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+
+    wildcard = qualities.get("*")
+    best, best_quality = IDENTITY, 0.0
+    for coding in CODECS:
+        quality = qualities.get(coding, wildcard if wildcard is not None else 0.0)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(payload: bytes, encoding: str) -> bytes:
+    """Compress ``payload`` with ``encoding`` and record ratio and CPU time."""
+
+    if encoding == IDENTITY:
+        return payload
+    started = time.thread_time()
+    with phase("compress"):
+        encoded = CODECS[encoding](payload)
+    COMPRESSION_CPU_SECONDS.inc(time.thread_time() - started, encoding=encoding)
+    COMPRESSION_BYTES.inc(len(payload), encoding=encoding, stage="raw")
+    COMPRESSION_BYTES.inc(len(encoded), encoding=encoding, stage="encoded")
+    if payload:
+        COMPRESSION_RATIO.observe(len(encoded) / len(payload), encoding=encoding)
+    return encoded
+
+
+class EncodedPayloadCache:
+    """Serialised and compressed bodies attached to live result objects.
+
+    Entries are keyed on the identity of the result (typically a dataframe
+    held by the query result cache) and disappear when that object is garbage
+    collected, so a cached result carries its encoded bytes for exactly as
+    long as it stays cached.
+    """
+
+    def __init__(self) -> None:
+        self._payloads: dict[int, dict[str, bytes]] = {}
+        # Re-entrant: a finaliser may run from garbage collection while the
+        # same thread already holds the lock.
+        self._lock = threading.RLock()
+
+    def get_or_encode(
+        self,
+        owner: object,
+        encoding: str,
+        serialize: Callable[[], bytes],
+        min_bytes: int = 0,
+    ) -> tuple[bytes, str]:
+        """Return the body of ``owner`` and its applied encoding, encoding at most once per codec.
+
+        Bodies shorter than ``min_bytes`` are returned uncompressed.
+        """
+
+        key = id(owner)
+        with self._lock:
+            payloads = dict(self._payloads.get(key, {}))
+        if encoding in payloads:
+            CACHE_REQUESTS.inc(cache="encoded_payload", result="hit")
+            return payloads[encoding], encoding
+        if IDENTITY in payloads and len(payloads[IDENTITY]) < min_bytes:
+            CACHE_REQUESTS.inc(cache="encoded_payload", result="hit")
+            return payloads[IDENTITY], IDENTITY
+        CACHE_REQUESTS.inc(cache="encoded_payload", result="miss")
+
+        raw = payloads.get(IDENTITY)
+        if raw is None:
+            raw = serialize()
+        if len(raw) < min_bytes:
+            encoding = IDENTITY
+        encoded = compress(raw, encoding)
+
+        with self._lock:
+            stored = self._payloads.get(key)
+            if stored is None:
+                try:
+                    weakref.finalize(owner, self._discard, key)
+                except TypeError:
+                    # Owners that cannot be weakly referenced are never cached.
+                    return encoded, encoding
+                stored = self._payloads[key] = {}
+            stored[IDENTITY] = raw
+            stored[encoding] = encoded
+        return encoded, encoding
+
+    def memory_usage(self) -> dict[str, object]:
+        """Return the number of results with encoded bodies and the bytes held, in total and per encoding."""
+
+        with self._lock:
+            payloads = [dict(stored) for stored in self._payloads.values()]
+        encodings: dict[str, int] = {}
+        for stored in payloads:
+            for encoding, body in stored.items():
+                encodings[encoding] = encodings.get(encoding, 0) + len(body)
+        return {"entries": len(payloads), "bytes": sum(encodings.values()), "encodings": encodings}
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    def _discard(self, key: int) -> None:
+        with self._lock:
+            self._payloads.pop(key, None)
@@ -0,0 +1,79 @@
+"""ASGI middleware that compresses response bodies negotiated via ``Accept-Encoding``."""
+
+from __future__ import annotations
+
+from app.compression.codecs import IDENTITY, compress, negotiate_encoding
+from app.observability.middleware import ASGIApp, Message, Receive, Scope, Send
+
+
+_SKIPPED_CONTENT_TYPES = (b"text/event-stream",)
+
+
+class CompressionMiddleware:
+    """Compress complete response bodies with the best codec the client accepts.
+
+    Responses that already carry a ``Content-Encoding`` (such as payloads the
+    router served precompressed), streamed responses and bodies shorter than
+    ``min_bytes`` are forwarded unchanged.
+    """
+
+    def __init__(self, app: ASGIApp, min_bytes: int = 1024) -> None:
+        self.app = app
+        self.min_bytes = min_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = next(
+            (value.decode("latin-1") for name, value in scope.get("headers", []) if name == b"accept-encoding"),
+            None,
+        )
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding == IDENTITY:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                passthrough = any(
+                    name == b"content-encoding"
+                    or (name == b"content-type" and value.startswith(_SKIPPED_CONTENT_TYPES))
+                    for name, value in headers
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            assert start_message is not None
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.min_bytes:
+                # Streamed or tiny bodies are not worth buffering or encoding.
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            encoded = compress(body, encoding)
+            headers = [(name, value) for name, value in start_message.get("headers", []) if name != b"content-length"]
+            headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(encoded)).encode("latin-1")),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            start_message["headers"] = headers
+            await send(start_message)
+            await send({**message, "body": encoded})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,3 +1,5 @@
+from .batch_query import BatchQueryDTO, BatchRequestDTO
+from .export_request import ExportRequestDTO
 from .usage_event import UsageEventDTO
 
-__all__ = ["UsageEventDTO"]
+__all__ = ["BatchQueryDTO", "BatchRequestDTO", "ExportRequestDTO", "UsageEventDTO"]
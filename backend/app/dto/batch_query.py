@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+MAX_BATCH_QUERIES = 1_000
+
+
+class BatchQueryDTO(BaseModel):
+    """One query of a batch request."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    id: str = Field(min_length=1)
+    query: Literal["raw_data", "raw_data_summary", "events_per_day", "tokens_per_user", "tokens_by_model"]
+    start_date: str | None = None
+    end_date: str | None = None
+    user: str | None = None
+    model: str | None = None
+    fields: list[str] | None = None
+    limit: int | None = Field(None, ge=1)
+
+
+class BatchRequestDTO(BaseModel):
+    """Queries evaluated together by ``POST /analytics/batch``."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    queries: list[BatchQueryDTO] = Field(min_length=1, max_length=MAX_BATCH_QUERIES)
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict
+
+
+class ExportRequestDTO(BaseModel):
+    """Raw-data filters and file format of a background export."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    format: Literal["csv", "parquet"] = "csv"
+    start_date: str | None = None
+    end_date: str | None = None
+    user: str | None = None
+    model: str | None = None
+    fields: list[str] | None = None
@@ -2,10 +2,19 @@
 
 from __future__ import annotations
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.routers.analytics import analytics_router
+from app.compression import CompressionMiddleware
+from app.observability import (
+    PROMETHEUS_CONTENT_TYPE,
+    REGISTRY,
+    AllocationProfilingMiddleware,
+    ServerTimingMiddleware,
+    set_enabled,
+)
+from app.routers import admin_router, analytics_router
+from app.settings import resolve_allocation_profiling_enabled, resolve_compression_min_bytes, resolve_metrics_enabled
 
 
 def _register_system_routes(app: FastAPI) -> None:
@@ -17,12 +26,34 @@ def _register_system_routes(app: FastAPI) -> None:
 
         return {"status": "ok"}
 
+    @app.get("/metrics", tags=["system"], include_in_schema=False)
+    def metrics() -> Response:  # pragma: no cover - wrapper adds closure
+        """Expose recorded metrics in the Prometheus text format."""
 
-def create_app() -> FastAPI:
-    """Create and configure a :class:`FastAPI` application instance."""
+        return Response(content=REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def create_app(metrics_enabled: bool | None = None, allocation_profiling: bool | None = None) -> FastAPI:
+    """Create and configure a :class:`FastAPI` application instance.
+
+    ``metrics_enabled`` defaults to the ``USAGE_METRICS_ENABLED`` environment
+    variable. Recording is process-wide, so the last created app decides it.
+    ``allocation_profiling`` (default ``USAGE_ALLOCATION_PROFILING``) lets
+    requests ask for a tracemalloc profile; without it the middleware is not
+    installed at all.
+    """
+
+    if metrics_enabled is None:
+        metrics_enabled = resolve_metrics_enabled()
+    set_enabled(metrics_enabled)
+    if allocation_profiling is None:
+        allocation_profiling = resolve_allocation_profiling_enabled()
 
     app = FastAPI(title="Cursor Usage Analytics API")
 
+    # Innermost middleware, so that Server-Timing covers compression time.
+    app.add_middleware(CompressionMiddleware, min_bytes=resolve_compression_min_bytes())
+
     # The dashboard is served from a different origin (Streamlit), therefore we
     # need permissive CORS settings so that it can consume the API. The
     # Streamlit container is internal to the docker-compose network, so using
@@ -33,9 +64,15 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["Server-Timing", "X-Total-Count", "X-Current-Period", "X-Previous-Period", "X-Allocation-Profile"],
     )
+    app.add_middleware(ServerTimingMiddleware)
+    if allocation_profiling:
+        # Outermost, so that a profile covers the whole request.
+        app.add_middleware(AllocationProfilingMiddleware)
 
     app.include_router(analytics_router)
+    app.include_router(admin_router)
     _register_system_routes(app)
 
     return app
@@ -0,0 +1,15 @@
+"""Request phase timing and Prometheus-format metrics."""
+
+from .metrics import PROMETHEUS_CONTENT_TYPE, REGISTRY, is_enabled, set_enabled
+from .middleware import AllocationProfilingMiddleware, ServerTimingMiddleware
+from .timing import phase
+
+__all__ = [
+    "AllocationProfilingMiddleware",
+    "PROMETHEUS_CONTENT_TYPE",
+    "REGISTRY",
+    "ServerTimingMiddleware",
+    "is_enabled",
+    "phase",
+    "set_enabled",
+]
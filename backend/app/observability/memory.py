@@ -0,0 +1,192 @@
+"""Deep memory accounting of loaded data and caches, and opt-in allocation profiling."""
+
+from __future__ import annotations
+
+import dataclasses
+import itertools
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+
+def current_rss_bytes() -> int | None:
+    """Return the resident set size of this process, or ``None`` where it cannot be read."""
+
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_bytes() -> int:
+    """Return the peak resident set size of this process so far."""
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if platform.system() == "Darwin" else peak * 1024
+
+
+def frame_memory(dataframe: pd.DataFrame) -> dict[str, Any]:
+    """Return the bytes held by a dataframe in total, by its index and by each column."""
+
+    usage = dataframe.memory_usage(index=True, deep=True)
+    return {
+        "bytes": int(usage.sum()),
+        "index": int(usage["Index"]),
+        "columns": {str(column): int(usage[column]) for column in dataframe.columns},
+    }
+
+
+def deep_sizeof(value: Any, _seen: set[int] | None = None) -> int:
+    """Estimate the heap bytes reachable from ``value``, counting shared objects once.
+
+    Dataframes, series and indexes are measured with ``memory_usage(deep=True)``,
+    arrays by their buffers (memory-mapped arrays count as zero: their pages
+    belong to the page cache), and containers, dataclasses and plain objects
+    by walking their contents.
+    """
+
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        if isinstance(value, np.memmap) or isinstance(value.base, np.memmap):
+            return 0
+        size = int(value.nbytes)
+        if value.dtype == object:
+            size += sum(deep_sizeof(item, seen) for item in value.ravel())
+        return size
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, bytearray, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        return size + sum(deep_sizeof(key, seen) + deep_sizeof(item, seen) for key, item in value.items())
+    if isinstance(value, (list, tuple, set, frozenset, deque)):
+        return size + sum(deep_sizeof(item, seen) for item in value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return size + sum(deep_sizeof(getattr(value, field.name), seen) for field in dataclasses.fields(value))
+    if hasattr(value, "__dict__"):
+        return size + deep_sizeof(vars(value), seen)
+    return size
+
+
+class AllocationProfiler:
+    """Captures the top allocation sites of single requests with :mod:`tracemalloc`.
+
+    Tracing is process-wide, so only one request is profiled at a time and
+    allocations made concurrently by other requests show up in its profile;
+    profile on a quiet instance for clean results. Tracing only runs while a
+    profiled request is in flight. The most recent ``max_profiles`` profiles
+    are kept.
+    """
+
+    def __init__(self, top: int = 25, frames: int = 1, max_profiles: int = 20) -> None:
+        if top <= 0 or frames <= 0 or max_profiles <= 0:
+            raise ValueError("top, frames and max_profiles must be positive")
+        self._top = top
+        self._frames = frames
+        self._profiles: deque[dict[str, Any]] = deque(maxlen=max_profiles)
+        self._ids = itertools.count(1)
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def profile(self, label: str) -> Iterator[str | None]:
+        """Trace allocations of the enclosed block and yield the id its profile will have.
+
+        Yields ``None``, and traces nothing, while another block is being profiled.
+        """
+
+        if not self._busy.acquire(blocking=False):
+            yield None
+            return
+        try:
+            profile_id = str(next(self._ids))
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start(self._frames)
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+            baseline, _ = tracemalloc.get_traced_memory()
+            started = time.perf_counter()
+            try:
+                yield profile_id
+            finally:
+                duration = time.perf_counter() - started
+                current, peak = tracemalloc.get_traced_memory()
+                after = tracemalloc.take_snapshot()
+                if started_tracing:
+                    tracemalloc.stop()
+                self._record(profile_id, label, duration, current - baseline, peak - baseline, before, after)
+        finally:
+            self._busy.release()
+
+    def profiles(self) -> list[dict[str, Any]]:
+        """Return the kept profiles without their allocation sites, newest first."""
+
+        with self._lock:
+            return [{key: value for key, value in profile.items() if key != "sites"} for profile in reversed(self._profiles)]
+
+    def get(self, profile_id: str) -> dict[str, Any] | None:
+        """Return the profile with ``profile_id``, including its allocation sites, if it is still kept."""
+
+        with self._lock:
+            return next((profile for profile in self._profiles if profile["id"] == profile_id), None)
+
+    def _record(
+        self,
+        profile_id: str,
+        label: str,
+        duration: float,
+        net_bytes: int,
+        peak_bytes: int,
+        before: tracemalloc.Snapshot,
+        after: tracemalloc.Snapshot,
+    ) -> None:
+        # Leave out the profiler's own bookkeeping.
+        ignored = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        statistics = after.filter_traces(ignored).compare_to(before.filter_traces(ignored), "traceback")
+        # Sites ranked by how much more they held at the end of the request
+        # than at its start; transient allocations only show in peak_bytes.
+        statistics.sort(key=lambda stat: (stat.size_diff, stat.size), reverse=True)
+        sites = [
+            {
+                "traceback": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+                "size_diff": stat.size_diff,
+                "count_diff": stat.count_diff,
+                "size": stat.size,
+            }
+            for stat in statistics[: self._top]
+        ]
+        profile = {
+            "id": profile_id,
+            "request": label,
+            "captured_at": time.time(),
+            "duration_seconds": duration,
+            "net_bytes": net_bytes,
+            "peak_bytes": peak_bytes,
+            "sites": sites,
+        }
+        with self._lock:
+            self._profiles.append(profile)
+
+
+ALLOCATION_PROFILER = AllocationProfiler()
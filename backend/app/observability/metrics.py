@@ -0,0 +1,347 @@
+"""Minimal Prometheus-compatible metric primitives and the backend's metric catalogue."""
+
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+import time
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+
+
+_DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_enabled = False
+
+
+def set_enabled(enabled: bool) -> None:
+    """Turn metric and phase recording on or off for the whole process."""
+
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    """Return whether metric and phase recording is active."""
+
+    return _enabled
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: dict[str, str]) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list[str]:  # pragma: no cover - overridden
+        raise NotImplementedError
+
+    def clear(self) -> None:  # pragma: no cover - overridden
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing value, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Add ``amount`` to the counter; a no-op while recording is disabled."""
+
+        if not _enabled:
+            return
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Return the current value for a label combination."""
+
+        return self._values.get(self._label_values(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, such as resident bytes."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the gauge; a no-op while recording is disabled."""
+
+        if not _enabled:
+            return
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels: str) -> float:
+        """Return the current value for a label combination."""
+
+        return self._values.get(self._label_values(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(_Metric):
+    """Distribution of observations across cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = _DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._buckets = tuple(sorted(buckets))
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record a single observation; a no-op while recording is disabled."""
+
+        if not _enabled:
+            return
+        key = self._label_values(labels)
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            counts, totals = self._series.setdefault(key, ([0] * (len(self._buckets) + 1), [0.0]))
+            counts[index] += 1
+            totals[0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall-clock duration of the enclosed block in seconds."""
+
+        if not _enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        """Return how many observations were recorded for a label combination."""
+
+        series = self._series.get(self._label_values(labels))
+        return sum(series[0]) if series else 0
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), totals[0])) for key, (counts, totals) in self._series.items())
+
+        lines: list[str] = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip((*self._buckets, math.inf), counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = _DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format (0.0.4)."""
+
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        """Reset all recorded values, keeping the metric definitions."""
+
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "usage_http_requests_total",
+    "HTTP requests handled, by route template, method and status code.",
+    ("route", "method", "status"),
+)
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "usage_http_request_duration_seconds",
+    "End-to-end HTTP request latency by route template.",
+    ("route", "method"),
+)
+PHASE_DURATION = REGISTRY.histogram(
+    "usage_phase_duration_seconds",
+    "Time spent in named processing phases such as csv_parse or json_encode.",
+    ("phase",),
+)
+DATASET_LOAD_DURATION = REGISTRY.histogram(
+    "usage_dataset_load_duration_seconds",
+    "Time taken to load a usage dataset from its source files.",
+)
+ROWS_SCANNED = REGISTRY.counter(
+    "usage_rows_scanned_total",
+    "Dataset rows scanned by service operations.",
+    ("operation",),
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "usage_cache_requests_total",
+    "Cache lookups by cache name and result (hit or miss).",
+    ("cache", "result"),
+)
+DATASET_LOADS = REGISTRY.counter(
+    "usage_dataset_loads_total",
+    "Datasets loaded into the in-memory cache, by reason (initial, version_change, after_eviction or merge).",
+    ("dataset", "reason"),
+)
+DATASET_EVICTIONS = REGISTRY.counter(
+    "usage_dataset_evictions_total",
+    "Datasets evicted from the in-memory cache to stay within the memory budget.",
+    ("dataset",),
+)
+DATASET_RESIDENT_BYTES = REGISTRY.gauge(
+    "usage_dataset_resident_bytes",
+    "Memory held by datasets currently in the in-memory cache.",
+)
+RESULT_CACHE_REQUESTS = REGISTRY.counter(
+    "usage_result_cache_requests_total",
+    "Query result cache lookups by service method and result (hit or miss).",
+    ("method", "result"),
+)
+RESULT_CACHE_EVICTIONS = REGISTRY.counter(
+    "usage_result_cache_evictions_total",
+    "Query results dropped from the cache, by reason (lru, ttl or version).",
+    ("reason",),
+)
+COMPRESSION_RATIO = REGISTRY.histogram(
+    "usage_response_compression_ratio",
+    "Compressed size divided by original size for encoded response bodies.",
+    ("encoding",),
+    buckets=(0.02, 0.05, 0.1, 0.15, 0.2, 0.3, 0.5, 0.75, 1.0),
+)
+COMPRESSION_CPU_SECONDS = REGISTRY.counter(
+    "usage_response_compression_cpu_seconds_total",
+    "CPU time spent compressing response bodies.",
+    ("encoding",),
+)
+COMPRESSION_BYTES = REGISTRY.counter(
+    "usage_response_compression_bytes_total",
+    "Response bytes before (stage=raw) and after (stage=encoded) compression.",
+    ("encoding", "stage"),
+)
+SERIES_UPDATES = REGISTRY.counter(
+    "usage_series_updates_total",
+    "Rolling series refreshes by mode (unchanged, incremental or full).",
+    ("mode",),
+)
+ANOMALY_UPDATES = REGISTRY.counter(
+    "usage_anomaly_state_updates_total",
+    "Anomaly detector refreshes by mode (unchanged, incremental or full).",
+    ("mode",),
+)
+INGESTED_ROWS = REGISTRY.counter(
+    "usage_ingested_rows_total",
+    "Uploaded rows by dataset and result (accepted, rejected or duplicates).",
+    ("dataset", "result"),
+)
+EXPORT_JOBS = REGISTRY.counter(
+    "usage_export_jobs_total",
+    "Export jobs by format and status (queued, succeeded, failed or cancelled).",
+    ("format", "status"),
+)
+EXPORTED_ROWS = REGISTRY.counter(
+    "usage_exported_rows_total",
+    "Rows written by completed export jobs, by format.",
+    ("format",),
+)
@@ -0,0 +1,90 @@
+"""ASGI middleware that records request metrics, emits ``Server-Timing`` headers and profiles allocations."""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Awaitable, Callable, MutableMapping
+
+from app.observability import metrics
+from app.observability.memory import ALLOCATION_PROFILER, AllocationProfiler
+from app.observability.timing import start_request_timings, stop_request_timings
+
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+PROFILE_REQUEST_HEADER = b"x-profile-allocations"
+PROFILE_ID_HEADER = b"x-allocation-profile"
+
+
+class ServerTimingMiddleware:
+    """Time every HTTP request and expose its phases in a ``Server-Timing`` header.
+
+    Implemented as a plain ASGI middleware rather than ``BaseHTTPMiddleware``
+    so that it adds no extra task or body buffering, and it forwards requests
+    untouched while recording is disabled.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not metrics.is_enabled():
+            await self.app(scope, receive, send)
+            return
+
+        timings, token = start_request_timings()
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timings.add("total", time.perf_counter() - started)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.server_timing_header().encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            stop_request_timings(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            method = scope.get("method", "GET")
+            metrics.HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, route=route_path, method=method)
+            metrics.HTTP_REQUESTS.inc(route=route_path, method=method, status=str(status))
+
+
+class AllocationProfilingMiddleware:
+    """Profile the allocations of requests sent with an ``X-Profile-Allocations: 1`` header.
+
+    The response carries the profile id in ``X-Allocation-Profile``; the
+    header is absent when another request is being profiled at the time.
+    Requests without the header pass straight through.
+    """
+
+    def __init__(self, app: ASGIApp, profiler: AllocationProfiler = ALLOCATION_PROFILER) -> None:
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        requested = dict(scope.get("headers", [])).get(PROFILE_REQUEST_HEADER, b"").lower()
+        if scope["type"] != "http" or requested not in (b"1", b"true", b"yes", b"on"):
+            await self.app(scope, receive, send)
+            return
+
+        label = f"{scope.get('method', 'GET')} {scope.get('path', '')}"
+        with self.profiler.profile(label) as profile_id:
+
+            async def send_with_profile_id(message: Message) -> None:
+                if message["type"] == "http.response.start" and profile_id is not None:
+                    message["headers"] = [*message.get("headers", []), (PROFILE_ID_HEADER, profile_id.encode("ascii"))]
+                await send(message)
+
+            await self.app(scope, receive, send_with_profile_id)
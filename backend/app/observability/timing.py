@@ -0,0 +1,91 @@
+"""Named phase timers collected per request for ``Server-Timing`` headers and metrics."""
+
+from __future__ import annotations
+
+import time
+from contextvars import ContextVar
+from types import TracebackType
+
+from app.observability import metrics
+
+
+class RequestTimings:
+    """Accumulated phase durations (in seconds) for a single request."""
+
+    __slots__ = ("phases",)
+
+    def __init__(self) -> None:
+        self.phases: dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def server_timing_header(self) -> str:
+        """Render the phases as a ``Server-Timing`` header value with durations in milliseconds."""
+
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items())
+
+
+_current_timings: ContextVar[RequestTimings | None] = ContextVar("usage_request_timings", default=None)
+
+
+def start_request_timings() -> tuple[RequestTimings, object]:
+    """Begin collecting phases for the current request; returns the collector and a reset token."""
+
+    timings = RequestTimings()
+    return timings, _current_timings.set(timings)
+
+
+def stop_request_timings(token: object) -> None:
+    """Stop collecting phases for the current request."""
+
+    _current_timings.reset(token)  # type: ignore[arg-type]
+
+
+class _PhaseTimer:
+    __slots__ = ("_name", "_started")
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._started = 0.0
+
+    def __enter__(self) -> _PhaseTimer:
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        elapsed = time.perf_counter() - self._started
+        metrics.PHASE_DURATION.observe(elapsed, phase=self._name)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.add(self._name, elapsed)
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> _NoopTimer:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        return None
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+def phase(name: str) -> _PhaseTimer | _NoopTimer:
+    """Time the enclosed block as phase ``name``.
+
+    When recording is disabled a shared no-op context manager is returned, so
+    instrumented code pays only for one function call and a flag check.
+    """
+
+    if not metrics.is_enabled():
+        return _NOOP_TIMER
+    return _PhaseTimer(name)
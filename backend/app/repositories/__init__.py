@@ -1,3 +1,5 @@
+from .chunked_csv_usage_repository import ChunkedCSVUsageRepository, PublishedStoreRepository
 from .csv_usage_repository import CSVUsageRepository
+from .dataset_registry import DatasetRegistry, UnknownDatasetError
 
-__all__ = ["CSVUsageRepository"]
+__all__ = ["CSVUsageRepository", "ChunkedCSVUsageRepository", "DatasetRegistry", "PublishedStoreRepository", "UnknownDatasetError"]
@@ -0,0 +1,256 @@
+"""Bounded-memory ingestion of usage CSVs that may not fit in RAM."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+
+import pandas as pd
+
+from app.dto.usage_event import UsageEventDTO
+from app.observability import phase
+from app.observability.metrics import DATASET_LOAD_DURATION
+from app.repositories.columnar_store import ColumnarTable, ColumnarTableWriter
+from app.repositories.csv_usage_repository import (
+    COST_COLUMN,
+    CSV_DATE_FORMAT,
+    DIMENSION_COLUMNS,
+    NUMERIC_COLUMNS,
+    ROLLUP_MEASURES,
+    CSVUsageRepository,
+    build_daily_rollup,
+    iter_usage_chunks,
+    merge_daily_rollups,
+    normalize_usage_frame,
+)
+from app.repositories.pricing import PriceTable
+from app.repositories.shared_store import ingest_lock, pin_version, publish_version, read_version_header
+
+
+DEFAULT_CHUNK_ROWS = 100_000
+
+EVENTS_SCHEMA = {
+    "date": "timestamp",
+    **{column: "dictionary" for column in DIMENSION_COLUMNS},
+    **{column: "int64" for column in NUMERIC_COLUMNS},
+    COST_COLUMN: "float64",
+}
+ROLLUP_SCHEMA = {
+    "date": "timestamp",
+    "user": "dictionary",
+    "model": "dictionary",
+    **{measure: "float64" if measure == COST_COLUMN else "int64" for measure in ROLLUP_MEASURES},
+}
+
+
+class DailyRollupAccumulator:
+    """Online per-day/user/model rollup fed one chunk at a time.
+
+    Memory is proportional to the number of distinct groups, not to the number
+    of rows seen.
+    """
+
+    def __init__(self, initial: pd.DataFrame | None = None) -> None:
+        self._totals = initial
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        partial = build_daily_rollup(chunk)
+        if self._totals is None:
+            self._totals = partial
+            return
+        self._totals = merge_daily_rollups(self._totals, partial)
+
+    def result(self) -> pd.DataFrame:
+        if self._totals is None:
+            return build_daily_rollup(pd.DataFrame())
+        return self._totals
+
+
+class ChunkedCSVUsageRepository(CSVUsageRepository):
+    """Repository that ingests the CSV in fixed-size chunks into an on-disk columnar store.
+
+    Ingestion happens once per dataset version: each chunk is normalised,
+    folded into the daily rollup and appended to ``<store_root>/<version>/``.
+    Afterwards aggregates are answered from the persisted rollup and raw rows
+    are read back through memory-mapped columns, so peak memory is bounded by
+    ``chunk_rows`` rather than by the size of the CSV. Processes that find a
+    complete store for the current version simply map it instead of parsing;
+    concurrent processes wait on an inter-process lock while one of them
+    ingests, and the ingesting process publishes the version header read by
+    :class:`PublishedStoreRepository`. Publishing deletes superseded versions
+    of the CSV except the one replaced, once no open table pins them. Rows
+    appended to the CSV can be added to a stored version with :meth:`extend`
+    instead of re-ingesting everything.
+    """
+
+    def __init__(
+        self,
+        csv_path: str | Path,
+        store_root: str | Path,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+        price_table: PriceTable | None = None,
+    ) -> None:
+        super().__init__(csv_path, price_table=price_table)
+        if chunk_rows <= 0:
+            raise ValueError("chunk_rows must be positive")
+        self._store_root = Path(store_root)
+        self._chunk_rows = chunk_rows
+        self._events_table: ColumnarTable | None = None
+        self._rollup_table: ColumnarTable | None = None
+
+    def get_events(self) -> list[UsageEventDTO]:
+        """Load events as DTOs from the on-disk store."""
+
+        with phase("dto_build"):
+            return [self._row_to_dto(row) for row in self.get_dataframe().to_dict(orient="records")]
+
+    def get_dataframe(self, columns: Sequence[str] | None = None) -> pd.DataFrame:
+        """Materialise every stored row; prefer :meth:`iter_dataframes` for large datasets."""
+
+        events, _ = self._ensure_ingested()
+        return events.read(columns, categorical=False)
+
+    def iter_dataframes(self, columns: Sequence[str] | None = None) -> Iterator[pd.DataFrame]:
+        """Yield stored rows in chunks of ``chunk_rows`` with categorical dimensions.
+
+        Only ``columns`` are decoded when given; the other column files are
+        never touched.
+        """
+
+        events, _ = self._ensure_ingested()
+        yield from events.iter_chunks(self._chunk_rows, columns)
+
+    def get_daily_rollup(self) -> pd.DataFrame:
+        """Return the rollup persisted during ingestion."""
+
+        _, rollup = self._ensure_ingested()
+        return rollup.read(categorical=False)
+
+    def get_columnar_table(self) -> ColumnarTable:
+        """Return the memory-mapped events table, ingesting the CSV first if needed."""
+
+        events, _ = self._ensure_ingested()
+        return events
+
+    def ingest(self, version: str) -> tuple[ColumnarTable, ColumnarTable] | None:
+        """Stream the CSV into the store as ``version``.
+
+        Returns ``None`` and stores nothing when the CSV no longer matches
+        ``version`` once streamed, because it changed while being read.
+        """
+
+        return self._write(version, iter_usage_chunks(self._csv_path, self._chunk_rows))
+
+    def extend(self, base_version: str, rows_path: str | Path) -> bool:
+        """Store the current version as the stored ``base_version`` plus the export at ``rows_path``.
+
+        Meant for rows just appended to the CSV: only they are parsed, the
+        base's columns are copied as they are and its rollup is merged with
+        theirs. Returns whether the current version is now stored; ``False``
+        when ``base_version`` is not, or when the CSV changed meanwhile.
+        """
+
+        version = self.dataset_version()
+        base = self._attach(base_version)
+        if base is None:
+            return False
+        with ingest_lock(self._store_root, version):
+            if self._attach(version) is None:
+                tables = self._write(version, iter_usage_chunks(rows_path, self._chunk_rows), base)
+                if tables is None:
+                    return False
+                publish_version(self._store_root, self._csv_path, version, tables[0].rows)
+        return True
+
+    def _write(
+        self,
+        version: str,
+        raw_chunks: Iterator[tuple[Path, pd.DataFrame]],
+        base: tuple[ColumnarTable, ColumnarTable] | None = None,
+    ) -> tuple[ColumnarTable, ColumnarTable] | None:
+        dataset_dir = self._store_root / version
+        events_writer = ColumnarTableWriter(dataset_dir / "events", EVENTS_SCHEMA, base[0] if base else None)
+        accumulator = DailyRollupAccumulator(base[1].read(categorical=False) if base else None)
+        try:
+            with DATASET_LOAD_DURATION.time():
+                for source, raw_chunk in raw_chunks:
+                    with phase("csv_parse"):
+                        chunk = normalize_usage_frame(raw_chunk, source, CSV_DATE_FORMAT, self.price_table)
+                    events_writer.append(chunk)
+                    accumulator.update(chunk)
+        except BaseException:
+            self._abort(events_writer, dataset_dir)
+            raise
+        if self.dataset_version() != version:
+            self._abort(events_writer, dataset_dir)
+            return None
+
+        metadata = {"source": str(self._csv_path), "dataset_version": version}
+        rollup_writer = ColumnarTableWriter(dataset_dir / "rollup", ROLLUP_SCHEMA)
+        rollup_writer.append(accumulator.result())
+        rollup_table = rollup_writer.close(metadata)
+        # The events table is published last: its manifest marks the version as complete.
+        events_table = events_writer.close(metadata)
+        return events_table, rollup_table
+
+    @staticmethod
+    def _abort(writer: ColumnarTableWriter, dataset_dir: Path) -> None:
+        writer.abort()
+        try:
+            dataset_dir.rmdir()
+        except OSError:
+            pass  # Not empty: another process is writing or has written the version.
+
+    def _ensure_ingested(self) -> tuple[ColumnarTable, ColumnarTable]:
+        while self._events_table is None or self._rollup_table is None:
+            version = self.dataset_version()
+            tables = self._attach(version)
+            if tables is None:
+                with ingest_lock(self._store_root, version):
+                    # Another process may have finished ingesting while we waited.
+                    tables = self._attach(version)
+                    if tables is None:
+                        ingested = self.ingest(version)
+                        if ingested is None:
+                            # The CSV changed mid-ingest; start over from its new version.
+                            continue
+                        tables = self._attach(version)
+                        publish_version(self._store_root, self._csv_path, version, ingested[0].rows)
+            self._events_table, self._rollup_table = tables
+        return self._events_table, self._rollup_table
+
+    def _attach(self, version: str) -> tuple[ColumnarTable, ColumnarTable] | None:
+        # Pinned before looking, so that the version cannot be pruned once found.
+        pin = pin_version(self._store_root, version)
+        dataset_dir = self._store_root / version
+        if ColumnarTable.exists(dataset_dir / "events") and ColumnarTable.exists(dataset_dir / "rollup"):
+            return ColumnarTable(dataset_dir / "events", pin), ColumnarTable(dataset_dir / "rollup", pin)
+        if pin is not None:
+            pin.close()
+        return None
+
+
+class PublishedStoreRepository(ChunkedCSVUsageRepository):
+    """Read-only view of the dataset version last published for the CSV.
+
+    The version comes from the header written by the loader process (the
+    ``build_store`` CLI or a worker that ingested), not from the CSV itself,
+    so attach-only workers never stat, fingerprint or parse the source. Each
+    instance pins the version it first reads; a fresh instance picks up a
+    newly published version and maps its directory instead.
+    """
+
+    def __init__(self, csv_path: str | Path, store_root: str | Path, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> None:
+        super().__init__(csv_path, store_root, chunk_rows)
+        self._version: str | None = None
+
+    def dataset_version(self) -> str:
+        if self._version is None:
+            header = read_version_header(self._store_root, self._csv_path)
+            if header is None:
+                raise FileNotFoundError(f"No dataset version published for {self._csv_path} in {self._store_root}")
+            self._version = header["dataset_version"]
+        return self._version
+
+    def ingest(self, version: str) -> tuple[ColumnarTable, ColumnarTable] | None:
+        raise RuntimeError(f"Dataset version {self.dataset_version()} is published but missing from {self._store_root}")
@@ -0,0 +1,247 @@
+"""Compact on-disk columnar tables used to keep usage rows out of memory.
+
+A table is a directory with one little-endian binary file per column plus a
+``manifest.json`` describing the schema:
+
+* ``timestamp`` columns are stored as ``int64`` nanoseconds since the epoch (UTC);
+* ``dictionary`` columns are stored as ``int32`` codes into a value list kept in
+  the manifest, which keeps repetitive strings such as user e-mails tiny;
+* ``int64`` and ``float64`` columns are stored as-is.
+
+Tables are append-only while being written and immutable once closed. Readers
+map the column files with :class:`numpy.memmap`, so opening a table is close
+to instant and several worker processes share one copy in the OS page cache.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sys
+import uuid
+from collections.abc import Iterator, Mapping, Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+
+COLUMNAR_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+_STORAGE_DTYPES = {
+    "timestamp": np.dtype("<i8"),
+    "dictionary": np.dtype("<i4"),
+    "int64": np.dtype("<i8"),
+    "float64": np.dtype("<f8"),
+}
+
+
+class ColumnarTableWriter:
+    """Append normalised frames to a columnar table, one chunk at a time.
+
+    Data is written into a hidden staging directory that is renamed into place
+    by :meth:`close`, so a crashed ingestion never leaves a readable table.
+    With ``base`` the new table starts as a copy of that table's rows and
+    dictionaries, so appending to a dataset never re-encodes what it held.
+    """
+
+    def __init__(self, directory: str | Path, schema: Mapping[str, str], base: ColumnarTable | None = None) -> None:
+        unknown = {kind for kind in schema.values() if kind not in _STORAGE_DTYPES}
+        if unknown:
+            raise ValueError(f"Unsupported column kinds: {', '.join(sorted(unknown))}")
+        if base is not None and base.columns != list(schema):
+            raise ValueError("base table columns do not match the schema")
+
+        self._directory = Path(directory)
+        # Unique staging names let several processes ingest the same version
+        # concurrently; whichever finishes first publishes the table.
+        self._staging = self._directory.with_name(f".{self._directory.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+        self._staging.mkdir(parents=True)
+
+        self._schema = dict(schema)
+        self._dictionaries: dict[str, dict[str, int]] = {
+            column: {} for column, kind in schema.items() if kind == "dictionary"
+        }
+        self._rows = 0
+        if base is not None:
+            for column in schema:
+                shutil.copyfile(base._directory / f"{column}.bin", self._staging / f"{column}.bin")
+            for column, dictionary in self._dictionaries.items():
+                dictionary.update((value, code) for code, value in enumerate(base.dictionary(column)))
+            self._rows = base.rows
+        self._handles = {column: (self._staging / f"{column}.bin").open("ab" if base else "wb") for column in schema}
+
+    def append(self, dataframe: pd.DataFrame) -> None:
+        """Encode and append ``dataframe``; it must contain every schema column."""
+
+        for column, kind in self._schema.items():
+            self._handles[column].write(self._encode(column, kind, dataframe[column]).tobytes())
+        self._rows += len(dataframe)
+
+    def close(self, metadata: Mapping[str, Any] | None = None) -> ColumnarTable:
+        """Finish the table, publish it atomically and return a reader for it."""
+
+        for handle in self._handles.values():
+            handle.close()
+
+        columns: dict[str, dict[str, Any]] = {}
+        for column, kind in self._schema.items():
+            entry: dict[str, Any] = {"kind": kind, "dtype": _STORAGE_DTYPES[kind].str}
+            if kind == "dictionary":
+                entry["values"] = list(self._dictionaries[column])
+            columns[column] = entry
+
+        manifest = {
+            "format_version": COLUMNAR_FORMAT_VERSION,
+            "rows": self._rows,
+            "columns": columns,
+            "metadata": dict(metadata or {}),
+        }
+        (self._staging / MANIFEST_NAME).write_text(json.dumps(manifest), encoding="utf-8")
+
+        try:
+            self._staging.rename(self._directory)
+        except OSError:
+            if not ColumnarTable.exists(self._directory):
+                raise
+            # Another writer published the same table first; keep theirs.
+            shutil.rmtree(self._staging, ignore_errors=True)
+        return ColumnarTable(self._directory)
+
+    def abort(self) -> None:
+        """Discard everything written so far."""
+
+        for handle in self._handles.values():
+            handle.close()
+        shutil.rmtree(self._staging, ignore_errors=True)
+
+    def _encode(self, column: str, kind: str, series: pd.Series) -> np.ndarray:
+        if kind == "timestamp":
+            return series.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy("datetime64[ns]").view("<i8")
+        if kind in ("int64", "float64"):
+            return series.to_numpy(dtype=_STORAGE_DTYPES[kind])
+
+        dictionary = self._dictionaries[column]
+        codes, uniques = pd.factorize(series, sort=False)
+        mapping = np.empty(len(uniques), dtype="<i4")
+        for index, value in enumerate(uniques):
+            mapping[index] = dictionary.setdefault(str(value), len(dictionary))
+        return mapping[codes]
+
+
+class ColumnarTable:
+    """Read-only access to a closed columnar table.
+
+    ``pin`` is any handle to keep open for as long as the table is, such as
+    the reader lock that stops its version from being deleted.
+    """
+
+    def __init__(self, directory: str | Path, pin: Any = None) -> None:
+        self._directory = Path(directory)
+        self._pin = pin
+        self._manifest = json.loads((self._directory / MANIFEST_NAME).read_text(encoding="utf-8"))
+        if self._manifest["format_version"] != COLUMNAR_FORMAT_VERSION:
+            raise ValueError(f"Unsupported columnar format in {self._directory}")
+
+    @classmethod
+    def exists(cls, directory: str | Path) -> bool:
+        """Return whether a closed table is present at ``directory``."""
+
+        return (Path(directory) / MANIFEST_NAME).is_file()
+
+    @property
+    def rows(self) -> int:
+        return int(self._manifest["rows"])
+
+    @property
+    def columns(self) -> list[str]:
+        return list(self._manifest["columns"])
+
+    @property
+    def metadata(self) -> dict[str, Any]:
+        return self._manifest["metadata"]
+
+    def memory_usage(self) -> dict[str, Any]:
+        """Return the bytes of each memory-mapped column and of the dictionaries held on the heap.
+
+        Mapped columns are shared through the page cache (and between
+        processes attached to the same store), so only the dictionaries count
+        towards this process's own memory.
+        """
+
+        mapped = {
+            column: self.rows * np.dtype(entry["dtype"]).itemsize for column, entry in self._manifest["columns"].items()
+        }
+        dictionaries = {
+            column: sys.getsizeof(entry["values"]) + sum(sys.getsizeof(value) for value in entry["values"])
+            for column, entry in self._manifest["columns"].items()
+            if entry["kind"] == "dictionary"
+        }
+        return {"rows": self.rows, "mapped_bytes": sum(mapped.values()), "columns": mapped, "dictionaries": dictionaries}
+
+    def dictionary(self, column: str) -> list[str]:
+        """Return the value list of a dictionary-encoded column."""
+
+        return self._manifest["columns"][column]["values"]
+
+    def read_array(self, column: str, start: int = 0, stop: int | None = None) -> np.ndarray:
+        """Return a read-only memory-mapped view of ``column`` for rows ``[start, stop)``."""
+
+        entry = self._manifest["columns"][column]
+        dtype = np.dtype(entry["dtype"])
+        stop = self.rows if stop is None else min(stop, self.rows)
+        count = max(stop - start, 0)
+        if count == 0:
+            # Zero-length files cannot be mapped.
+            return np.empty(0, dtype=dtype)
+        return np.memmap(
+            self._directory / f"{column}.bin",
+            dtype=dtype,
+            mode="r",
+            offset=start * dtype.itemsize,
+            shape=(count,),
+        )
+
+    def take(self, indices: np.ndarray, columns: Sequence[str] | None = None, categorical: bool = True) -> pd.DataFrame:
+        """Decode only the rows at ``indices``, leaving every other row untouched on disk."""
+
+        return self._decode({column: self.read_array(column)[indices] for column in columns or self.columns}, categorical)
+
+    def read(
+        self,
+        columns: Sequence[str] | None = None,
+        start: int = 0,
+        stop: int | None = None,
+        categorical: bool = True,
+    ) -> pd.DataFrame:
+        """Decode rows ``[start, stop)`` into a dataframe.
+
+        Dictionary columns are returned as categoricals built directly from the
+        stored codes, so decoding does not allocate one string per row. Pass
+        ``categorical=False`` to get plain ``object`` columns instead.
+        """
+
+        return self._decode({column: self.read_array(column, start, stop) for column in columns or self.columns}, categorical)
+
+    def iter_chunks(self, chunk_rows: int, columns: Sequence[str] | None = None) -> Iterator[pd.DataFrame]:
+        """Yield the table as consecutive frames of at most ``chunk_rows`` rows."""
+
+        for start in range(0, self.rows, chunk_rows):
+            yield self.read(columns, start, start + chunk_rows)
+
+    def _decode(self, arrays: Mapping[str, np.ndarray], categorical: bool) -> pd.DataFrame:
+        decoded: dict[str, Any] = {}
+        for column, array in arrays.items():
+            kind = self._manifest["columns"][column]["kind"]
+            if kind == "timestamp":
+                decoded[column] = pd.Series(array.view("datetime64[ns]")).dt.tz_localize("UTC")
+            elif kind == "dictionary" and categorical:
+                decoded[column] = pd.Categorical.from_codes(array, categories=self.dictionary(column))
+            elif kind == "dictionary":
+                decoded[column] = np.asarray(self.dictionary(column), dtype=object)[array]
+            else:
+                decoded[column] = np.asarray(array)
+        return pd.DataFrame(decoded, copy=False)
@@ -1,11 +1,30 @@
 from __future__ import annotations
 
+import hashlib
+import os
+import shutil
+import time
+import uuid
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 import pandas as pd
 
 from app.dto.usage_event import UsageEventDTO
+from app.observability import phase
+from app.observability.metrics import DATASET_LOAD_DURATION
+from app.repositories.columnar_store import ColumnarTable
+from app.repositories.pricing import PRICED_TOKEN_COLUMNS, PriceTable, default_price_table
+
+try:  # pragma: no cover - optional dependency
+    import pyarrow  # noqa: F401
+except ImportError:  # pragma: no cover - optional dependency
+    PYARROW_AVAILABLE = False
+else:  # pragma: no cover - optional dependency
+    PYARROW_AVAILABLE = True
 
 
 _COLUMN_MAPPING = {
@@ -22,32 +41,137 @@ _COLUMN_MAPPING = {
     "Requests": "requests",
 }
 
+USAGE_COLUMNS = list(_COLUMN_MAPPING.values())
+# Column names as they appear in the export.
+EXPORT_COLUMNS = list(_COLUMN_MAPPING)
+DIMENSION_COLUMNS = ["user", "kind", "model", "max_mode"]
+NUMERIC_COLUMNS = [
+    "input_with_cache",
+    "input_without_cache",
+    "cache_read",
+    "output_tokens",
+    "total_tokens",
+    "requests",
+]
+COST_COLUMN = "cost"
+# Columns of a normalised frame: the export's columns plus the cost computed at ingest.
+EVENT_COLUMNS = [*USAGE_COLUMNS, COST_COLUMN]
+# Export columns the price table needs to compute ``cost``.
+COST_INPUT_COLUMNS = ["kind", "model", "max_mode", *PRICED_TOKEN_COLUMNS]
+
+
+USAGE_FILE_SUFFIXES = (".csv", ".csv.gz", ".csv.zst")
+
+# Explicit schema for the raw export. Counters are read as floats because
+# errored requests leave "Requests" empty; they become int64 once NaN is filled.
+CSV_DTYPES: dict[str, str] = {
+    raw: "float64" if column in NUMERIC_COLUMNS else "object" for raw, column in _COLUMN_MAPPING.items()
+}
+# Cursor exports timestamps as ISO 8601 in UTC, e.g. 2025-09-25T19:08:55.643Z.
+CSV_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
 
 class CSVUsageRepository:
-    """Repository that loads usage events from a CSV file."""
+    """Repository that loads usage events from a CSV file.
+
+    ``csv_path`` may point at a plain, gzip (``.csv.gz``) or zstd
+    (``.csv.zst``) export, which is decompressed while streaming, or at a
+    directory of such files, which are decoded in parallel and concatenated.
+    """
+
+    # Test doubles and in-memory subclasses skip ``__init__``; without a CSV
+    # path the dataframe accessors fall back to converting ``get_events()``.
+    _csv_path: Path | None = None
+    _max_workers: int | None = None
+    _typed = True
+    _price_table: PriceTable | None = None
 
-    def __init__(self, csv_path: str | Path) -> None:
+    def __init__(
+        self,
+        csv_path: str | Path,
+        max_workers: int | None = None,
+        typed: bool = True,
+        price_table: PriceTable | None = None,
+    ) -> None:
         self._csv_path = Path(csv_path)
+        self._max_workers = max_workers
+        self._typed = typed
+        self._price_table = price_table
+
+    @property
+    def price_table(self) -> PriceTable:
+        """Return the price table used for the ``cost`` column (the configured one by default)."""
+
+        return self._price_table if self._price_table is not None else default_price_table()
 
     def get_events(self) -> list[UsageEventDTO]:
         """Load events from the configured CSV file."""
-        dataframe = self._load_dataframe(self._csv_path)
-        return [self._row_to_dto(row) for row in dataframe.to_dict(orient="records")]
+        with DATASET_LOAD_DURATION.time():
+            with phase("csv_parse"):
+                dataframe = self._load_dataframe(self._csv_path)
+            with phase("dto_build"):
+                return [self._row_to_dto(row) for row in dataframe.to_dict(orient="records")]
 
-    @staticmethod
-    def _load_dataframe(csv_path: Path) -> pd.DataFrame:
-        dataframe = pd.read_csv(csv_path)
-        missing_columns = set(_COLUMN_MAPPING) - set(dataframe.columns)
-        if missing_columns:
-            missing = ", ".join(sorted(missing_columns))
-            raise ValueError(f"CSV file {csv_path} is missing required columns: {missing}")
+    def get_dataframe(self, columns: Sequence[str] | None = None) -> pd.DataFrame:
+        """Load events as a normalised dataframe without building per-row DTOs.
+
+        With ``columns`` only those columns (plus whatever ``cost`` is derived
+        from, if requested) are read from the export.
+        """
+
+        if self._csv_path is None:
+            dataframe = events_to_dataframe(self.get_events(), self.price_table)
+            return dataframe if columns is None else dataframe[list(columns)]
+
+        with DATASET_LOAD_DURATION.time(), phase("csv_parse"):
+            return self._load_dataframe(self._csv_path, columns)
+
+    def iter_dataframes(self, columns: Sequence[str] | None = None) -> Iterator[pd.DataFrame]:
+        """Yield the dataset as a sequence of normalised frames.
+
+        The base repository yields a single frame; chunked repositories yield
+        bounded slices so that callers can filter without materialising
+        everything at once.
+        """
+
+        yield self.get_dataframe(columns)
+
+    def get_daily_rollup(self) -> pd.DataFrame:
+        """Return token and request sums per UTC day, user and model."""
+
+        return build_daily_rollup(self.get_dataframe())
+
+    def get_columnar_table(self) -> ColumnarTable | None:
+        """Return the memory-mapped events table backing this repository, if there is one."""
 
-        dataframe = dataframe.rename(columns=_COLUMN_MAPPING)
-        dataframe["date"] = pd.to_datetime(dataframe["date"], utc=True)
+        return None
 
-        # Handle NaN values in requests column - fill with 0 for errored requests
-        dataframe["requests"] = dataframe["requests"].fillna(0).astype(int)
-        return dataframe
+    def source_key(self) -> str | None:
+        """Return the CSV file or directory this repository reads, as a cache key.
+
+        ``None`` for repositories without a source (such as test doubles),
+        whose results are never cached across instances.
+        """
+
+        return str(self._csv_path) if self._csv_path is not None else None
+
+    def dataset_version(self) -> str:
+        """Return a cheap fingerprint that changes whenever the CSV or the price table changes."""
+
+        if not self._csv_path.is_dir():
+            stat = self._csv_path.stat()
+            fingerprint = f"{self._csv_path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+        else:
+            parts = [str(self._csv_path.resolve())]
+            for path in list_usage_files(self._csv_path):
+                stat = path.stat()
+                parts.append(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}")
+            fingerprint = "|".join(parts)
+        fingerprint += f"|prices:{self.price_table.fingerprint}"
+        return hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()[:16]
+
+    def _load_dataframe(self, csv_path: Path, columns: Sequence[str] | None = None) -> pd.DataFrame:
+        return load_usage_frame(csv_path, self._max_workers, self._typed, self.price_table, columns)
 
     @staticmethod
     def _row_to_dto(row: dict[str, Any]) -> UsageEventDTO:
@@ -74,3 +198,276 @@ class CSVUsageRepository:
             total_tokens=safe_int(row["total_tokens"]),
             requests=safe_int(row["requests"]),
         )
+
+
+def list_usage_files(path: str | Path) -> list[Path]:
+    """Return the usage exports at ``path``: the file itself, or a directory's exports sorted by name."""
+
+    path = Path(path)
+    if not path.is_dir():
+        return [path]
+    files = sorted(child for child in path.iterdir() if child.is_file() and child.name.endswith(USAGE_FILE_SUFFIXES))
+    if not files:
+        raise FileNotFoundError(f"No usage exports ({', '.join(USAGE_FILE_SUFFIXES)}) found in {path}")
+    return files
+
+
+def append_usage_rows(path: str | Path, rows: pd.DataFrame | Iterable[pd.DataFrame]) -> Path:
+    """Add raw export ``rows`` (export column names) to the dataset at ``path`` and return the file written.
+
+    ``rows`` may be one dataframe or an iterable of chunks, which are written
+    one at a time. A directory receives them as a new export; a plain CSV is
+    copied and gets them appended under its existing header. Either way the
+    result is written next to its target and renamed into place once
+    complete, so readers never see a partial file and a failed upload leaves
+    the dataset untouched. Compressed single-file exports cannot be appended
+    to and raise :class:`ValueError`.
+    """
+
+    path = Path(path)
+    chunks = [rows] if isinstance(rows, pd.DataFrame) else rows
+    if path.is_dir():
+        target = path / f"upload-{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:8]}.csv"
+        staging = path / f".{target.name}.tmp"
+        try:
+            first = True
+            for chunk in chunks:
+                chunk.to_csv(staging, mode="w" if first else "a", header=first, index=False)
+                first = False
+            if first:
+                pd.DataFrame(columns=EXPORT_COLUMNS).to_csv(staging, index=False)
+            os.replace(staging, target)
+        except BaseException:
+            staging.unlink(missing_ok=True)
+            raise
+        return target
+    if path.suffix != ".csv":
+        raise ValueError(f"Cannot append rows to compressed export {path}; configure a directory instead")
+
+    header = pd.read_csv(path, nrows=0).columns
+    staging = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        shutil.copyfile(path, staging)
+        with staging.open("rb") as handle:
+            handle.seek(-1, os.SEEK_END)
+            ends_with_newline = handle.read(1) == b"\n"
+        with staging.open("a", encoding="utf-8", newline="") as handle:
+            if not ends_with_newline:
+                handle.write("\n")
+            for chunk in chunks:
+                chunk.reindex(columns=header).to_csv(handle, header=False, index=False, lineterminator="\n")
+        os.replace(staging, path)
+    except BaseException:
+        staging.unlink(missing_ok=True)
+        raise
+    return path
+
+
+def usage_columns_for(columns: Sequence[str] | None) -> list[str]:
+    """Return the export columns to read to produce the normalised ``columns``, in schema order."""
+
+    if columns is None:
+        return list(USAGE_COLUMNS)
+    unknown = set(columns) - set(EVENT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown usage columns: {', '.join(sorted(unknown))}")
+    needed = set(columns) | (set(COST_INPUT_COLUMNS) if COST_COLUMN in columns else set())
+    return [column for column in USAGE_COLUMNS if column in needed]
+
+
+def read_usage_file(
+    path: Path,
+    typed: bool = True,
+    price_table: PriceTable | None = None,
+    columns: Sequence[str] | None = None,
+) -> pd.DataFrame:
+    """Parse and normalise one export, optionally only the normalised ``columns``.
+
+    The typed mode reads only the needed columns with an explicit dtype
+    schema and a fixed timestamp format, using the multithreaded pyarrow
+    engine when it is installed. Files it cannot handle (unexpected values,
+    missing columns) fall back to pandas inference, which also produces the
+    descriptive validation errors.
+    """
+
+    if typed:
+        sources = [raw for raw, column in _COLUMN_MAPPING.items() if column in usage_columns_for(columns)]
+        try:
+            frame = pd.read_csv(
+                path,
+                engine="pyarrow" if PYARROW_AVAILABLE else "c",
+                usecols=sources,
+                dtype={raw: CSV_DTYPES[raw] for raw in sources},
+            )
+            return normalize_usage_frame(
+                frame, path, date_format=CSV_DATE_FORMAT, price_table=price_table, columns=columns
+            )
+        except (ValueError, TypeError):
+            pass
+    return normalize_usage_frame(pd.read_csv(path), path, price_table=price_table, columns=columns)
+
+
+def load_usage_frame(
+    path: str | Path,
+    max_workers: int | None = None,
+    typed: bool = True,
+    price_table: PriceTable | None = None,
+    columns: Sequence[str] | None = None,
+) -> pd.DataFrame:
+    """Read and normalise every export at ``path``, optionally only the normalised ``columns``.
+
+    Compression is inferred from the file suffix and decoded while parsing,
+    so compressed exports never touch the disk uncompressed. Several files are
+    parsed on a thread pool; zlib and the C parser release the GIL for most of
+    the work.
+    """
+
+    files = list_usage_files(path)
+    if len(files) == 1:
+        return read_usage_file(files[0], typed, price_table, columns)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        frames = list(executor.map(lambda file: read_usage_file(file, typed, price_table, columns), files))
+    return pd.concat(frames, ignore_index=True)
+
+
+def iter_usage_chunks(path: str | Path, chunk_rows: int) -> Iterator[tuple[Path, pd.DataFrame]]:
+    """Yield raw ``(file, chunk)`` pairs of at most ``chunk_rows`` rows from every export at ``path``.
+
+    Chunks are read with the explicit schema (the pyarrow engine cannot
+    stream chunks); a file whose header lacks the known columns is read
+    untyped so that validation reports what is missing.
+    """
+
+    for file in list_usage_files(path):
+        header = pd.read_csv(file, nrows=0).columns
+        options = {"usecols": list(CSV_DTYPES), "dtype": CSV_DTYPES} if set(CSV_DTYPES) <= set(header) else {}
+        with pd.read_csv(file, chunksize=chunk_rows, **options) as reader:
+            for chunk in reader:
+                yield file, chunk
+
+
+def normalize_usage_frame(
+    dataframe: pd.DataFrame,
+    source: str | Path,
+    date_format: str | None = None,
+    price_table: PriceTable | None = None,
+    columns: Sequence[str] | None = None,
+) -> pd.DataFrame:
+    """Validate raw CSV columns and convert them to the typed usage schema.
+
+    The result matches what the DTO path produces: UTC timestamps, string
+    dimensions and ``int64`` counters with missing values treated as zero,
+    plus a ``cost`` column priced with ``price_table`` (the configured table
+    by default).
+    ``date_format`` skips per-file format inference when the layout is known
+    (see :func:`parse_usage_dates`). With ``columns`` only the export
+    columns those need are validated and converted, and the result holds
+    exactly ``columns``.
+    """
+
+    needed = usage_columns_for(columns)
+    missing_columns = {raw for raw, column in _COLUMN_MAPPING.items() if column in needed} - set(dataframe.columns)
+    if missing_columns:
+        missing = ", ".join(sorted(missing_columns))
+        raise ValueError(f"CSV file {source} is missing required columns: {missing}")
+
+    dataframe = dataframe.rename(columns=_COLUMN_MAPPING)[needed]
+    if "date" in needed:
+        dataframe["date"] = parse_usage_dates(dataframe["date"], date_format)
+    for column in DIMENSION_COLUMNS:
+        if column in needed and (dataframe[column].dtype != object or dataframe[column].hasnans):
+            dataframe[column] = dataframe[column].astype(str)
+
+    # Handle NaN values in counters (errored requests have no "Requests" value)
+    counters = [column for column in NUMERIC_COLUMNS if column in needed]
+    dataframe[counters] = dataframe[counters].fillna(0).astype("int64")
+    if columns is None or COST_COLUMN in columns:
+        dataframe[COST_COLUMN] = (price_table or default_price_table()).compute_cost(dataframe)
+    return dataframe if columns is None else dataframe[list(columns)]
+
+
+def parse_usage_dates(values: pd.Series, date_format: str | None = None) -> pd.Series:
+    """Parse export timestamps into ``datetime64[ns, UTC]``.
+
+    With :data:`CSV_DATE_FORMAT` the UTC "Z" suffix is stripped and numpy's
+    ISO 8601 parser handles the rest, roughly twice as fast as pandas format
+    inference. Values that do not follow the format fall back to inference.
+    """
+
+    if date_format == CSV_DATE_FORMAT:
+        parsed = _parse_zulu_timestamps(values)
+        if parsed is not None:
+            return parsed
+    elif date_format is not None:
+        try:
+            return pd.to_datetime(values, utc=True, format=date_format)
+        except ValueError:
+            pass
+    return pd.to_datetime(values, utc=True)
+
+
+def _parse_zulu_timestamps(values: pd.Series) -> pd.Series | None:
+    stripped: list[str] = []
+    for value in values.to_numpy():
+        if not isinstance(value, str) or not value.endswith("Z"):
+            return None
+        stripped.append(value[:-1])
+    try:
+        parsed = np.array(stripped, dtype="datetime64[ns]")
+    except ValueError:
+        return None
+    return pd.Series(parsed, index=values.index).dt.tz_localize("UTC")
+
+
+def events_to_dataframe(events: list[UsageEventDTO], price_table: PriceTable | None = None) -> pd.DataFrame:
+    """Convert DTOs into the normalised usage dataframe, including the ``cost`` column."""
+
+    if not events:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+
+    with phase("frame_build"):
+        dataframe = pd.DataFrame.from_records(
+            (event.model_dump(mode="python") if hasattr(event, "model_dump") else event.dict() for event in events),
+            columns=USAGE_COLUMNS,
+        )
+    dataframe[COST_COLUMN] = (price_table or default_price_table()).compute_cost(dataframe)
+    return dataframe
+
+
+ROLLUP_KEYS = ["date", "user", "model"]
+ROLLUP_MEASURES = [*NUMERIC_COLUMNS, COST_COLUMN, "events"]
+
+
+def build_daily_rollup(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """Sum counters per UTC day, user and model; ``date`` holds midnight UTC timestamps."""
+
+    if dataframe.empty:
+        return pd.DataFrame(
+            {
+                "date": pd.Series(dtype="datetime64[ns, UTC]"),
+                "user": pd.Series(dtype=object),
+                "model": pd.Series(dtype=object),
+                **{
+                    measure: pd.Series(dtype="float64" if measure == COST_COLUMN else "int64")
+                    for measure in ROLLUP_MEASURES
+                },
+            }
+        )
+
+    with phase("rollup"):
+        return (
+            dataframe.assign(date=dataframe["date"].dt.floor("D"), events=1)
+            .groupby(ROLLUP_KEYS, as_index=False, observed=True, sort=True)[ROLLUP_MEASURES]
+            .sum()
+        )
+
+
+def merge_daily_rollups(*rollups: pd.DataFrame) -> pd.DataFrame:
+    """Combine rollups of disjoint row sets into the rollup of their union."""
+
+    return (
+        pd.concat(rollups, ignore_index=True)
+        .groupby(ROLLUP_KEYS, as_index=False, observed=True, sort=True)[ROLLUP_MEASURES]
+        .sum()
+    )
@@ -0,0 +1,368 @@
+"""Process-wide cache of loaded usage datasets bounded by a memory budget."""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from app.dto.usage_event import UsageEventDTO
+from app.observability.memory import deep_sizeof, frame_memory
+from app.observability.metrics import CACHE_REQUESTS, DATASET_EVICTIONS, DATASET_LOADS, DATASET_RESIDENT_BYTES
+from app.repositories.chunked_csv_usage_repository import (
+    DEFAULT_CHUNK_ROWS,
+    ChunkedCSVUsageRepository,
+    PublishedStoreRepository,
+)
+from app.repositories.columnar_store import ColumnarTable
+from app.repositories.csv_usage_repository import CSVUsageRepository, build_daily_rollup, merge_daily_rollups
+
+
+class UnknownDatasetError(KeyError):
+    """Raised when a dataset id is not present in the configuration."""
+
+
+def frame_nbytes(dataframe: pd.DataFrame | None) -> int:
+    """Return the memory held by a dataframe's columns, including string payloads."""
+
+    if dataframe is None:
+        return 0
+    return int(dataframe.memory_usage(index=True, deep=True).sum())
+
+
+@dataclass(frozen=True)
+class LoadedDataset:
+    """Everything the service needs from one dataset version, held in memory."""
+
+    dataset_id: str
+    version: str
+    rollup: pd.DataFrame
+    dataframe: pd.DataFrame | None = None
+    table: ColumnarTable | None = None
+
+    @cached_property
+    def nbytes(self) -> int:
+        # Measured once per load. Memory-mapped columns live in the page
+        # cache, not in this process's heap, so only materialised frames count
+        # against the budget.
+        return frame_nbytes(self.dataframe) + frame_nbytes(self.rollup)
+
+
+class LoadedDatasetRepository(CSVUsageRepository):
+    """Repository view over a :class:`LoadedDataset` that never touches the CSV again."""
+
+    def __init__(self, loaded: LoadedDataset, source: CSVUsageRepository) -> None:
+        self._loaded = loaded
+        self._source = source
+
+    def get_events(self) -> list[UsageEventDTO]:
+        """Build DTOs from the cached rows."""
+
+        return [self._row_to_dto(row) for row in self.get_dataframe().to_dict(orient="records")]
+
+    def get_dataframe(self, columns: Sequence[str] | None = None) -> pd.DataFrame:
+        """Return the cached frame, or materialise rows from the columnar store."""
+
+        if self._loaded.dataframe is not None:
+            return self._loaded.dataframe if columns is None else self._loaded.dataframe[list(columns)]
+        return self._source.get_dataframe(columns)
+
+    def iter_dataframes(self, columns: Sequence[str] | None = None) -> Iterator[pd.DataFrame]:
+        if self._loaded.dataframe is not None:
+            yield self.get_dataframe(columns)
+        else:
+            yield from self._source.iter_dataframes(columns)
+
+    def get_daily_rollup(self) -> pd.DataFrame:
+        return self._loaded.rollup
+
+    def get_columnar_table(self) -> ColumnarTable | None:
+        return self._loaded.table
+
+    def source_key(self) -> str | None:
+        return self._source.source_key()
+
+    def dataset_version(self) -> str:
+        return self._loaded.version
+
+
+class LazyDatasetRepository(CSVUsageRepository):
+    """Repository that loads its dataset through a :class:`DatasetRegistry` on first data access.
+
+    The source key and version come from the source itself, so requests
+    answered from snapshots or cached results never load the dataset.
+    """
+
+    def __init__(self, registry: DatasetRegistry, dataset_id: str) -> None:
+        self._registry = registry
+        self._dataset_id = dataset_id
+        self._source = registry.source_repository(dataset_id)
+        self._loaded_repository: CSVUsageRepository | None = None
+
+    def get_events(self) -> list[UsageEventDTO]:
+        return self._repository().get_events()
+
+    def get_dataframe(self, columns: Sequence[str] | None = None) -> pd.DataFrame:
+        return self._repository().get_dataframe(columns)
+
+    def iter_dataframes(self, columns: Sequence[str] | None = None) -> Iterator[pd.DataFrame]:
+        return self._repository().iter_dataframes(columns)
+
+    def get_daily_rollup(self) -> pd.DataFrame:
+        return self._repository().get_daily_rollup()
+
+    def get_columnar_table(self) -> ColumnarTable | None:
+        return self._repository().get_columnar_table()
+
+    def source_key(self) -> str | None:
+        return self._source.source_key()
+
+    def dataset_version(self) -> str:
+        # Once loaded, report the version actually being served.
+        if self._loaded_repository is not None:
+            return self._loaded_repository.dataset_version()
+        return self._source.dataset_version()
+
+    def _repository(self) -> CSVUsageRepository:
+        if self._loaded_repository is None:
+            self._loaded_repository = self._registry.repository(self._dataset_id)
+        return self._loaded_repository
+
+
+class DatasetRegistry:
+    """Map dataset ids to CSV sources and keep recently used ones loaded.
+
+    Loaded datasets are kept in least-recently-used order and evicted once
+    their combined size, measured from the actual column buffers, exceeds
+    ``memory_budget_bytes``. The dataset being served is never evicted, so a
+    single dataset larger than the budget is still answered. A changed source
+    file (new dataset version) triggers a reload on the next access.
+
+    With ``attach_only`` the registry never reads the CSV itself: it follows
+    the version header published into ``store_dir`` by a loader process and
+    maps each newly published version, which lets many worker processes share
+    one ingested copy of the data.
+    """
+
+    def __init__(
+        self,
+        sources: Mapping[str, str | Path],
+        memory_budget_bytes: int,
+        store_dir: str | Path | None = None,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+        attach_only: bool = False,
+    ) -> None:
+        if memory_budget_bytes < 0:
+            raise ValueError("memory_budget_bytes must not be negative")
+        if attach_only and store_dir is None:
+            raise ValueError("attach_only requires a store_dir")
+        self._sources = {dataset_id: Path(path) for dataset_id, path in sources.items()}
+        self._memory_budget_bytes = memory_budget_bytes
+        self._store_dir = Path(store_dir) if store_dir is not None else None
+        self._chunk_rows = chunk_rows
+        self._attach_only = attach_only
+        self._loaded: OrderedDict[str, LoadedDataset] = OrderedDict()
+        self._evicted: set[str] = set()
+        self._lock = threading.Lock()
+        self._load_locks = {dataset_id: threading.Lock() for dataset_id in self._sources}
+
+    def dataset_ids(self) -> list[str]:
+        """Return the configured dataset ids."""
+
+        return list(self._sources)
+
+    @property
+    def attach_only(self) -> bool:
+        """Whether datasets are only mapped from versions another process publishes."""
+
+        return self._attach_only
+
+    def source_path(self, dataset_id: str) -> Path:
+        """Return the CSV file or directory configured for ``dataset_id``."""
+
+        try:
+            return self._sources[dataset_id]
+        except KeyError:
+            raise UnknownDatasetError(dataset_id) from None
+
+    def source_repository(self, dataset_id: str) -> CSVUsageRepository:
+        """Return a fresh repository reading the dataset's source directly."""
+
+        csv_path = self.source_path(dataset_id)
+        if self._store_dir is None:
+            return CSVUsageRepository(csv_path)
+        if self._attach_only:
+            return PublishedStoreRepository(csv_path, self._store_dir, self._chunk_rows)
+        return ChunkedCSVUsageRepository(csv_path, self._store_dir, self._chunk_rows)
+
+    def repository(self, dataset_id: str) -> CSVUsageRepository:
+        """Return a repository for the current version of ``dataset_id``, loading it if needed."""
+
+        source = self.source_repository(dataset_id)
+        version = source.dataset_version()
+
+        with self._load_locks[dataset_id]:
+            with self._lock:
+                loaded = self._loaded.get(dataset_id)
+                if loaded is not None and loaded.version == version:
+                    self._loaded.move_to_end(dataset_id)
+                    CACHE_REQUESTS.inc(cache="dataset", result="hit")
+                    return LoadedDatasetRepository(loaded, source)
+                reason = self._load_reason(dataset_id, loaded)
+            CACHE_REQUESTS.inc(cache="dataset", result="miss")
+
+            # Parse outside the registry lock so other datasets stay servable.
+            loaded = self._load(dataset_id, version, source)
+            DATASET_LOADS.inc(dataset=dataset_id, reason=reason)
+            with self._lock:
+                self._loaded[dataset_id] = loaded
+                self._loaded.move_to_end(dataset_id)
+                self._evicted.discard(dataset_id)
+                self._enforce_budget(keep=dataset_id)
+            return LoadedDatasetRepository(loaded, source)
+
+    def lazy_repository(self, dataset_id: str) -> LazyDatasetRepository:
+        """Return a repository that only loads ``dataset_id`` once its data is first read."""
+
+        return LazyDatasetRepository(self, dataset_id)
+
+    def holds_dataframe(self, dataset_id: str) -> bool:
+        """Whether ``dataset_id`` is currently held in memory as a dataframe that :meth:`merge` can extend."""
+
+        with self._lock:
+            loaded = self._loaded.get(dataset_id)
+            return loaded is not None and loaded.dataframe is not None
+
+    def merge(
+        self,
+        dataset_id: str,
+        events: pd.DataFrame | None,
+        persist: Callable[[], None],
+        rows_path: str | Path | None = None,
+    ) -> str:
+        """Persist new rows with ``persist`` and fold them into the loaded dataset.
+
+        ``events`` are the normalised rows that ``persist`` writes to the
+        dataset's source, and ``rows_path`` the same rows as an export file.
+        When the current version is held in memory as a dataframe, it is
+        replaced by its concatenation with ``events`` under the new version
+        and its rollup is updated from ``events`` alone. Store-backed datasets
+        store the new version as the previous one plus ``rows_path``, parsing
+        only those rows. Either way the next access is a cache hit rather than
+        a reload; otherwise (not loaded, or nothing to fold in) the dataset is
+        loaded from the source as usual. Returns the new dataset version.
+        """
+
+        source = self.source_repository(dataset_id)
+        with self._load_locks[dataset_id]:
+            previous_version = source.dataset_version()
+            persist()
+            version = source.dataset_version()
+            if isinstance(source, ChunkedCSVUsageRepository):
+                if rows_path is None or not source.extend(previous_version, rows_path):
+                    return version
+                with self._lock:
+                    loaded = self._loaded.get(dataset_id)
+                if loaded is None or loaded.version != previous_version:
+                    return version
+                # The new version is stored already: this only maps it.
+                merged = self._load(dataset_id, version, source)
+            else:
+                with self._lock:
+                    loaded = self._loaded.get(dataset_id)
+                if events is None or loaded is None or loaded.version != previous_version or loaded.dataframe is None:
+                    return version
+                merged = LoadedDataset(
+                    dataset_id,
+                    version,
+                    merge_daily_rollups(loaded.rollup, build_daily_rollup(events)),
+                    dataframe=pd.concat([loaded.dataframe, events], ignore_index=True),
+                )
+            with self._lock:
+                self._loaded[dataset_id] = merged
+                self._loaded.move_to_end(dataset_id)
+                self._enforce_budget(keep=dataset_id)
+            DATASET_LOADS.inc(dataset=dataset_id, reason="merge")
+            return version
+
+    def stats(self) -> list[dict[str, object]]:
+        """Describe each configured dataset and whether it is currently loaded."""
+
+        with self._lock:
+            loaded = dict(self._loaded)
+        return [
+            {
+                "dataset": dataset_id,
+                "loaded": dataset_id in loaded,
+                "version": loaded[dataset_id].version if dataset_id in loaded else None,
+                "bytes": loaded[dataset_id].nbytes if dataset_id in loaded else 0,
+            }
+            for dataset_id in self._sources
+        ]
+
+    def memory_usage(self, dto_sample_rows: int = 1000) -> list[dict[str, Any]]:
+        """Break down the memory of each loaded dataset by frame, column and index.
+
+        ``events_dto_bytes`` estimates what ``get_events()`` would allocate for
+        the whole dataset, extrapolated from DTOs built for the first
+        ``dto_sample_rows`` rows.
+        """
+
+        with self._lock:
+            loaded = list(self._loaded.values())
+        report = []
+        for dataset in loaded:
+            entry: dict[str, Any] = {
+                "dataset": dataset.dataset_id,
+                "version": dataset.version,
+                "bytes": dataset.nbytes,
+                "rollup": frame_memory(dataset.rollup),
+            }
+            if dataset.dataframe is not None:
+                entry["dataframe"] = frame_memory(dataset.dataframe)
+                rows, sample = len(dataset.dataframe), dataset.dataframe.head(dto_sample_rows)
+            else:
+                entry["table"] = dataset.table.memory_usage()
+                rows, sample = dataset.table.rows, dataset.table.read(start=0, stop=dto_sample_rows, categorical=False)
+            dtos = [CSVUsageRepository._row_to_dto(row) for row in sample.to_dict(orient="records")]
+            entry["events_dto_bytes"] = int(deep_sizeof(dtos) / len(dtos) * rows) if dtos else 0
+            report.append(entry)
+        return report
+
+    @property
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(loaded.nbytes for loaded in self._loaded.values())
+
+    def _load_reason(self, dataset_id: str, loaded: LoadedDataset | None) -> str:
+        if loaded is not None:
+            return "version_change"
+        if dataset_id in self._evicted:
+            return "after_eviction"
+        return "initial"
+
+    @staticmethod
+    def _load(dataset_id: str, version: str, source: CSVUsageRepository) -> LoadedDataset:
+        table = source.get_columnar_table()
+        if table is not None:
+            return LoadedDataset(dataset_id, version, source.get_daily_rollup(), table=table)
+        dataframe = source.get_dataframe()
+        return LoadedDataset(dataset_id, version, build_daily_rollup(dataframe), dataframe=dataframe)
+
+    def _enforce_budget(self, keep: str) -> None:
+        resident = sum(loaded.nbytes for loaded in self._loaded.values())
+        for dataset_id in list(self._loaded):
+            if resident <= self._memory_budget_bytes:
+                break
+            if dataset_id == keep:
+                continue
+            resident -= self._loaded.pop(dataset_id).nbytes
+            self._evicted.add(dataset_id)
+            DATASET_EVICTIONS.inc(dataset=dataset_id)
+        DATASET_RESIDENT_BYTES.set(resident)
@@ -0,0 +1,131 @@
+"""Model price table and vectorised per-row cost computation."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from collections.abc import Iterable, Mapping
+from dataclasses import astuple, dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from app.settings import resolve_price_table_path
+
+
+WILDCARD = "*"
+
+# Token counters in the order of ModelPrice's rate fields.
+PRICED_TOKEN_COLUMNS = ["input_without_cache", "input_with_cache", "cache_read", "output_tokens"]
+
+
+@dataclass(frozen=True)
+class ModelPrice:
+    """Rates in currency per ``unit_tokens`` tokens."""
+
+    input: float
+    cache_write: float
+    cache_read: float
+    output: float
+
+
+_FREE = ModelPrice(0.0, 0.0, 0.0, 0.0)
+
+
+class PriceTable:
+    """Prices keyed by ``(model, max_mode)`` with ``"*"`` wildcards.
+
+    Lookups prefer the exact pair, then the model with any max mode, then any
+    model with the given max mode, then the ``("*", "*")`` default. Rows of a
+    kind listed in ``free_kinds`` (errored requests) cost nothing, and so do
+    models with no matching entry.
+    """
+
+    def __init__(
+        self,
+        prices: Mapping[tuple[str, str], ModelPrice],
+        free_kinds: Iterable[str] = (),
+        unit_tokens: int = 1_000_000,
+        currency: str = "USD",
+    ) -> None:
+        if unit_tokens <= 0:
+            raise ValueError("unit_tokens must be positive")
+        self._prices = dict(prices)
+        self._free_kinds = frozenset(free_kinds)
+        self.unit_tokens = unit_tokens
+        self.currency = currency
+
+    @classmethod
+    def from_dict(cls, document: Mapping[str, Any]) -> PriceTable:
+        prices: dict[tuple[str, str], ModelPrice] = {}
+        for entry in document.get("prices", []):
+            try:
+                key = (str(entry.get("model", WILDCARD)), str(entry.get("max_mode", WILDCARD)))
+                prices[key] = ModelPrice(
+                    float(entry["input"]), float(entry["cache_write"]), float(entry["cache_read"]), float(entry["output"])
+                )
+            except (KeyError, TypeError, ValueError) as exc:
+                raise ValueError(f"Invalid price entry {entry!r}") from exc
+        return cls(
+            prices,
+            free_kinds=document.get("free_kinds", ()),
+            unit_tokens=int(document.get("unit_tokens", 1_000_000)),
+            currency=str(document.get("currency", "USD")),
+        )
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> PriceTable:
+        return cls.from_dict(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    @property
+    def fingerprint(self) -> str:
+        """Short hash of the table contents; part of the dataset version so costs never go stale."""
+
+        document = {
+            "currency": self.currency,
+            "unit_tokens": self.unit_tokens,
+            "free_kinds": sorted(self._free_kinds),
+            "prices": sorted([*key, *astuple(price)] for key, price in self._prices.items()),
+        }
+        return hashlib.sha1(json.dumps(document, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    def price_for(self, model: str, max_mode: str) -> ModelPrice:
+        for key in ((model, max_mode), (model, WILDCARD), (WILDCARD, max_mode), (WILDCARD, WILDCARD)):
+            price = self._prices.get(key)
+            if price is not None:
+                return price
+        return _FREE
+
+    def compute_cost(self, dataframe: pd.DataFrame) -> np.ndarray:
+        """Return the cost of every row as ``float64``.
+
+        Rates are resolved once per distinct ``(model, max_mode)`` pair and
+        broadcast back to rows through the factorised codes, so the per-row
+        work is a handful of vectorised multiply-adds.
+        """
+
+        if dataframe.empty:
+            return np.zeros(0, dtype="float64")
+
+        codes, pairs = pd.factorize(pd.MultiIndex.from_arrays([dataframe["model"], dataframe["max_mode"]]))
+        rates = np.array([astuple(self.price_for(str(model), str(max_mode))) for model, max_mode in pairs], dtype="float64")
+        tokens = dataframe[PRICED_TOKEN_COLUMNS].to_numpy(dtype="float64")
+        cost = np.einsum("ij,ij->i", tokens, rates.reshape(-1, len(PRICED_TOKEN_COLUMNS))[codes]) / self.unit_tokens
+        if self._free_kinds:
+            cost[dataframe["kind"].isin(self._free_kinds).to_numpy()] = 0.0
+        return cost
+
+
+@lru_cache(maxsize=4)
+def _load_price_table(path: Path, mtime_ns: int) -> PriceTable:
+    return PriceTable.from_file(path)
+
+
+def default_price_table() -> PriceTable:
+    """Return the configured price table, re-read whenever its file changes."""
+
+    path = resolve_price_table_path().resolve()
+    return _load_price_table(path, path.stat().st_mtime_ns)
@@ -0,0 +1,164 @@
+"""Coordination of several worker processes around one columnar store.
+
+The store already keeps each dataset version in its own immutable directory
+whose columns are memory-mapped, so every process reading it shares a single
+copy through the OS page cache. This module adds what multiple workers need
+on top of that:
+
+* an inter-process lock so that only one process ingests a given version
+  while the others wait and then map the result;
+* a small version header per source, rewritten atomically after each
+  ingestion, from which attach-only workers learn the current version
+  without fingerprinting or parsing the CSV themselves;
+* a shared "reader" lock per version, held by every open table of it, so
+  that superseded versions are only deleted once no process maps them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Any
+
+try:  # pragma: no cover - platform dependent
+    import fcntl
+except ImportError:  # pragma: no cover - platform dependent
+    fcntl = None
+
+
+HEADERS_DIR = "current"
+LOCKS_DIR = "locks"
+# Versions of a source kept on publish besides the new one: the one it replaces,
+# which workers that have not switched yet may still be about to map.
+KEPT_PREVIOUS_VERSIONS = 1
+
+
+def source_key(csv_path: str | Path) -> str:
+    """Return a stable file-name-safe key for a dataset source."""
+
+    return hashlib.sha1(str(Path(csv_path).resolve()).encode("utf-8")).hexdigest()[:16]
+
+
+@contextmanager
+def ingest_lock(store_root: str | Path, name: str) -> Iterator[None]:
+    """Hold an exclusive inter-process lock named ``name`` under ``store_root``.
+
+    Uses ``flock``, which the OS releases if the holder dies; on platforms
+    without it the lock is a no-op and concurrent ingestions simply race to
+    publish the same immutable table.
+    """
+
+    if fcntl is None:  # pragma: no cover - platform dependent
+        yield
+        return
+    lock_path = Path(store_root) / LOCKS_DIR / f"{name}.lock"
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with lock_path.open("a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def publish_version(store_root: str | Path, csv_path: str | Path, version: str, rows: int) -> dict[str, Any]:
+    """Atomically point the version header of ``csv_path`` at an ingested ``version``.
+
+    Older versions of the same source, other than the one replaced, are then
+    deleted unless a process still has them open (see :func:`prune_versions`).
+    """
+
+    previous = read_version_header(store_root, csv_path)
+    header = {"source": str(Path(csv_path).resolve()), "dataset_version": version, "rows": rows, "published_at": time.time()}
+    path = Path(store_root) / HEADERS_DIR / f"{source_key(csv_path)}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    staging = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    staging.write_text(json.dumps(header), encoding="utf-8")
+    os.replace(staging, path)
+    kept = {version}
+    if previous is not None and KEPT_PREVIOUS_VERSIONS:
+        kept.add(previous["dataset_version"])
+    prune_versions(store_root, csv_path, kept)
+    return header
+
+
+def read_version_header(store_root: str | Path, csv_path: str | Path) -> dict[str, Any] | None:
+    """Return the published header for ``csv_path``, or ``None`` if nothing was published yet."""
+
+    path = Path(store_root) / HEADERS_DIR / f"{source_key(csv_path)}.json"
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def pin_version(store_root: str | Path, version: str) -> IO[str] | None:
+    """Take a shared reader lock on ``version`` and return the handle that holds it.
+
+    The lock lasts until the handle is closed or garbage collected, and keeps
+    :func:`remove_version` from deleting the version meanwhile. Returns
+    ``None`` on platforms without ``flock``.
+    """
+
+    if fcntl is None:  # pragma: no cover - platform dependent
+        return None
+    lock_path = Path(store_root) / LOCKS_DIR / f"{version}.readers.lock"
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    handle = lock_path.open("a")
+    fcntl.flock(handle, fcntl.LOCK_SH)
+    return handle
+
+
+def remove_version(store_root: str | Path, version: str) -> bool:
+    """Delete the directory of ``version`` unless a reader has it pinned; return whether it was deleted."""
+
+    if fcntl is None:  # pragma: no cover - platform dependent
+        return False
+    lock_path = Path(store_root) / LOCKS_DIR / f"{version}.readers.lock"
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with lock_path.open("a") as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        try:
+            shutil.rmtree(Path(store_root) / version, ignore_errors=True)
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+    return True
+
+
+def stored_versions(store_root: str | Path, csv_path: str | Path) -> list[str]:
+    """Return the versions of ``csv_path`` present in the store, according to their manifests."""
+
+    source = Path(csv_path).resolve()
+    versions = []
+    for directory in Path(store_root).iterdir():
+        if directory.name in (HEADERS_DIR, LOCKS_DIR) or directory.name.startswith(".") or not directory.is_dir():
+            continue
+        try:
+            manifest = json.loads((directory / "events" / "manifest.json").read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            continue
+        if Path(manifest.get("metadata", {}).get("source", "")).resolve() == source:
+            versions.append(directory.name)
+    return versions
+
+
+def prune_versions(store_root: str | Path, csv_path: str | Path, keep: set[str]) -> list[str]:
+    """Delete the stored versions of ``csv_path`` not in ``keep`` that nobody has pinned; return them.
+
+    Pinned versions are left alone and retried by the next call.
+    """
+
+    return [
+        version
+        for version in stored_versions(store_root, csv_path)
+        if version not in keep and remove_version(store_root, version)
+    ]
@@ -1,5 +1,6 @@
 """Router exports for the application."""
 
+from .admin import admin_router
 from .analytics import analytics_router
 
-__all__ = ["analytics_router"]
+__all__ = ["admin_router", "analytics_router"]
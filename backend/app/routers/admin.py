@@ -0,0 +1,90 @@
+"""API router with operational endpoints for sizing and profiling the backend."""
+
+from __future__ import annotations
+
+import tracemalloc
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.compression import EncodedPayloadCache
+from app.observability.memory import ALLOCATION_PROFILER, current_rss_bytes, peak_rss_bytes
+from app.repositories import DatasetRegistry
+from app.routers.analytics import (
+    get_anomaly_detector,
+    get_dataset_registry,
+    get_encoded_payloads,
+    get_result_cache,
+    get_series_cache,
+    get_usage_ingestor,
+)
+from app.services.anomaly_detection import AnomalyDetector
+from app.services.result_cache import ResultCache
+from app.services.rolling_series import RollingSeriesCache
+from app.services.usage_ingest import UsageIngestor
+from app.settings import resolve_allocation_profiling_enabled
+
+
+admin_router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@admin_router.get("/memory")
+def get_memory_usage(
+    registry: DatasetRegistry = Depends(get_dataset_registry),
+    result_cache: ResultCache | None = Depends(get_result_cache),
+    encoded_payloads: EncodedPayloadCache = Depends(get_encoded_payloads),
+    series_cache: RollingSeriesCache = Depends(get_series_cache),
+    anomaly_detector: AnomalyDetector = Depends(get_anomaly_detector),
+    ingestor: UsageIngestor = Depends(get_usage_ingestor),
+) -> dict[str, Any]:
+    """Report how the process memory divides between loaded datasets, caches and indexes.
+
+    Datasets are broken down per frame, column and index, with an estimate
+    of the DTO list ``get_events()`` would build; memory-mapped columns are
+    listed but live in the page cache. ``accounted_bytes`` sums what is
+    attributed here; the rest of ``rss_bytes`` is the interpreter, libraries
+    and in-flight requests.
+    """
+
+    datasets = registry.memory_usage()
+    caches = {
+        "result_cache": result_cache.memory_usage() if result_cache is not None else None,
+        "encoded_payloads": encoded_payloads.memory_usage(),
+        "rolling_series": series_cache.memory_usage(),
+        "anomaly_detector": anomaly_detector.memory_usage(),
+    }
+    indexes = {"ingest_row_hashes": ingestor.memory_usage()}
+    accounted = (
+        sum(dataset["bytes"] for dataset in datasets)
+        + sum(cache["bytes"] for cache in caches.values() if cache is not None)
+        + sum(index["bytes"] for index in indexes.values())
+    )
+    return {
+        "process": {
+            "rss_bytes": current_rss_bytes(),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "traced_bytes": tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None,
+        },
+        "datasets": datasets,
+        "caches": caches,
+        "indexes": indexes,
+        "accounted_bytes": accounted,
+        "allocation_profiling": resolve_allocation_profiling_enabled(),
+    }
+
+
+@admin_router.get("/memory/allocations")
+def list_allocation_profiles() -> list[dict[str, Any]]:
+    """Return the most recent allocation profiles, without their allocation sites."""
+
+    return ALLOCATION_PROFILER.profiles()
+
+
+@admin_router.get("/memory/allocations/{profile_id}")
+def get_allocation_profile(profile_id: str) -> dict[str, Any]:
+    """Return one allocation profile with its top allocation sites."""
+
+    profile = ALLOCATION_PROFILER.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Unknown allocation profile '{profile_id}'")
+    return profile
@@ -2,34 +2,268 @@
 
 from __future__ import annotations
 
-from os import getenv
+import asyncio
+import shutil
+import tempfile
+import threading
+from collections.abc import AsyncIterator
 from pathlib import Path
 from typing import Any
 
-from fastapi import APIRouter, Depends, Query
-from fastapi.encoders import jsonable_encoder
+import pandas as pd
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 
-from app.repositories import CSVUsageRepository
+from app.compression import IDENTITY, EncodedPayloadCache, negotiate_encoding
+from app.dto import BatchRequestDTO, ExportRequestDTO
+from app.observability import phase
+from app.observability.metrics import CACHE_REQUESTS
+from app.repositories import DatasetRegistry, UnknownDatasetError
+from app.repositories.csv_usage_repository import EVENT_COLUMNS
 from app.services import UsageAnalyticsService
+from app.services.anomaly_detection import AnomalyDetector
+from app.services.batch_queries import BatchQuery
+from app.services.dataset_changes import DatasetChange, DatasetChangeFeed, format_sse
+from app.services.downsampling import MIN_POINTS
+from app.services.export_jobs import MEDIA_TYPES, ExportJobManager, ExportQueueFullError, UnknownExportJobError
+from app.services.result_cache import ResultCache
+from app.services.rolling_series import SERIES_GROUPS, SERIES_METRICS, RollingSeriesCache
+from app.services.report_snapshots import ALL_TIME_WINDOW, ReportSnapshotStore, encode_json_payload
+from app.services.usage_ingest import IngestUnavailableError, UsageIngestor
+from app.settings import (
+    DEFAULT_DATASET_ID,
+    resolve_anomaly_ewma_alpha,
+    resolve_anomaly_min_days,
+    resolve_anomaly_z_threshold,
+    resolve_chunk_rows,
+    resolve_compression_min_bytes,
+    resolve_dataset_memory_budget,
+    resolve_dataset_paths,
+    resolve_events_poll_interval,
+    resolve_export_dir,
+    resolve_export_retention,
+    resolve_export_workers,
+    resolve_ingest_max_bytes,
+    resolve_result_cache_size,
+    resolve_result_cache_ttl,
+    resolve_snapshot_dir,
+    resolve_store_attach_only,
+    resolve_store_dir,
+)
 
 
-_DEFAULT_CSV_PATH = Path(__file__).resolve().parents[1] / "data" / "usage.csv"
+MAX_PAGE_SIZE = 10_000
+# Seconds between comment lines that keep idle update streams open through proxies.
+STREAM_KEEPALIVE_SECONDS = 15.0
 
+_registry_lock = threading.Lock()
+_registry: DatasetRegistry | None = None
+_registry_config: tuple[Any, ...] | None = None
+_result_cache: ResultCache | None = None
+_result_cache_config: tuple[int, float] | None = None
+_series_cache = RollingSeriesCache()
+_change_feed = DatasetChangeFeed()
+_anomaly_detector: AnomalyDetector | None = None
+_anomaly_detector_config: tuple[int, float] | None = None
+_usage_ingestor: UsageIngestor | None = None
+_usage_ingestor_config: int | None = None
+_export_jobs: ExportJobManager | None = None
+_export_jobs_config: tuple[Path, int, float] | None = None
+_encoded_payloads = EncodedPayloadCache()
 
-def _resolve_csv_path() -> Path:
-    """Return the CSV path configured for usage analytics."""
 
-    csv_path = getenv("USAGE_CSV_PATH")
-    if csv_path:
-        return Path(csv_path)
-    return _DEFAULT_CSV_PATH
+def get_dataset_registry() -> DatasetRegistry:
+    """Provide the process-wide :class:`DatasetRegistry` for the current configuration.
 
+    The registry is rebuilt (dropping loaded datasets) only when the
+    configuration read from the environment changes.
+    """
 
-def get_usage_analytics_service() -> UsageAnalyticsService:
-    """Provide an instance of :class:`UsageAnalyticsService`."""
+    global _registry, _registry_config
+    config = (
+        tuple(sorted(resolve_dataset_paths().items())),
+        resolve_dataset_memory_budget(),
+        resolve_store_dir(),
+        resolve_chunk_rows(),
+        resolve_store_attach_only(),
+    )
+    with _registry_lock:
+        if _registry is None or _registry_config != config:
+            sources, memory_budget, store_dir, chunk_rows, attach_only = config
+            _registry = DatasetRegistry(dict(sources), memory_budget, store_dir, chunk_rows, attach_only)
+            _registry_config = config
+        return _registry
 
-    repository = CSVUsageRepository(_resolve_csv_path())
-    return UsageAnalyticsService(repository)
+
+def get_result_cache() -> ResultCache | None:
+    """Provide the process-wide query result cache, or ``None`` when it is disabled."""
+
+    global _result_cache, _result_cache_config
+    config = (resolve_result_cache_size(), resolve_result_cache_ttl())
+    with _registry_lock:
+        if _result_cache_config != config:
+            max_entries, ttl_seconds = config
+            _result_cache = ResultCache(max_entries, ttl_seconds) if max_entries > 0 else None
+            _result_cache_config = config
+        return _result_cache
+
+
+def get_series_cache() -> RollingSeriesCache:
+    """Provide the process-wide cache of rolling series statistics."""
+
+    return _series_cache
+
+
+def get_anomaly_detector() -> AnomalyDetector:
+    """Provide the process-wide anomaly detector, rebuilt when its configuration changes."""
+
+    global _anomaly_detector, _anomaly_detector_config
+    config = (resolve_anomaly_min_days(), resolve_anomaly_ewma_alpha())
+    with _registry_lock:
+        if _anomaly_detector is None or _anomaly_detector_config != config:
+            min_days, ewma_alpha = config
+            _anomaly_detector = AnomalyDetector(min_days, ewma_alpha)
+            _anomaly_detector_config = config
+        return _anomaly_detector
+
+
+def get_usage_ingestor() -> UsageIngestor:
+    """Provide the process-wide ingestor that merges uploads into datasets."""
+
+    global _usage_ingestor, _usage_ingestor_config
+    chunk_rows = resolve_chunk_rows()
+    with _registry_lock:
+        if _usage_ingestor is None or _usage_ingestor_config != chunk_rows:
+            _usage_ingestor = UsageIngestor(chunk_rows)
+            _usage_ingestor_config = chunk_rows
+        return _usage_ingestor
+
+
+def get_export_jobs() -> ExportJobManager:
+    """Provide the process-wide export job manager, rebuilt (cancelling its jobs) when its configuration changes."""
+
+    global _export_jobs, _export_jobs_config
+    config = (resolve_export_dir(), resolve_export_workers(), resolve_export_retention())
+    with _registry_lock:
+        if _export_jobs is None or _export_jobs_config != config:
+            if _export_jobs is not None:
+                _export_jobs.shutdown(wait=False)
+            export_dir, workers, retention_seconds = config
+            _export_jobs = ExportJobManager(export_dir, workers, retention_seconds)
+            _export_jobs_config = config
+        return _export_jobs
+
+
+def get_encoded_payloads() -> EncodedPayloadCache:
+    """Provide the process-wide cache of serialised and compressed response bodies."""
+
+    return _encoded_payloads
+
+
+def get_change_feed() -> DatasetChangeFeed:
+    """Provide the process-wide feed of dataset version changes."""
+
+    return _change_feed
+
+
+def get_dataset_id(
+    dataset: str | None = Query(None, description="Configured dataset id (default: 'default')"),
+    registry: DatasetRegistry = Depends(get_dataset_registry),
+) -> str:
+    """Resolve the requested dataset id, rejecting ids that are not configured."""
+
+    dataset_id = dataset or DEFAULT_DATASET_ID
+    if dataset_id not in registry.dataset_ids():
+        raise HTTPException(status_code=404, detail=f"Unknown dataset '{dataset_id}'")
+    return dataset_id
+
+
+def get_usage_analytics_service(
+    dataset_id: str = Depends(get_dataset_id),
+    registry: DatasetRegistry = Depends(get_dataset_registry),
+    result_cache: ResultCache | None = Depends(get_result_cache),
+    series_cache: RollingSeriesCache = Depends(get_series_cache),
+    anomaly_detector: AnomalyDetector = Depends(get_anomaly_detector),
+) -> UsageAnalyticsService:
+    """Provide an instance of :class:`UsageAnalyticsService` for the requested dataset.
+
+    The dataset is loaded on the service's first data access, so snapshot and
+    cached responses are served without loading it.
+    """
+
+    try:
+        repository = registry.lazy_repository(dataset_id)
+        return UsageAnalyticsService(repository, result_cache, series_cache, anomaly_detector)
+    except UnknownDatasetError:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset '{dataset_id}'") from None
+
+
+def get_report_snapshot_store() -> ReportSnapshotStore | None:
+    """Provide the precomputed snapshot store when one is configured."""
+
+    snapshot_dir = resolve_snapshot_dir()
+    if snapshot_dir is None:
+        return None
+    return ReportSnapshotStore(snapshot_dir)
+
+
+def _read_snapshot(
+    store: ReportSnapshotStore | None,
+    registry: DatasetRegistry,
+    report: str,
+    window: str = ALL_TIME_WINDOW,
+    dataset_id: str = DEFAULT_DATASET_ID,
+) -> Response | None:
+    """Return a precomputed report for the current version of ``dataset_id`` in ``registry``, if one exists."""
+
+    if store is None:
+        return None
+    try:
+        dataset_version = registry.source_repository(dataset_id).dataset_version()
+    except (OSError, UnknownDatasetError):
+        return None
+
+    payload = store.read_json(dataset_version, report, window)
+    if payload is None:
+        CACHE_REQUESTS.inc(cache="report_snapshot", result="miss")
+        return None
+    CACHE_REQUESTS.inc(cache="report_snapshot", result="hit")
+    return Response(content=payload, media_type="application/json", headers={"X-Report-Snapshot": dataset_version})
+
+
+def _parse_fields(fields: str | None) -> list[str] | None:
+    """Split a ``fields`` query value into column names, rejecting unknown ones."""
+
+    if not fields:
+        return None
+    columns = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [column for column in columns if column not in EVENT_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown fields: {', '.join(unknown)}")
+    return columns or None
+
+
+def _records_response(
+    dataframe: pd.DataFrame, accept_encoding: str | None = None, headers: dict[str, str] | None = None
+) -> Response:
+    """Encode a report dataframe as a JSON array of records, compressed when the client allows.
+
+    Serialised and compressed bytes are attached to the dataframe itself, so a
+    result served again from the query result cache skips both steps.
+    """
+
+    def serialize() -> bytes:
+        with phase("json_encode"):
+            return encode_json_payload(dataframe)
+
+    body, encoding = _encoded_payloads.get_or_encode(
+        dataframe, negotiate_encoding(accept_encoding), serialize, resolve_compression_min_bytes()
+    )
+    headers = {**(headers or {}), "Vary": "Accept-Encoding"}
+    if encoding != IDENTITY:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 analytics_router = APIRouter(prefix="/analytics", tags=["analytics"])
@@ -38,34 +272,129 @@ analytics_router = APIRouter(prefix="/analytics", tags=["analytics"])
 @analytics_router.get("/events_per_day")
 def get_events_per_day(
     service: UsageAnalyticsService = Depends(get_usage_analytics_service),
+    snapshot_store: ReportSnapshotStore | None = Depends(get_report_snapshot_store),
+    registry: DatasetRegistry = Depends(get_dataset_registry),
+    dataset_id: str = Depends(get_dataset_id),
+    accept_encoding: str | None = Header(None),
+    max_points: int | None = Query(None, ge=MIN_POINTS, description="Downsample to at most this many points (LTTB)"),
 ) -> list[dict[str, Any]]:
     """Return total number of requests per day as JSON."""
 
-    dataframe = service.events_per_day()
-    records = dataframe.to_dict(orient="records")
-    return jsonable_encoder(records)
+    if max_points is None:
+        snapshot = _read_snapshot(snapshot_store, registry, "events_per_day", dataset_id=dataset_id)
+        if snapshot is not None:
+            return snapshot
+        dataframe = service.events_per_day()
+    else:
+        dataframe = service.events_per_day(max_points=max_points)
+    return _records_response(dataframe, accept_encoding)
 
 
 @analytics_router.get("/tokens_per_user")
 def get_tokens_per_user(
     service: UsageAnalyticsService = Depends(get_usage_analytics_service),
+    snapshot_store: ReportSnapshotStore | None = Depends(get_report_snapshot_store),
+    registry: DatasetRegistry = Depends(get_dataset_registry),
+    dataset_id: str = Depends(get_dataset_id),
+    accept_encoding: str | None = Header(None),
 ) -> list[dict[str, Any]]:
     """Return total tokens consumed per user as JSON."""
 
+    snapshot = _read_snapshot(snapshot_store, registry, "tokens_per_user", dataset_id=dataset_id)
+    if snapshot is not None:
+        return snapshot
+
     dataframe = service.tokens_per_user()
-    records = dataframe.to_dict(orient="records")
-    return jsonable_encoder(records)
+    return _records_response(dataframe, accept_encoding)
 
 
 @analytics_router.get("/tokens_by_model")
 def get_tokens_by_model(
     service: UsageAnalyticsService = Depends(get_usage_analytics_service),
+    snapshot_store: ReportSnapshotStore | None = Depends(get_report_snapshot_store),
+    registry: DatasetRegistry = Depends(get_dataset_registry),
+    dataset_id: str = Depends(get_dataset_id),
+    accept_encoding: str | None = Header(None),
 ) -> list[dict[str, Any]]:
     """Return total tokens consumed per model as JSON."""
 
+    snapshot = _read_snapshot(snapshot_store, registry, "tokens_by_model", dataset_id=dataset_id)
+    if snapshot is not None:
+        return snapshot
+
     dataframe = service.tokens_by_model()
-    records = dataframe.to_dict(orient="records")
-    return jsonable_encoder(records)
+    return _records_response(dataframe, accept_encoding)
+
+
+@analytics_router.get("/usage_series")
+def get_usage_series(
+    group_by: str | None = Query(
+        None, pattern=f"^({'|'.join(SERIES_GROUPS)})$", description="Series per 'user' or 'model'; one overall series if omitted"
+    ),
+    metric: str = Query("total_tokens", pattern=f"^({'|'.join(SERIES_METRICS)})$", description="Daily measure to average"),
+    start_date: str | None = Query(None, description="First day to return in ISO format (e.g., 2025-09-01)"),
+    end_date: str | None = Query(None, description="Last day to return in ISO format (e.g., 2025-09-30)"),
+    key: str | None = Query(None, description="Return only this user or model"),
+    max_points: int | None = Query(None, ge=MIN_POINTS, description="Downsample each series to at most this many points (LTTB)"),
+    service: UsageAnalyticsService = Depends(get_usage_analytics_service),
+    accept_encoding: str | None = Header(None),
+) -> list[dict[str, Any]]:
+    """Return daily values with 7/30-day moving averages and month-to-date totals, ready to chart."""
+
+    dataframe = service.usage_series(
+        group_by, metric, start_date=start_date, end_date=end_date, key=key, max_points=max_points
+    )
+    return _records_response(dataframe, accept_encoding)
+
+
+@analytics_router.get("/anomalies")
+def get_anomalies(
+    group_by: str = Query("user", pattern=f"^({'|'.join(SERIES_GROUPS)})$", description="Score series per 'user' or 'model'"),
+    metric: str = Query("total_tokens", pattern=f"^({'|'.join(SERIES_METRICS)})$", description="Daily measure to score"),
+    z_threshold: float | None = Query(None, gt=0, description="Absolute z-score to report (default: USAGE_ANOMALY_Z_THRESHOLD)"),
+    start_date: str | None = Query(None, description="Only report days from this date (ISO format)"),
+    service: UsageAnalyticsService = Depends(get_usage_analytics_service),
+    accept_encoding: str | None = Header(None),
+) -> list[dict[str, Any]]:
+    """Return recent days on which a user's or model's usage left its usual range."""
+
+    threshold = z_threshold if z_threshold is not None else resolve_anomaly_z_threshold()
+    dataframe = service.usage_anomalies(group_by, metric, z_threshold=threshold, start_date=start_date)
+    return _records_response(dataframe, accept_encoding)
+
+
+@analytics_router.get("/compare")
+def get_period_comparison(
+    start_date: str = Query(..., description="First day of the current period (ISO format)"),
+    end_date: str = Query(..., description="Last day of the current period (ISO format)"),
+    group_by: str = Query("user", pattern=f"^({'|'.join(SERIES_GROUPS)})$", description="Compare per 'user' or 'model'"),
+    metric: str = Query("total_tokens", pattern=f"^({'|'.join(SERIES_METRICS)})$", description="Measure to compare"),
+    previous_start_date: str | None = Query(None, description="First day of the previous period (ISO format)"),
+    previous_end_date: str | None = Query(None, description="Last day of the previous period (ISO format)"),
+    offset_days: int | None = Query(None, ge=1, description="Compare with the period this many days earlier"),
+    service: UsageAnalyticsService = Depends(get_usage_analytics_service),
+    accept_encoding: str | None = Header(None),
+) -> list[dict[str, Any]]:
+    """Return each user's or model's value in two periods with the absolute and percentage change.
+
+    Without a previous period or offset, the current period is compared
+    with the same number of days right before it.
+    """
+
+    try:
+        dataframe, current, previous = service.compare_periods(
+            start_date,
+            end_date,
+            group_by,
+            metric,
+            previous_start_date=previous_start_date,
+            previous_end_date=previous_end_date,
+            offset_days=offset_days,
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error)) from None
+    headers = {"X-Current-Period": str(current), "X-Previous-Period": str(previous)}
+    return _records_response(dataframe, accept_encoding, headers)
 
 
 @analytics_router.get("/raw_data")
@@ -75,10 +404,277 @@ def get_raw_data(
     user: str | None = Query(None, description="Filter by specific user email"),
     model: str | None = Query(None, description="Filter by specific model name"),
     _t: str | None = Query(None, description="Timestamp to prevent caching (ignored)"),
+    sort_by: str | None = Query(None, pattern=f"^({'|'.join(EVENT_COLUMNS)})$", description="Column to order rows by"),
+    descending: bool = Query(True, description="Order from the largest value when sorting"),
+    offset: int = Query(0, ge=0, description="Number of ordered rows to skip"),
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Return at most this many rows"),
+    fields: str | None = Query(None, description="Comma-separated columns to return, e.g. date,user,model,total_tokens"),
+    service: UsageAnalyticsService = Depends(get_usage_analytics_service),
+    accept_encoding: str | None = Header(None),
+) -> list[dict[str, Any]]:
+    """Return raw usage data with optional filtering by date range, user, and model.
+
+    With ``sort_by``, ``offset`` or ``limit`` a single ordered page is returned
+    and the number of matching rows is reported in ``X-Total-Count``.
+    ``fields`` limits the returned columns, and the columns read from disk.
+    """
+
+    columns = _parse_fields(fields)
+    if sort_by is None and offset == 0 and limit is None:
+        dataframe = service.get_raw_data(
+            start_date=start_date, end_date=end_date, user=user, model=model, fields=columns
+        )
+        return _records_response(dataframe, accept_encoding)
+
+    page, total = service.raw_data_page(
+        start_date,
+        end_date,
+        user,
+        model,
+        sort_by=sort_by or "date",
+        descending=descending,
+        offset=offset,
+        limit=limit or MAX_PAGE_SIZE,
+        fields=columns,
+    )
+    return _records_response(page, accept_encoding, {"X-Total-Count": str(total)})
+
+
+@analytics_router.get("/raw_data/summary")
+def get_raw_data_summary(
+    start_date: str | None = Query(None, description="Start date in ISO format (e.g., 2025-09-25)"),
+    end_date: str | None = Query(None, description="End date in ISO format (e.g., 2025-09-26)"),
+    user: str | None = Query(None, description="Filter by specific user email"),
+    model: str | None = Query(None, description="Filter by specific model name"),
     service: UsageAnalyticsService = Depends(get_usage_analytics_service),
+) -> dict[str, Any]:
+    """Return record count, distinct users and token, request and cost totals for the raw-data filters."""
+
+    return service.raw_data_summary(start_date=start_date, end_date=end_date, user=user, model=model)
+
+
+@analytics_router.post("/batch")
+def post_batch_queries(
+    batch: BatchRequestDTO,
+    service: UsageAnalyticsService = Depends(get_usage_analytics_service),
+) -> dict[str, Any]:
+    """Evaluate many raw-data, summary and report queries together; results are keyed by query id.
+
+    All ``raw_data`` queries share one scan of the rows and all whole-day
+    ``raw_data_summary`` queries one scan of the daily rollup, so a batch of
+    per-user or per-model queries costs about as much as a single query.
+    """
+
+    queries = [
+        BatchQuery(
+            id=query.id,
+            kind=query.query,
+            start_date=query.start_date,
+            end_date=query.end_date,
+            user=query.user,
+            model=query.model,
+            fields=tuple(query.fields) if query.fields else None,
+            limit=query.limit,
+        )
+        for query in batch.queries
+    ]
+    try:
+        results = service.batch(queries)
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error)) from None
+    with phase("json_encode"):
+        return {
+            "results": {
+                query_id: result.to_dict(orient="records") if isinstance(result, pd.DataFrame) else result
+                for query_id, result in results.items()
+            }
+        }
+
+
+@analytics_router.get("/snapshots/{report}")
+def get_report_snapshot(
+    report: str,
+    window: str = Query(ALL_TIME_WINDOW, description="Snapshot window label, e.g. 'all' or 'last_7d'"),
+    snapshot_store: ReportSnapshotStore | None = Depends(get_report_snapshot_store),
+    registry: DatasetRegistry = Depends(get_dataset_registry),
+    dataset_id: str = Depends(get_dataset_id),
 ) -> list[dict[str, Any]]:
-    """Return raw usage data with optional filtering by date range, user, and model."""
+    """Return a precomputed report snapshot for the current dataset version."""
+
+    snapshot = _read_snapshot(snapshot_store, registry, report, window, dataset_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"No snapshot for report '{report}' and window '{window}'")
+    return snapshot
+
+
+async def _dataset_change_events(
+    registry: DatasetRegistry,
+    feed: DatasetChangeFeed,
+    dataset_id: str,
+    last_version: str | None,
+    poll_seconds: float,
+) -> AsyncIterator[str]:
+    """Yield an SSE message for every new version of ``dataset_id``, and keep-alive comments in between."""
+
+    idle = 0.0
+    while True:
+        change: DatasetChange = await run_in_threadpool(feed.poll, registry, dataset_id)
+        if change.version != last_version:
+            if last_version is not None and change.previous_version != last_version:
+                # The subscriber missed intermediate versions; only a full refresh is safe.
+                change = change.widened()
+            yield format_sse(change.to_dict(), event="dataset_version", event_id=change.version)
+            last_version = change.version
+            idle = 0.0
+        elif idle >= STREAM_KEEPALIVE_SECONDS:
+            yield ": keep-alive\n\n"
+            idle = 0.0
+        await asyncio.sleep(poll_seconds)
+        idle += poll_seconds
+
+
+@analytics_router.get("/updates")
+def get_dataset_updates(
+    dataset_id: str = Depends(get_dataset_id),
+    registry: DatasetRegistry = Depends(get_dataset_registry),
+    feed: DatasetChangeFeed = Depends(get_change_feed),
+    last_event_id: str | None = Header(None),
+) -> StreamingResponse:
+    """Stream ``dataset_version`` Server-Sent Events with the days each new version changed.
+
+    The first message announces the current version unless ``Last-Event-ID``
+    already names it.
+    """
+
+    return StreamingResponse(
+        _dataset_change_events(registry, feed, dataset_id, last_event_id, resolve_events_poll_interval()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@analytics_router.post("/ingest")
+async def ingest_usage(
+    request: Request,
+    dataset_id: str = Depends(get_dataset_id),
+    registry: DatasetRegistry = Depends(get_dataset_registry),
+    ingestor: UsageIngestor = Depends(get_usage_ingestor),
+) -> dict[str, Any]:
+    """Merge a usage CSV sent as the request body into the dataset.
+
+    The body is streamed to a temporary file and refused with 413 once it
+    exceeds ``USAGE_INGEST_MAX_MB``. Rows are then validated chunk by chunk;
+    invalid rows and rows already in the dataset are skipped and counted,
+    and the rest are appended to the source and merged into the loaded
+    dataset without reloading it.
+    """
+
+    max_bytes = resolve_ingest_max_bytes()
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes} bytes")
+
+    # Only the body is read on the event loop; file I/O and the ingest itself
+    # run on the thread pool so that other requests and update streams keep going.
+    tmp_dir = Path(await run_in_threadpool(tempfile.mkdtemp, prefix="usage-upload-"))
+    try:
+        upload = tmp_dir / "upload.csv"
+        received = 0
+        handle = await run_in_threadpool(upload.open, "wb")
+        try:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes} bytes")
+                await run_in_threadpool(handle.write, chunk)
+        finally:
+            await run_in_threadpool(handle.close)
+        if received == 0:
+            raise HTTPException(status_code=422, detail="Upload is empty")
+        try:
+            stats = await run_in_threadpool(ingestor.ingest, registry, dataset_id, upload)
+        except IngestUnavailableError as error:
+            raise HTTPException(status_code=409, detail=str(error)) from None
+        except ValueError as error:
+            raise HTTPException(status_code=422, detail=str(error)) from None
+    finally:
+        await run_in_threadpool(shutil.rmtree, tmp_dir, True)
+    return stats.to_dict()
+
+
+@analytics_router.post("/exports", status_code=202)
+def submit_export(
+    export: ExportRequestDTO,
+    response: Response,
+    dataset_id: str = Depends(get_dataset_id),
+    service: UsageAnalyticsService = Depends(get_usage_analytics_service),
+    jobs: ExportJobManager = Depends(get_export_jobs),
+) -> dict[str, Any]:
+    """Start a background export of the raw rows matching the filters and return its job.
+
+    Poll ``GET /analytics/exports/{id}`` until ``status`` is ``succeeded``,
+    then fetch the file from ``/analytics/exports/{id}/download``. Rows are
+    written in source order, chunk by chunk, so exports of any size use
+    bounded memory.
+    """
+
+    filters = export.model_dump(exclude={"format"}, exclude_none=True)
+    try:
+        chunks = service.iter_raw_data(
+            export.start_date, export.end_date, export.user, export.model, export.fields, resolve_chunk_rows()
+        )
+        job = jobs.submit(dataset_id, export.format, filters, lambda: chunks)
+    except ExportQueueFullError as error:
+        raise HTTPException(status_code=429, detail=str(error)) from None
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error)) from None
+    response.headers["Location"] = f"{analytics_router.prefix}/exports/{job.id}"
+    return job.to_dict()
+
+
+def _export_job(jobs: ExportJobManager, job_id: str) -> Any:
+    try:
+        return jobs.get(job_id)
+    except UnknownExportJobError:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired export '{job_id}'") from None
+
+
+@analytics_router.get("/exports")
+def list_exports(jobs: ExportJobManager = Depends(get_export_jobs)) -> list[dict[str, Any]]:
+    """Return the exports that have not expired, newest first."""
+
+    return [job.to_dict() for job in jobs.jobs()]
+
+
+@analytics_router.get("/exports/{job_id}")
+def get_export(job_id: str, jobs: ExportJobManager = Depends(get_export_jobs)) -> dict[str, Any]:
+    """Return the status of an export: queued, running, succeeded, failed or cancelled."""
+
+    return _export_job(jobs, job_id).to_dict()
+
+
+@analytics_router.delete("/exports/{job_id}")
+def cancel_export(job_id: str, jobs: ExportJobManager = Depends(get_export_jobs)) -> dict[str, Any]:
+    """Cancel a queued or running export; a running one stops after its current chunk."""
+
+    try:
+        return jobs.cancel(job_id).to_dict()
+    except UnknownExportJobError:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired export '{job_id}'") from None
+
+
+@analytics_router.get("/exports/{job_id}/download")
+def download_export(job_id: str, jobs: ExportJobManager = Depends(get_export_jobs)) -> FileResponse:
+    """Return the file of a finished export until it expires."""
+
+    job = _export_job(jobs, job_id)
+    if job.status != "succeeded" or job.path is None:
+        raise HTTPException(status_code=409, detail=f"Export '{job_id}' is {job.status}")
+    return FileResponse(job.path, media_type=MEDIA_TYPES[job.format], filename=job.filename)
+
+
+@analytics_router.get("/datasets")
+def get_datasets(registry: DatasetRegistry = Depends(get_dataset_registry)) -> list[dict[str, Any]]:
+    """Return the configured datasets and which of them are currently loaded in memory."""
 
-    dataframe = service.get_raw_data(start_date=start_date, end_date=end_date, user=user, model=model)
-    records = dataframe.to_dict(orient="records")
-    return jsonable_encoder(records)
+    return registry.stats()
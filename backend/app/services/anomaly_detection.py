@@ -0,0 +1,260 @@
+"""Online anomaly detection on daily per-user and per-model usage.
+
+Every series keeps a constant amount of state: Welford's running count, mean
+and sum of squared deviations, plus an exponentially weighted mean and
+variance. Each day is scored against the state built from the days before it
+and then folded in, so a new dataset version that appends days only costs
+work proportional to the new days. The most recent day is scored but not
+folded until a later day exists, because it may still be receiving rows.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from app.observability.memory import deep_sizeof
+from app.observability.metrics import ANOMALY_UPDATES
+
+
+SCORE_COLUMNS = ["value", "mean", "std", "z_score", "ewma", "ewma_std", "ewma_z_score"]
+
+
+@dataclass(frozen=True)
+class SeriesState:
+    """Running statistics for a set of series, one array slot per series."""
+
+    keys: pd.Index
+    count: np.ndarray
+    mean: np.ndarray
+    m2: np.ndarray
+    ewma: np.ndarray
+    ewm_var: np.ndarray
+
+    @classmethod
+    def empty(cls, keys: pd.Index) -> SeriesState:
+        zeros = np.zeros(len(keys), dtype="float64")
+        return cls(keys, zeros, zeros, zeros, zeros, zeros)
+
+    def extend(self, keys: pd.Index) -> SeriesState:
+        """Return the state over ``keys``, with zeroed slots for series not seen yet."""
+
+        if self.keys.equals(keys):
+            return self
+        positions = self.keys.get_indexer(keys)
+        known = positions >= 0
+
+        def take(values: np.ndarray) -> np.ndarray:
+            result = np.zeros(len(keys), dtype="float64")
+            result[known] = values[positions[known]]
+            return result
+
+        return SeriesState(keys, take(self.count), take(self.mean), take(self.m2), take(self.ewma), take(self.ewm_var))
+
+    def score(self, values: np.ndarray, min_days: int) -> dict[str, np.ndarray]:
+        """Score one day of ``values`` against the state, without updating it."""
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            std = np.where(self.count > 1, np.sqrt(self.m2 / np.maximum(self.count - 1, 1)), np.nan)
+            ewma_std = np.where(self.count > 1, np.sqrt(self.ewm_var), np.nan)
+            scored = self.count >= min_days
+            z_score = np.where(scored & (std > 0), (values - self.mean) / std, np.nan)
+            ewma_z_score = np.where(scored & (ewma_std > 0), (values - self.ewma) / ewma_std, np.nan)
+        return {
+            "value": values,
+            "mean": np.where(self.count > 0, self.mean, np.nan),
+            "std": std,
+            "z_score": z_score,
+            "ewma": np.where(self.count > 0, self.ewma, np.nan),
+            "ewma_std": ewma_std,
+            "ewma_z_score": ewma_z_score,
+        }
+
+    def fold(self, values: np.ndarray, alpha: float) -> SeriesState:
+        """Return the state after observing one more day of ``values``.
+
+        A series starts on its first non-zero day, so the idle days before a
+        user's first request do not drag their baseline towards zero.
+        """
+
+        started = self.count > 0
+        active = started | (values != 0)
+        count = self.count + active
+        delta = values - self.mean
+        mean = np.where(active, self.mean + delta / np.maximum(count, 1), self.mean)
+        m2 = np.where(active, self.m2 + delta * (values - mean), self.m2)
+
+        diff = values - self.ewma
+        increment = alpha * diff
+        ewma = np.where(started, self.ewma + increment, np.where(active, values, self.ewma))
+        ewm_var = np.where(started, (1 - alpha) * (self.ewm_var + diff * increment), self.ewm_var)
+        return SeriesState(self.keys, count, mean, m2, ewma, ewm_var)
+
+
+@dataclass(frozen=True)
+class _DetectorState:
+    version: str
+    first_day: pd.Timestamp
+    # Last folded day, its values and the per-series sums of every folded day,
+    # used to check that a new version only appended to the history the state
+    # was built from (and did not, say, backfill an older day).
+    through_day: pd.Timestamp | None
+    through_values: np.ndarray
+    through_sums: np.ndarray
+    series: SeriesState
+    # Scores of folded days within the look-back window, plus the pending
+    # (most recent, not yet folded) day.
+    recent: pd.DataFrame
+    pending: pd.DataFrame
+
+
+class AnomalyDetector:
+    """Per ``(source, group_by, metric)`` running statistics and recent day scores.
+
+    ``scores`` returns one row per series and day for the last
+    ``recent_days`` days; callers pick anomalies by thresholding the z-scores.
+    """
+
+    def __init__(
+        self,
+        min_days: int = 7,
+        ewma_alpha: float = 0.3,
+        recent_days: int = 30,
+        max_entries: int = 32,
+    ) -> None:
+        if not 0 < ewma_alpha <= 1:
+            raise ValueError("ewma_alpha must be in (0, 1]")
+        if min_days < 2 or recent_days <= 0 or max_entries <= 0:
+            raise ValueError("min_days must be at least 2; recent_days and max_entries must be positive")
+        self._min_days = min_days
+        self._alpha = ewma_alpha
+        self._recent_days = recent_days
+        self._max_entries = max_entries
+        self._states: OrderedDict[tuple[str, str, str], _DetectorState] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def memory_usage(self) -> dict[str, int]:
+        """Return the number of kept detector states and the bytes they hold."""
+
+        with self._lock:
+            states = list(self._states.values())
+        return {"entries": len(states), "bytes": sum(deep_sizeof(state) for state in states)}
+
+    def scores(
+        self,
+        source: str,
+        version: str,
+        group_by: str,
+        metric: str,
+        load_daily: Callable[[], pd.DataFrame],
+    ) -> pd.DataFrame:
+        """Return ``date, <group_by>, value, mean, std, z_score, ewma, ewma_std, ewma_z_score`` rows."""
+
+        key = (source, group_by, metric)
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                self._states.move_to_end(key)
+        if state is not None and state.version == version:
+            ANOMALY_UPDATES.inc(mode="unchanged")
+            return self._frame(state, group_by)
+
+        daily = load_daily()
+        start = self._resume_row(state, daily) if state is not None else None
+        if start is None:
+            ANOMALY_UPDATES.inc(mode="full")
+            state = self._update(None, version, daily, 0)
+        else:
+            ANOMALY_UPDATES.inc(mode="incremental")
+            state = self._update(state, version, daily, start)
+
+        with self._lock:
+            self._states[key] = state
+            self._states.move_to_end(key)
+            while len(self._states) > self._max_entries:
+                self._states.popitem(last=False)
+        return self._frame(state, group_by)
+
+    def _resume_row(self, state: _DetectorState, daily: pd.DataFrame) -> int | None:
+        # The state can only be extended if the new history starts on the same
+        # day, still has every series and agrees on the last folded day and on
+        # the sums of every folded day.
+        if daily.empty or daily.index[0] != state.first_day:
+            return None
+        if state.through_day is None:
+            return 0
+        if not set(state.series.keys) <= set(daily.columns) or state.through_day not in daily.index:
+            return None
+        position = daily.index.get_loc(state.through_day)
+        folded = daily[state.series.keys].to_numpy(dtype="float64")[: position + 1]
+        if not np.array_equal(folded[-1], state.through_values) or not np.array_equal(
+            folded.sum(axis=0), state.through_sums
+        ):
+            return None
+        return position + 1
+
+    def _update(self, state: _DetectorState | None, version: str, daily: pd.DataFrame, start: int) -> _DetectorState:
+        keys = daily.columns
+        series = state.series.extend(keys) if state is not None else SeriesState.empty(keys)
+        if daily.empty:
+            empty = self._scored_frame([], [], keys)
+            return _DetectorState(version, pd.NaT, None, np.zeros(0), np.zeros(0), series, empty, empty)
+
+        values = daily.to_numpy(dtype="float64")
+        window_start = daily.index[-1] - pd.Timedelta(days=self._recent_days - 1)
+        dates: list[pd.Timestamp] = []
+        scored: list[dict[str, np.ndarray]] = []
+        for row in range(start, len(daily) - 1):
+            if daily.index[row] >= window_start:
+                dates.append(daily.index[row])
+                scored.append(series.score(values[row], self._min_days))
+            series = series.fold(values[row], self._alpha)
+
+        recent = self._scored_frame(dates, scored, keys)
+        if state is not None and not state.recent.empty:
+            previous = state.recent[state.recent["date"] >= window_start]
+            recent = pd.concat([previous, recent], ignore_index=True) if not recent.empty else previous
+        pending = self._scored_frame([daily.index[-1]], [series.score(values[-1], self._min_days)], keys)
+
+        through = len(daily) - 2
+        if through < 0:
+            return _DetectorState(version, daily.index[0], None, np.zeros(0), np.zeros(0), series, recent, pending)
+        return _DetectorState(
+            version,
+            daily.index[0],
+            daily.index[through],
+            values[through],
+            values[: through + 1].sum(axis=0),
+            series,
+            recent,
+            pending,
+        )
+
+    @staticmethod
+    def _scored_frame(dates: list[pd.Timestamp], scored: list[dict[str, np.ndarray]], keys: pd.Index) -> pd.DataFrame:
+        if not scored:
+            return pd.DataFrame(
+                {
+                    "date": pd.Series(dtype="datetime64[ns, UTC]"),
+                    "key": pd.Series(dtype=object),
+                    **{column: pd.Series(dtype="float64") for column in SCORE_COLUMNS},
+                }
+            )
+        frame = {
+            "date": pd.DatetimeIndex(dates).repeat(len(keys)),
+            "key": np.tile(keys.to_numpy(dtype=object), len(dates)),
+        }
+        for column in SCORE_COLUMNS:
+            frame[column] = np.concatenate([day[column] for day in scored])
+        return pd.DataFrame(frame)
+
+    @staticmethod
+    def _frame(state: _DetectorState, group_by: str) -> pd.DataFrame:
+        frames = [frame for frame in (state.recent, state.pending) if not frame.empty]
+        combined = pd.concat(frames, ignore_index=True) if frames else state.pending
+        return combined.rename(columns={"key": group_by})
@@ -0,0 +1,106 @@
+"""Evaluation of many raw-data and summary queries in one pass over the rows.
+
+Each query selects rows by date window, user and model. Instead of scanning
+the dataset once per query, every chunk is scanned once: the user and model
+columns are factorised against the values the batch asks for, rows are
+bucketed by user code, and each query only tests the rows of its own user
+(or, without a user filter, combines its date and model masks over the
+chunk).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+BATCH_QUERY_KINDS = ("raw_data", "raw_data_summary", "events_per_day", "tokens_per_user", "tokens_by_model")
+
+
+@dataclass(frozen=True)
+class BatchQuery:
+    """One query of a batch, identified by a caller-chosen ``id``."""
+
+    id: str
+    kind: str
+    start_date: str | None = None
+    end_date: str | None = None
+    user: str | None = None
+    model: str | None = None
+    fields: tuple[str, ...] | None = None
+    limit: int | None = None
+
+    def __post_init__(self) -> None:
+        if self.kind not in BATCH_QUERY_KINDS:
+            raise ValueError(f"Unsupported query kind '{self.kind}'")
+        if self.limit is not None and self.limit <= 0:
+            raise ValueError("limit must be positive")
+
+
+def factorize(values: pd.Series, keys: pd.Index) -> np.ndarray:
+    """Return the position of each value in ``keys``, or -1 for values not among them.
+
+    Categorical columns are mapped through their categories, so the cost is
+    one integer gather instead of hashing every string.
+    """
+
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        lookup = np.append(keys.get_indexer(values.cat.categories), -1)
+        # Missing values have code -1, which picks the appended -1.
+        return lookup[values.cat.codes.to_numpy()]
+    return keys.get_indexer(values)
+
+
+class ChunkSelector:
+    """Row positions matching each query within one chunk, sharing the work between queries."""
+
+    def __init__(self, chunk: pd.DataFrame, users: pd.Index, models: pd.Index) -> None:
+        self._dates = chunk["date"].to_numpy(dtype="datetime64[ns]").view("int64")
+        self._models = factorize(chunk["model"], models)
+        self._users = users
+        self._model_keys = models
+        user_codes = factorize(chunk["user"], users)
+        # Rows grouped by user code; users[k] owns order[edges[k]:edges[k + 1]],
+        # in row order because the sort is stable.
+        self._order = np.argsort(user_codes, kind="stable")
+        self._edges = np.searchsorted(user_codes[self._order], np.arange(-1, len(users) + 1))[1:]
+        self._date_masks: dict[tuple[int | None, int | None], np.ndarray] = {}
+
+    def positions(self, query: BatchQuery, start: pd.Timestamp | None, end: pd.Timestamp | None) -> np.ndarray:
+        """Return the sorted positions of the chunk rows ``query`` selects within ``start``..``end``."""
+
+        start_ns = start.value if start is not None else None
+        end_ns = end.value if end is not None else None
+        model = self._model_keys.get_loc(query.model) if query.model else None
+
+        if query.user:
+            user = self._users.get_loc(query.user)
+            rows = self._order[self._edges[user] : self._edges[user + 1]]
+            keep = np.ones(len(rows), dtype=bool)
+            if start_ns is not None:
+                keep &= self._dates[rows] >= start_ns
+            if end_ns is not None:
+                keep &= self._dates[rows] <= end_ns
+            if model is not None:
+                keep &= self._models[rows] == model
+            return rows[keep]
+
+        mask = self._date_mask(start_ns, end_ns)
+        if model is not None:
+            mask = mask & (self._models == model)
+        return np.flatnonzero(mask)
+
+    def _date_mask(self, start_ns: int | None, end_ns: int | None) -> np.ndarray:
+        # Queries that share a window (typically all of them) share its mask.
+        key = (start_ns, end_ns)
+        mask = self._date_masks.get(key)
+        if mask is None:
+            mask = np.ones(len(self._dates), dtype=bool)
+            if start_ns is not None:
+                mask &= self._dates >= start_ns
+            if end_ns is not None:
+                mask &= self._dates <= end_ns
+            self._date_masks[key] = mask
+        return mask
@@ -0,0 +1,107 @@
+"""Aggregations computed directly on memory-mapped columnar arrays.
+
+These helpers work on the stored representation (``int64`` epoch timestamps
+and ``int32`` dictionary codes) and only decode the handful of values that
+end up in a result, so filtering and grouping never materialise a full
+string-typed dataframe.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.repositories.columnar_store import ColumnarTable
+from app.repositories.csv_usage_repository import COST_COLUMN, ROLLUP_KEYS, ROLLUP_MEASURES
+
+
+NANOSECONDS_PER_DAY = 86_400 * 1_000_000_000
+
+
+def row_mask(
+    table: ColumnarTable,
+    start: pd.Timestamp | None = None,
+    end: pd.Timestamp | None = None,
+    equals: dict[str, str] | None = None,
+) -> np.ndarray | None:
+    """Return a boolean mask of rows within ``[start, end]`` matching every ``equals`` filter.
+
+    ``None`` means "all rows" and lets callers skip the fancy-indexing copy.
+    """
+
+    mask: np.ndarray | None = None
+
+    def combine(condition: np.ndarray) -> None:
+        nonlocal mask
+        mask = condition if mask is None else mask & condition
+
+    if start is not None or end is not None:
+        timestamps = table.read_array("date")
+        if start is not None:
+            combine(timestamps >= start.value)
+        if end is not None:
+            combine(timestamps <= end.value)
+
+    for column, value in (equals or {}).items():
+        try:
+            code = table.dictionary(column).index(value)
+        except ValueError:
+            return np.zeros(table.rows, dtype=bool)
+        combine(table.read_array(column) == code)
+
+    return mask
+
+
+def daily_rollup(table: ColumnarTable, mask: np.ndarray | None = None) -> pd.DataFrame:
+    """Group the selected rows by UTC day, user and model without decoding strings.
+
+    The groupby runs on integer day numbers and dictionary codes, then only the
+    distinct keys of the (small) result are mapped back to timestamps and names.
+    """
+
+    def column(name: str) -> np.ndarray:
+        array = table.read_array(name)
+        return np.asarray(array if mask is None else array[mask])
+
+    frame = pd.DataFrame(
+        {
+            "day": column("date") // NANOSECONDS_PER_DAY,
+            "user": column("user"),
+            "model": column("model"),
+            **{measure: column(measure) for measure in ROLLUP_MEASURES if measure != "events"},
+        },
+        copy=False,
+    )
+    grouped = frame.assign(events=1).groupby(["day", "user", "model"], as_index=False, sort=True).sum()
+
+    dtypes = {measure: "float64" if measure == COST_COLUMN else "int64" for measure in ROLLUP_MEASURES}
+    users = np.asarray(table.dictionary("user"), dtype=object)
+    models = np.asarray(table.dictionary("model"), dtype=object)
+    result = pd.DataFrame(
+        {
+            "date": pd.Series((grouped["day"].to_numpy() * NANOSECONDS_PER_DAY).view("datetime64[ns]")).dt.tz_localize("UTC"),
+            "user": users[grouped["user"].to_numpy()],
+            "model": models[grouped["model"].to_numpy()],
+            **{measure: grouped[measure].to_numpy(dtype=dtypes[measure]) for measure in ROLLUP_MEASURES},
+        }
+    )
+    return result.sort_values(ROLLUP_KEYS, ignore_index=True)
+
+
+def select_rows(
+    table: ColumnarTable,
+    mask: np.ndarray | None,
+    newest_first: bool = True,
+    categorical: bool = True,
+    columns: Sequence[str] | None = None,
+) -> pd.DataFrame:
+    """Decode ``columns`` (all by default) of the rows selected by ``mask``, ordered by timestamp."""
+
+    timestamps = np.asarray(table.read_array("date"))
+    indices = np.arange(table.rows) if mask is None else np.flatnonzero(mask)
+    order = np.argsort(timestamps[indices], kind="stable")
+    if newest_first:
+        order = order[::-1]
+    return table.take(indices[order], columns, categorical=categorical)
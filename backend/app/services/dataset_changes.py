@@ -0,0 +1,129 @@
+"""Detection of new dataset versions and of the days they changed."""
+
+from __future__ import annotations
+
+import json
+import threading
+from dataclasses import asdict, dataclass, replace
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from app.repositories import DatasetRegistry
+
+
+# Per-day totals compared between versions to find the changed days.
+DAY_TOTAL_COLUMNS = ["events", "total_tokens", "requests", "cost"]
+
+SCOPE_ALL = "all"
+SCOPE_RANGE = "range"
+SCOPE_NONE = "none"
+
+
+@dataclass(frozen=True)
+class DatasetChange:
+    """A dataset version and the days that differ from the previous one.
+
+    ``scope`` is ``"range"`` when ``start_date``..``end_date`` bound every
+    changed day, ``"none"`` when no day changed (the source was rewritten with
+    identical rows) and ``"all"`` when the previous state is unknown.
+    """
+
+    dataset: str
+    version: str
+    previous_version: str | None
+    scope: str
+    start_date: str | None = None
+    end_date: str | None = None
+
+    def widened(self) -> DatasetChange:
+        """Return this change with the whole dataset marked as changed."""
+
+        return replace(self, scope=SCOPE_ALL, start_date=None, end_date=None)
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def day_totals(rollup: pd.DataFrame) -> pd.DataFrame:
+    """Sum the rollup per day, indexed by ISO date string."""
+
+    if rollup.empty:
+        return pd.DataFrame(columns=DAY_TOTAL_COLUMNS, dtype="float64")
+    totals = rollup.groupby("date")[DAY_TOTAL_COLUMNS].sum().astype("float64")
+    totals.index = totals.index.strftime("%Y-%m-%d")
+    return totals
+
+
+def changed_days(previous: pd.DataFrame, current: pd.DataFrame) -> list[str]:
+    """Return the sorted ISO days whose totals differ, including added and removed days."""
+
+    days = previous.index.union(current.index)
+    before = previous.reindex(days, fill_value=0.0).to_numpy(dtype="float64")
+    after = current.reindex(days, fill_value=0.0).to_numpy(dtype="float64")
+    differs = ~np.isclose(before, after, rtol=1e-12, atol=1e-9).all(axis=1)
+    return sorted(days[differs])
+
+
+class DatasetChangeFeed:
+    """Latest :class:`DatasetChange` per dataset, shared by every subscriber.
+
+    ``poll`` only stats the source while the version is unchanged; when it
+    changes, the new version is loaded through the registry once and its
+    per-day totals are compared with those of the previous version.
+    """
+
+    def __init__(self) -> None:
+        self._changes: dict[str, DatasetChange] = {}
+        self._totals: dict[str, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+        self._dataset_locks: dict[str, threading.Lock] = {}
+
+    def poll(self, registry: DatasetRegistry, dataset_id: str) -> DatasetChange:
+        """Return the change that produced the current version of ``dataset_id``.
+
+        A new version is loaded under a lock of its own dataset only, so a slow
+        load never holds up polls of other datasets.
+        """
+
+        version = registry.source_repository(dataset_id).dataset_version()
+        with self._lock:
+            change = self._changes.get(dataset_id)
+            if change is not None and change.version == version:
+                return change
+            dataset_lock = self._dataset_locks.setdefault(dataset_id, threading.Lock())
+
+        with dataset_lock:
+            with self._lock:
+                # Another poll may have recorded this version while we waited.
+                change = self._changes.get(dataset_id)
+                if change is not None and change.version == version:
+                    return change
+                previous = self._totals.get(dataset_id)
+
+            totals = day_totals(registry.repository(dataset_id).get_daily_rollup())
+            if change is None or previous is None:
+                change = DatasetChange(dataset_id, version, None, SCOPE_ALL)
+            else:
+                days = changed_days(previous, totals)
+                if days:
+                    change = DatasetChange(dataset_id, version, change.version, SCOPE_RANGE, days[0], days[-1])
+                else:
+                    change = DatasetChange(dataset_id, version, change.version, SCOPE_NONE)
+            with self._lock:
+                self._changes[dataset_id] = change
+                self._totals[dataset_id] = totals
+            return change
+
+
+def format_sse(data: dict[str, Any], event: str | None = None, event_id: str | None = None) -> str:
+    """Encode one Server-Sent Events message."""
+
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,81 @@
+"""Largest-Triangle-Three-Buckets downsampling for chart-bound time series."""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+MIN_POINTS = 3
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Return the positions of at most ``max_points`` points that preserve the shape of ``y``.
+
+    The first and last points are always kept. The points in between are cut
+    into ``max_points - 2`` equal buckets and each bucket keeps the point
+    forming the largest triangle with the point kept in the previous bucket
+    and the average of the next bucket. ``x`` must be sorted.
+    """
+
+    if max_points < MIN_POINTS:
+        raise ValueError(f"max_points must be at least {MIN_POINTS}")
+    length = len(x)
+    if length <= max_points:
+        return np.arange(length)
+
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    # Bucket edges over the interior points 1 .. length-2.
+    edges = np.linspace(1, length - 1, max_points - 1).astype(np.int64)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, length - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_x = x[stop : edges[bucket + 2]].mean()
+            next_y = y[stop : edges[bucket + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        # Twice the triangle area; the constant factor does not change the argmax.
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        previous = start + int(areas.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample(
+    dataframe: pd.DataFrame,
+    x: str,
+    y: str,
+    max_points: int | None,
+    group_by: str | None = None,
+) -> pd.DataFrame:
+    """Keep at most ``max_points`` rows per series, chosen by LTTB on the ``x``/``y`` columns.
+
+    Rows must be ordered by ``x`` within each series. With ``group_by`` every
+    series is reduced on its own, so each line in a chart keeps its shape.
+    """
+
+    if max_points is None or dataframe.empty:
+        return dataframe
+
+    def positions(frame: pd.DataFrame) -> np.ndarray:
+        x_values = pd.to_datetime(frame[x]).to_numpy(dtype="datetime64[ns]").astype("int64")
+        return lttb_indices(x_values, frame[y].to_numpy(dtype="float64"), max_points)
+
+    if group_by is None:
+        if len(dataframe) <= max_points:
+            return dataframe
+        return dataframe.iloc[positions(dataframe)].reset_index(drop=True)
+
+    keep = np.zeros(len(dataframe), dtype=bool)
+    for rows in dataframe.groupby(group_by, sort=False).indices.values():
+        keep[rows[positions(dataframe.iloc[rows])]] = True
+    if keep.all():
+        return dataframe
+    return dataframe[keep].reset_index(drop=True)
@@ -0,0 +1,406 @@
+"""Background jobs that write filtered raw usage data to CSV or Parquet files."""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import socket
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from app.observability.metrics import EXPORT_JOBS, EXPORTED_ROWS
+from app.repositories.csv_usage_repository import CSV_DATE_FORMAT
+
+try:  # pragma: no cover - optional dependency
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    PARQUET_AVAILABLE = False
+else:  # pragma: no cover - optional dependency
+    PARQUET_AVAILABLE = True
+
+
+EXPORT_FORMATS = ("csv", "parquet")
+MEDIA_TYPES = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+_JOB_ID = re.compile(r"^[0-9a-f]{32}$")
+# Export files, job metadata (.json) and cancellation requests (.cancel), possibly partial.
+_JOB_FILE = re.compile(r"^(?P<id>[0-9a-f]{32})\.(csv|parquet|json|cancel)(\.part)?$")
+# Recorded with every job so that other processes can tell when its owner is gone.
+_OWNER = {"host": socket.gethostname(), "pid": os.getpid(), "process": uuid.uuid4().hex}
+
+
+class UnknownExportJobError(KeyError):
+    """Raised for job ids that were never submitted or whose results have expired."""
+
+
+class ExportQueueFullError(RuntimeError):
+    """Raised when as many jobs as allowed are already waiting or running."""
+
+
+class ExportCancelled(Exception):
+    """Raised inside a running job once it has been cancelled."""
+
+
+@dataclass
+class ExportJob:
+    """State of one export; ``path`` is set once the file is complete."""
+
+    id: str
+    dataset: str
+    format: str
+    filters: dict[str, Any]
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    expires_at: float | None = None
+    rows: int = 0
+    bytes: int = 0
+    error: str | None = None
+    path: Path | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def filename(self) -> str:
+        return f"usage-{self.dataset}-{self.id}.{self.format}"
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "dataset": self.dataset,
+            "format": self.format,
+            "filters": self.filters,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "expires_at": self.expires_at,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "error": self.error,
+        }
+
+    @classmethod
+    def from_metadata(cls, metadata: dict[str, Any]) -> ExportJob:
+        """Rebuild a job from the metadata :class:`ExportJobManager` keeps next to its file."""
+
+        fields = {key: value for key, value in metadata.items() if key not in ("path", "owner")}
+        return cls(**fields, path=Path(metadata["path"]) if metadata.get("path") else None)
+
+
+def _owner_alive(owner: dict[str, Any] | None) -> bool:
+    """Whether the process recorded as a job's owner may still be running it.
+
+    Only processes on this host can be checked; any other owner is assumed
+    to be alive.
+    """
+
+    if not owner or owner.get("host") != _OWNER["host"] or os.name == "nt":
+        return True
+    if owner.get("pid") == _OWNER["pid"]:
+        # The same pid in a restarted container is a different process.
+        return owner.get("process") == _OWNER["process"]
+    try:
+        os.kill(owner["pid"], 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass  # Exists, but belongs to another user.
+    return True
+
+
+class _FileWriter:
+    """Appends dataframe chunks to a CSV or Parquet file."""
+
+    def __init__(self, path: Path, export_format: str) -> None:
+        self._path = path
+        self._format = export_format
+        self._parquet: Any = None
+        self._empty: pd.DataFrame | None = None
+        self._started = False
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        if self._format == "csv":
+            mode = "a" if self._started else "w"
+            chunk.to_csv(self._path, mode=mode, header=not self._started, index=False, date_format=CSV_DATE_FORMAT)
+        elif self._parquet is None and chunk.empty:
+            # An empty chunk says little about column types (they are often
+            # all ``object``); the schema is taken from the first rows instead.
+            self._empty = chunk
+            return
+        else:
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self._path, self._parquet_schema(chunk))
+            self._parquet.write_table(pyarrow.Table.from_pandas(chunk, schema=self._parquet.schema, preserve_index=False))
+        self._started = True
+
+    def close(self) -> None:
+        if self._parquet is None and self._empty is not None:
+            # Nothing but empty chunks: still write a file with the columns.
+            self._parquet = pq.ParquetWriter(self._path, self._parquet_schema(self._empty))
+        if self._parquet is not None:
+            self._parquet.close()
+
+    @staticmethod
+    def _parquet_schema(chunk: pd.DataFrame) -> Any:
+        # Object columns without a value are inferred as ``null``, which no
+        # later chunk converts to; they hold strings here.
+        schema = pyarrow.Schema.from_pandas(chunk, preserve_index=False)
+        return pyarrow.schema(
+            [field.with_type(pyarrow.string()) if pyarrow.types.is_null(field.type) else field for field in schema],
+            metadata=schema.metadata,
+        )
+
+
+class ExportJobManager:
+    """Runs exports on a bounded pool of worker threads and keeps their files for ``retention_seconds``.
+
+    Each job streams the chunks it is given into ``<root>/<id>.<format>.part``
+    and renames the file into place when it is complete, so a download never
+    sees a partial file. Cancelled jobs stop at the next chunk. Expired jobs
+    and their files are removed whenever the manager is used.
+
+    The state of every job is also written to ``<root>/<id>.json``, so
+    managers of several worker processes can share one ``root``: any of them
+    reports the status of, serves and expires every job, and cancels a job
+    of another process by leaving ``<id>.cancel`` for its owner to pick up
+    at the next chunk. Unfinished jobs whose owning process is gone (on the
+    same host) are reported as ``failed`` and then expire like any other.
+    Files no job owns are only removed once they are older than the
+    retention period.
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        max_workers: int = 2,
+        retention_seconds: float = 24 * 3600,
+        max_pending: int = 100,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if max_workers <= 0 or max_pending <= 0:
+            raise ValueError("max_workers and max_pending must be positive")
+        self._root = Path(root)
+        self._root.mkdir(parents=True, exist_ok=True)
+        self._retention = retention_seconds
+        self._max_pending = max_pending
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="usage-export")
+        self._jobs: dict[str, ExportJob] = {}
+        self._futures: dict[str, Future[None]] = {}
+        self._cancelled: dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.purge_expired()
+
+    def submit(
+        self,
+        dataset_id: str,
+        export_format: str,
+        filters: dict[str, Any],
+        chunks: Callable[[], Iterator[pd.DataFrame]],
+    ) -> ExportJob:
+        """Queue an export of the dataframes ``chunks()`` yields and return the new job.
+
+        ``chunks`` runs on a worker thread; it should yield at least one
+        (possibly empty) dataframe so that an export without rows still has
+        a header.
+        """
+
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format '{export_format}'")
+        if export_format == "parquet" and not PARQUET_AVAILABLE:
+            raise ValueError("Parquet exports require pyarrow")
+        self.purge_expired()
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            if pending >= self._max_pending:
+                raise ExportQueueFullError(f"{pending} exports are already queued or running")
+            job = ExportJob(uuid.uuid4().hex, dataset_id, export_format, filters, created_at=self._clock())
+            self._jobs[job.id] = job
+            self._cancelled[job.id] = threading.Event()
+            self._save(job)
+            self._futures[job.id] = self._executor.submit(self._run, job, chunks)
+        EXPORT_JOBS.inc(format=export_format, status="queued")
+        return job
+
+    def get(self, job_id: str) -> ExportJob:
+        """Return the job with ``job_id``; raises :class:`UnknownExportJobError` once it has expired."""
+
+        self.purge_expired()
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            job = self._load(job_id)
+        if job is None:
+            raise UnknownExportJobError(job_id)
+        return job
+
+    def jobs(self) -> list[ExportJob]:
+        """Return all jobs that have not expired, of every process sharing the root, newest first."""
+
+        self.purge_expired()
+        with self._lock:
+            jobs = dict(self._jobs)
+        for job_id in self._stored_ids() - jobs.keys():
+            job = self._load(job_id)
+            if job is not None:
+                jobs[job_id] = job
+        return sorted(jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> ExportJob:
+        """Stop a queued or running job; finished jobs are returned unchanged.
+
+        A job of another process is asked to stop and returned with its
+        current status; it reports ``cancelled`` once its owner has stopped it.
+        """
+
+        job = self.get(job_id)
+        with self._lock:
+            if job.finished:
+                return job
+            if job.id not in self._jobs:
+                self._file(job_id, "cancel").touch()
+                return job
+            self._cancelled[job_id].set()
+            if self._futures[job_id].cancel():
+                # Never started, so _run will not record the outcome.
+                self._finish(job, "cancelled")
+        return job
+
+    def purge_expired(self) -> None:
+        """Forget finished jobs past their retention and delete their files.
+
+        Files of other processes' jobs are deleted once their metadata says
+        they expired, and files no job owns once they are older than the
+        retention period.
+        """
+
+        now = self._clock()
+        with self._lock:
+            expired = [job for job in self._jobs.values() if job.expires_at is not None and job.expires_at <= now]
+            for job in expired:
+                del self._jobs[job.id], self._futures[job.id], self._cancelled[job.id]
+            owned = set(self._jobs)
+        for job in expired:
+            self._remove_files(job.id)
+
+        files: dict[str, list[Path]] = {}
+        for path in self._root.iterdir():
+            match = _JOB_FILE.match(path.name)
+            if match is not None and match["id"] not in owned:
+                files.setdefault(match["id"], []).append(path)
+        for job_id, paths in files.items():
+            job = self._load(job_id)
+            if job is not None and job.expires_at is not None and job.expires_at <= now:
+                self._remove_files(job_id)
+            elif job is None or not job.finished:
+                # Leftovers of a process that stopped: everything untouched for a whole retention period.
+                try:
+                    stale = all(path.stat().st_mtime <= now - self._retention for path in paths)
+                except FileNotFoundError:
+                    continue
+                if stale:
+                    self._remove_files(job_id)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Cancel every unfinished job and stop the worker threads."""
+
+        with self._lock:
+            unfinished = [job.id for job in self._jobs.values() if not job.finished]
+        for job_id in unfinished:
+            self.cancel(job_id)
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job: ExportJob, chunks: Callable[[], Iterator[pd.DataFrame]]) -> None:
+        cancel_requested = self._cancelled[job.id]
+        cancel_marker = self._file(job.id, "cancel")
+
+        def cancelled() -> bool:
+            return cancel_requested.is_set() or cancel_marker.exists()
+
+        target = self._file(job.id, job.format)
+        partial = target.with_name(f"{target.name}.part")
+        with self._lock:
+            job.status, job.started_at = "running", self._clock()
+            self._save(job)
+        writer = _FileWriter(partial, job.format)
+        try:
+            for chunk in chunks():
+                if cancelled():
+                    raise ExportCancelled
+                writer.write(chunk)
+                job.rows += len(chunk)
+            if cancelled():
+                raise ExportCancelled
+            writer.close()
+            partial.rename(target)
+        except ExportCancelled:
+            writer.close()
+            partial.unlink(missing_ok=True)
+            with self._lock:
+                self._finish(job, "cancelled")
+            return
+        except Exception as error:  # noqa: BLE001 - reported through the job status
+            writer.close()
+            partial.unlink(missing_ok=True)
+            with self._lock:
+                job.error = str(error) or type(error).__name__
+                self._finish(job, "failed")
+            return
+
+        with self._lock:
+            job.path, job.bytes = target, target.stat().st_size
+            self._finish(job, "succeeded")
+        EXPORTED_ROWS.inc(job.rows, format=job.format)
+
+    def _finish(self, job: ExportJob, status: str) -> None:
+        job.status = status
+        job.finished_at = self._clock()
+        job.expires_at = job.finished_at + self._retention
+        self._save(job)
+        self._file(job.id, "cancel").unlink(missing_ok=True)
+        EXPORT_JOBS.inc(format=job.format, status=status)
+
+    def _file(self, job_id: str, suffix: str) -> Path:
+        return self._root / f"{job_id}.{suffix}"
+
+    def _save(self, job: ExportJob) -> None:
+        metadata = {**job.to_dict(), "path": str(job.path) if job.path is not None else None, "owner": _OWNER}
+        staging = self._file(job.id, "json.part")
+        staging.write_text(json.dumps(metadata), encoding="utf-8")
+        os.replace(staging, self._file(job.id, "json"))
+
+    def _load(self, job_id: str) -> ExportJob | None:
+        if not _JOB_ID.match(job_id):
+            return None
+        try:
+            metadata = json.loads(self._file(job_id, "json").read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+        job = ExportJob.from_metadata(metadata)
+        if not job.finished and not _owner_alive(metadata.get("owner")):
+            # Its owner stopped mid-export; nobody will ever finish it.
+            job.error = f"The worker process running this export (pid {metadata['owner']['pid']}) stopped"
+            self._file(job_id, f"{job.format}.part").unlink(missing_ok=True)
+            self._finish(job, "failed")
+        return job
+
+    def _stored_ids(self) -> set[str]:
+        return {path.stem for path in self._root.glob("*.json") if _JOB_ID.match(path.stem)}
+
+    def _remove_files(self, job_id: str) -> None:
+        for path in self._root.glob(f"{job_id}.*"):
+            path.unlink(missing_ok=True)
@@ -0,0 +1,96 @@
+"""Period-over-period comparison of usage per user or model, from the daily rollup."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+COMPARISON_COLUMNS = ["current", "previous", "change", "change_pct"]
+
+
+@dataclass(frozen=True)
+class Period:
+    """An inclusive range of whole UTC days."""
+
+    first_day: pd.Timestamp
+    last_day: pd.Timestamp
+
+    @property
+    def days(self) -> int:
+        return (self.last_day - self.first_day).days + 1
+
+    def shifted(self, days: int) -> Period:
+        return Period(self.first_day - pd.Timedelta(days=days), self.last_day - pd.Timedelta(days=days))
+
+    def __str__(self) -> str:
+        return f"{self.first_day:%Y-%m-%d}/{self.last_day:%Y-%m-%d}"
+
+
+def parse_period(start_date: str, end_date: str) -> Period:
+    """Return the days from ``start_date`` to ``end_date``, which must be whole days in order."""
+
+    first_day, last_day = pd.to_datetime(start_date, utc=True), pd.to_datetime(end_date, utc=True)
+    if first_day != first_day.floor("D") or last_day != last_day.floor("D"):
+        raise ValueError("Comparison windows must be whole days")
+    if last_day < first_day:
+        raise ValueError("A comparison window must not end before it starts")
+    return Period(first_day, last_day)
+
+
+def resolve_periods(
+    start_date: str,
+    end_date: str,
+    previous_start_date: str | None = None,
+    previous_end_date: str | None = None,
+    offset_days: int | None = None,
+) -> tuple[Period, Period]:
+    """Return the current period and the one it is compared with.
+
+    The previous period is given explicitly, or is the current one moved
+    back by ``offset_days`` (by default its own length, i.e. the days
+    immediately before it).
+    """
+
+    current = parse_period(start_date, end_date)
+    if (previous_start_date is None) != (previous_end_date is None):
+        raise ValueError("previous_start_date and previous_end_date must be given together")
+    if previous_start_date is not None:
+        if offset_days is not None:
+            raise ValueError("Give either a previous window or offset_days, not both")
+        return current, parse_period(previous_start_date, previous_end_date)
+    if offset_days is not None and offset_days <= 0:
+        raise ValueError("offset_days must be positive")
+    return current, current.shifted(offset_days or current.days)
+
+
+def compare_periods(rollup: pd.DataFrame, group_by: str, metric: str, current: Period, previous: Period) -> pd.DataFrame:
+    """Sum ``metric`` per ``group_by`` in both periods with one pass over ``rollup``.
+
+    Returns ``<group_by>, current, previous, change, change_pct`` for every
+    group with rows in either period, largest absolute change first;
+    ``change_pct`` is NaN when the previous value is zero. Overlapping
+    periods are allowed, each day counts towards every period it falls in.
+    """
+
+    dates = rollup["date"]
+    in_current = ((dates >= current.first_day) & (dates <= current.last_day)).to_numpy()
+    in_previous = ((dates >= previous.first_day) & (dates <= previous.last_day)).to_numpy()
+    selected = in_current | in_previous
+    values = rollup[metric].to_numpy()[selected]
+    zero = np.zeros_like(values)
+    frame = pd.DataFrame(
+        {
+            group_by: rollup[group_by].to_numpy()[selected],
+            "current": np.where(in_current[selected], values, zero),
+            "previous": np.where(in_previous[selected], values, zero),
+        }
+    )
+    grouped = frame.groupby(group_by, as_index=False, sort=True)[["current", "previous"]].sum()
+    grouped["change"] = grouped["current"] - grouped["previous"]
+    previous_values = grouped["previous"].astype("float64")
+    grouped["change_pct"] = (grouped["change"] / previous_values.where(previous_values != 0)) * 100
+    order = np.argsort(-grouped["change"].abs().to_numpy(), kind="stable")
+    return grouped.iloc[order].reset_index(drop=True)
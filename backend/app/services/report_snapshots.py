@@ -0,0 +1,150 @@
+"""Precomputed report snapshots that the API can serve without touching the dataset."""
+
+from __future__ import annotations
+
+import json
+import shutil
+from collections.abc import Iterable, Sequence
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+
+from app.services.usage_analytics import UsageAnalyticsService
+
+
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_FORMATS = ("json", "parquet")
+SNAPSHOT_REPORTS = ("events_per_day", "tokens_per_user", "tokens_by_model")
+ALL_TIME_WINDOW = "all"
+
+_MANIFEST_NAME = "manifest.json"
+
+
+def window_label(days: int | None) -> str:
+    """Return the snapshot label used for a trailing window of ``days`` days."""
+
+    if days is None:
+        return ALL_TIME_WINDOW
+    return f"last_{days}d"
+
+
+def encode_json_payload(dataframe: pd.DataFrame) -> bytes:
+    """Encode a report exactly as the API's ``JSONResponse`` would render it."""
+
+    records = jsonable_encoder(dataframe.to_dict(orient="records"))
+    return json.dumps(records, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class ReportSnapshotStore:
+    """Filesystem layout for snapshots: ``<root>/v<format>/<dataset_version>/<report>__<window>.<ext>``."""
+
+    def __init__(self, root: str | Path) -> None:
+        self._root = Path(root)
+
+    def snapshot_dir(self, dataset_version: str) -> Path:
+        """Return the directory that holds snapshots for ``dataset_version``."""
+
+        return self._root / f"v{SNAPSHOT_FORMAT_VERSION}" / dataset_version
+
+    def load_manifest(self, dataset_version: str) -> dict[str, Any] | None:
+        """Return the manifest of a complete snapshot set, or ``None`` when there is none."""
+
+        manifest_path = self.snapshot_dir(dataset_version) / _MANIFEST_NAME
+        try:
+            return json.loads(manifest_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+
+    def read_json(self, dataset_version: str, report: str, window: str = ALL_TIME_WINDOW) -> bytes | None:
+        """Return the pre-encoded JSON payload of a report, or ``None`` when it was not precomputed."""
+
+        manifest = self.load_manifest(dataset_version)
+        if manifest is None:
+            return None
+
+        entry = manifest["reports"].get(report, {}).get(window)
+        if entry is None or "json" not in entry["files"]:
+            return None
+        return (self.snapshot_dir(dataset_version) / entry["files"]["json"]).read_bytes()
+
+    def write(
+        self,
+        dataset_version: str,
+        source: str,
+        reports: dict[str, dict[str, tuple[pd.DataFrame, dict[str, Any]]]],
+        formats: Sequence[str] = ("json",),
+    ) -> dict[str, Any]:
+        """Write a complete snapshot set and return its manifest.
+
+        Files are written into a staging directory which is renamed into place
+        at the end, so readers never observe a partially written snapshot.
+        """
+
+        target_dir = self.snapshot_dir(dataset_version)
+        staging_dir = target_dir.with_name(f".{dataset_version}.tmp")
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        staging_dir.mkdir(parents=True)
+
+        manifest: dict[str, Any] = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "dataset_version": dataset_version,
+            "source": source,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "reports": {},
+        }
+        for report, windows in reports.items():
+            report_entry = manifest["reports"].setdefault(report, {})
+            for window, (dataframe, details) in windows.items():
+                files: dict[str, str] = {}
+                stem = f"{report}__{window}"
+                if "json" in formats:
+                    files["json"] = f"{stem}.json"
+                    (staging_dir / files["json"]).write_bytes(encode_json_payload(dataframe))
+                if "parquet" in formats:
+                    files["parquet"] = f"{stem}.parquet"
+                    dataframe.to_parquet(staging_dir / files["parquet"], index=False)
+                report_entry[window] = {**details, "rows": len(dataframe), "files": files}
+
+        (staging_dir / _MANIFEST_NAME).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+        shutil.rmtree(target_dir, ignore_errors=True)
+        staging_dir.rename(target_dir)
+        return manifest
+
+
+def build_report_snapshots(
+    service: UsageAnalyticsService,
+    windows: Iterable[int] = (),
+) -> dict[str, dict[str, tuple[pd.DataFrame, dict[str, Any]]]]:
+    """Compute every aggregate report for all time and for each trailing window in days.
+
+    Trailing windows end on the most recent day present in the dataset rather
+    than on the wall-clock date, so snapshots of historical exports stay
+    meaningful.
+    """
+
+    all_time = {report: getattr(service, report)() for report in SNAPSHOT_REPORTS}
+    reports: dict[str, dict[str, tuple[pd.DataFrame, dict[str, Any]]]] = {
+        report: {ALL_TIME_WINDOW: (dataframe, {"start_date": None, "end_date": None})}
+        for report, dataframe in all_time.items()
+    }
+
+    days_frame = all_time["events_per_day"]
+    if days_frame.empty:
+        return reports
+
+    last_day = days_frame["date"].iloc[-1]
+    for days in sorted(set(windows)):
+        if days <= 0:
+            raise ValueError(f"Snapshot windows must be positive, got {days}")
+        start_date = (last_day - timedelta(days=days - 1)).isoformat()
+        end_date = last_day.isoformat()
+        details = {"start_date": start_date, "end_date": end_date}
+        for report in SNAPSHOT_REPORTS:
+            dataframe = getattr(service, report)(start_date=start_date, end_date=end_date)
+            reports[report][window_label(days)] = (dataframe, details)
+
+    return reports
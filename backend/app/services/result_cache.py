@@ -0,0 +1,117 @@
+"""Versioned cache of computed query results shared by service instances."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from typing import Any
+
+from app.observability.memory import deep_sizeof
+from app.observability.metrics import RESULT_CACHE_EVICTIONS, RESULT_CACHE_REQUESTS
+
+
+@dataclass
+class _Entry:
+    value: Any
+    expires_at: float
+
+
+class ResultCache:
+    """Size-bounded LRU of query results with a time-to-live.
+
+    Keys are ``(source, version, method, params)``. Whenever a lookup sees a
+    new version for a source, every entry computed from older versions of that
+    source is dropped, so results never outlive the data they came from.
+    Cached values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        if ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be positive")
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[tuple[Hashable, ...], _Entry] = OrderedDict()
+        self._versions: dict[str, str] = {}
+        self._stats: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, source: str, version: str, method: str, params: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached result for the key, computing and storing it on a miss."""
+
+        key = (source, version, method, params)
+        with self._lock:
+            self._observe_version(source, version)
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= self._clock():
+                del self._entries[key]
+                RESULT_CACHE_EVICTIONS.inc(reason="ttl")
+                entry = None
+            self._record(method, "hit" if entry is not None else "miss")
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry.value
+
+        # Compute outside the lock; concurrent misses for one key may both
+        # compute, which is cheaper than serialising every query.
+        value = compute()
+        with self._lock:
+            if self._versions.get(source) == version:
+                self._entries[key] = _Entry(value, self._clock() + self._ttl_seconds)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+                    RESULT_CACHE_EVICTIONS.inc(reason="lru")
+        return value
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Return hit and miss counts per method since the cache was created."""
+
+        with self._lock:
+            return {method: dict(counts) for method, counts in self._stats.items()}
+
+    def memory_usage(self) -> dict[str, Any]:
+        """Return the number of cached results and the bytes they hold, in total and per method.
+
+        Results that share buffers with a loaded dataset are counted in full.
+        """
+
+        with self._lock:
+            entries = list(self._entries.items())
+        methods: dict[str, int] = {}
+        for key, entry in entries:
+            methods[key[2]] = methods.get(key[2], 0) + deep_sizeof(entry.value)
+        return {"entries": len(entries), "bytes": sum(methods.values()), "methods": methods}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _observe_version(self, source: str, version: str) -> None:
+        if self._versions.get(source) == version:
+            return
+        self._versions[source] = version
+        stale = [key for key in self._entries if key[0] == source and key[1] != version]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            RESULT_CACHE_EVICTIONS.inc(len(stale), reason="version")
+
+    def _record(self, method: str, result: str) -> None:
+        counts = self._stats.setdefault(method, {"hit": 0, "miss": 0})
+        counts[result] += 1
+        RESULT_CACHE_REQUESTS.inc(method=method, result=result)
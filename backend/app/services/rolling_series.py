@@ -0,0 +1,178 @@
+"""Moving averages and month-to-date totals derived from the daily rollup.
+
+Series are computed in wide form (one row per calendar day, one column per
+user, model or a single ``all`` column) so that ``rolling`` and ``cumsum`` run
+over every series at once. :class:`RollingSeriesCache` keeps the last result
+per dataset source and, when a new version only touches recent days,
+recomputes just the affected tail.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import pandas as pd
+
+from app.observability.memory import deep_sizeof
+from app.observability.metrics import SERIES_UPDATES
+
+
+ROLLING_WINDOWS = (7, 30)
+SERIES_GROUPS = ("user", "model")
+SERIES_METRICS = ("total_tokens", "cost", "requests", "events", "output_tokens", "cache_read")
+ALL_KEY = "all"
+
+
+def series_statistics() -> list[str]:
+    """Return the statistic columns produced for every series, in output order."""
+
+    return [*(f"ma_{window}d" for window in ROLLING_WINDOWS), "mtd"]
+
+
+def daily_matrix(rollup: pd.DataFrame, group_by: str | None, metric: str) -> pd.DataFrame:
+    """Pivot the rollup into a calendar-complete day x series matrix of ``metric`` sums.
+
+    Days without usage are present with zeros so that moving averages divide
+    by calendar days rather than by active days.
+    """
+
+    if rollup.empty:
+        return pd.DataFrame(index=pd.DatetimeIndex([], tz="UTC", name="date"), dtype="float64")
+
+    if group_by is None:
+        wide = rollup.groupby("date")[metric].sum().to_frame(ALL_KEY)
+    else:
+        wide = rollup.groupby(["date", group_by], observed=True)[metric].sum().unstack(fill_value=0)
+    days = pd.date_range(wide.index.min(), wide.index.max(), freq="D", name="date")
+    wide = wide.reindex(days, fill_value=0).astype("float64")
+    wide.columns = wide.columns.astype(str)
+    return wide.sort_index(axis=1)
+
+
+def compute_statistics(daily: pd.DataFrame, start: int = 0) -> dict[str, pd.DataFrame]:
+    """Return moving averages and month-to-date sums for rows ``start`` onwards.
+
+    Only the context the statistics need is read before ``start``: the
+    longest window for the moving averages and the start of ``start``'s month
+    for the cumulative sums.
+    """
+
+    result: dict[str, pd.DataFrame] = {}
+    context = max(0, start - (max(ROLLING_WINDOWS) - 1))
+    window_rows = daily.iloc[context:]
+    for window in ROLLING_WINDOWS:
+        result[f"ma_{window}d"] = window_rows.rolling(window, min_periods=1).mean().iloc[start - context :]
+
+    if start < len(daily):
+        month_start = daily.index[start].normalize().replace(day=1)
+        context = int(daily.index.searchsorted(month_start))
+    else:
+        context = start
+    month_rows = daily.iloc[context:]
+    months = month_rows.index.tz_localize(None).to_period("M")
+    result["mtd"] = month_rows.groupby(months).cumsum().iloc[start - context :]
+    return result
+
+
+def first_changed_row(previous: pd.DataFrame, current: pd.DataFrame) -> int | None:
+    """Return the first row where ``current`` differs from ``previous``.
+
+    ``None`` means the change cannot be expressed as a tail update (history
+    was truncated or starts on another day) and everything must be recomputed.
+    """
+
+    if previous.empty or current.empty or current.index[0] != previous.index[0] or len(current) < len(previous):
+        return None
+    if not set(previous.columns) <= set(current.columns):
+        # A series disappeared entirely.
+        return None
+    overlap = current.iloc[: len(previous)]
+    aligned = previous.reindex(columns=overlap.columns, fill_value=0.0)
+    differs = (overlap.to_numpy() != aligned.to_numpy()).any(axis=1)
+    return int(differs.argmax()) if differs.any() else len(previous)
+
+
+def to_long(statistics: dict[str, pd.DataFrame], daily: pd.DataFrame, group_by: str | None, metric: str) -> pd.DataFrame:
+    """Flatten wide statistics into ``date, <group_by>, <metric>, ma_7d, ma_30d, mtd`` rows."""
+
+    key_column = group_by or "series"
+    frames = {metric: daily, **statistics}
+    if daily.empty or daily.columns.empty:
+        return pd.DataFrame(columns=["date", key_column, *frames])
+    stacked = pd.concat({name: frame.stack(future_stack=True) for name, frame in frames.items()}, axis=1)
+    stacked.index = stacked.index.set_names(["date", key_column])
+    result = stacked.reset_index()
+    result["date"] = result["date"].dt.date
+    return result.sort_values(["date", key_column], ignore_index=True)
+
+
+@dataclass
+class _SeriesState:
+    version: str
+    daily: pd.DataFrame
+    statistics: dict[str, pd.DataFrame]
+
+
+class RollingSeriesCache:
+    """Last computed statistics per ``(source, group_by, metric)``, updated incrementally.
+
+    When a new dataset version only changes or appends recent days, the
+    unchanged prefix of every statistic is kept and only rows from the first
+    changed day onwards are recomputed.
+    """
+
+    def __init__(self, max_entries: int = 32) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self._max_entries = max_entries
+        self._states: OrderedDict[tuple[str, str | None, str], _SeriesState] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def memory_usage(self) -> dict[str, int]:
+        """Return the number of cached series and the bytes their matrices and statistics hold."""
+
+        with self._lock:
+            states = list(self._states.values())
+        return {"entries": len(states), "bytes": sum(deep_sizeof(state) for state in states)}
+
+    def statistics(
+        self,
+        source: str,
+        version: str,
+        group_by: str | None,
+        metric: str,
+        load_daily: Callable[[], pd.DataFrame],
+    ) -> tuple[pd.DataFrame, dict[str, pd.DataFrame]]:
+        """Return the daily matrix and its statistics for ``version``."""
+
+        key = (source, group_by, metric)
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                self._states.move_to_end(key)
+        if state is not None and state.version == version:
+            SERIES_UPDATES.inc(mode="unchanged")
+            return state.daily, state.statistics
+
+        daily = load_daily()
+        start = first_changed_row(state.daily, daily) if state is not None else None
+        if start is None:
+            statistics = compute_statistics(daily)
+            SERIES_UPDATES.inc(mode="full")
+        else:
+            tail = compute_statistics(daily, start)
+            statistics = {
+                name: pd.concat([state.statistics[name].iloc[:start].reindex(columns=daily.columns, fill_value=0.0), tail[name]])
+                for name in tail
+            }
+            SERIES_UPDATES.inc(mode="incremental")
+
+        with self._lock:
+            self._states[key] = _SeriesState(version, daily, statistics)
+            self._states.move_to_end(key)
+            while len(self._states) > self._max_entries:
+                self._states.popitem(last=False)
+        return daily, statistics
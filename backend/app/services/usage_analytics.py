@@ -2,112 +2,666 @@
 
 from __future__ import annotations
 
-from collections.abc import Sequence
+from collections.abc import Callable, Hashable, Iterator, Sequence
+from dataclasses import replace
 from typing import Any
 
+import numpy as np
 import pandas as pd
 
-from app.dto.usage_event import UsageEventDTO
+from app.observability import phase
+from app.observability.metrics import ROWS_SCANNED
 from app.repositories.csv_usage_repository import CSVUsageRepository
+from app.services import columnar_aggregates
+from app.services.anomaly_detection import AnomalyDetector
+from app.services.batch_queries import BatchQuery, ChunkSelector
+from app.services.downsampling import downsample
+from app.services.period_comparison import Period, compare_periods, resolve_periods
+from app.services.result_cache import ResultCache
+from app.services.rolling_series import (
+    SERIES_GROUPS,
+    SERIES_METRICS,
+    RollingSeriesCache,
+    compute_statistics,
+    daily_matrix,
+    to_long,
+)
+from app.settings import resolve_anomaly_ewma_alpha, resolve_anomaly_min_days
 
 
 class UsageAnalyticsService:
-    """Service that provides aggregated analytics over usage events."""
+    """Service that provides aggregated analytics over usage events.
 
-    def __init__(self, repository: CSVUsageRepository) -> None:
+    Aggregates are answered from the repository's daily rollup whenever the
+    requested window is made of whole UTC days; windows with a time component
+    fall back to scanning raw rows, directly on the memory-mapped arrays when
+    the repository is backed by a columnar store.
+
+    With a :class:`ResultCache`, results are memoised per dataset version and
+    normalised parameters, so repeated dashboard queries skip the groupby and
+    sort entirely. A :class:`RollingSeriesCache` and an
+    :class:`AnomalyDetector` let moving-average series and anomaly statistics
+    be refreshed incrementally when a new dataset version only adds recent
+    days.
+    """
+
+    def __init__(
+        self,
+        repository: CSVUsageRepository,
+        result_cache: ResultCache | None = None,
+        series_cache: RollingSeriesCache | None = None,
+        anomaly_detector: AnomalyDetector | None = None,
+    ) -> None:
         self._repository = repository
+        self._result_cache = result_cache
+        self._series_cache = series_cache
+        self._anomaly_detector = anomaly_detector
+        self._dataframe: pd.DataFrame | None = None
+        self._rollup: pd.DataFrame | None = None
 
-    def events_per_day(self) -> pd.DataFrame:
-        """Return the total number of requests per day."""
+    def events_per_day(
+        self, start_date: str | None = None, end_date: str | None = None, max_points: int | None = None
+    ) -> pd.DataFrame:
+        """Return the total number of requests and their cost per day.
 
-        dataframe = self._load_dataframe()
-        if dataframe.empty:
-            return pd.DataFrame(columns=["date", "requests_count"])
-
-        grouped = (
-            dataframe.assign(date=dataframe["date"].dt.date)
-            .groupby("date", as_index=False)["requests"]
-            .sum()
-            .rename(columns={"requests": "requests_count"})
-            .sort_values("date", ignore_index=True)
+        With ``max_points``, longer results are reduced with LTTB on
+        ``requests_count`` so that charts keep their shape at a bounded size.
+        """
+
+        key = (*self._date_key(start_date, end_date), max_points)
+        return self._cached(
+            "events_per_day",
+            key,
+            lambda: downsample(self._events_per_day(start_date, end_date), "date", "requests_count", max_points),
         )
+
+    def _events_per_day(self, start_date: str | None, end_date: str | None) -> pd.DataFrame:
+        dataframe = self._aggregate_source("events_per_day", start_date, end_date)
+        if dataframe.empty:
+            return pd.DataFrame(columns=["date", "requests_count", "cost"])
+
+        with phase("groupby"):
+            grouped = (
+                dataframe.assign(date=dataframe["date"].dt.date)
+                .groupby("date", as_index=False)[["requests", "cost"]]
+                .sum()
+                .rename(columns={"requests": "requests_count"})
+                .sort_values("date", ignore_index=True)
+            )
         return grouped
 
-    def tokens_per_user(self) -> pd.DataFrame:
-        """Return the total number of tokens consumed per user."""
+    def tokens_per_user(self, start_date: str | None = None, end_date: str | None = None) -> pd.DataFrame:
+        """Return the total number of tokens consumed, and their cost, per user."""
+
+        key = self._date_key(start_date, end_date)
+        return self._cached("tokens_per_user", key, lambda: self._tokens_per_user(start_date, end_date))
 
-        dataframe = self._load_dataframe()
+    def _tokens_per_user(self, start_date: str | None, end_date: str | None) -> pd.DataFrame:
+        dataframe = self._aggregate_source("tokens_per_user", start_date, end_date)
         if dataframe.empty:
-            return pd.DataFrame(columns=["user", "total_tokens"])
+            return pd.DataFrame(columns=["user", "total_tokens", "cost"])
 
-        grouped = (
-            dataframe.groupby("user", as_index=False)["total_tokens"]
-            .sum()
-            .sort_values("user", ignore_index=True)
-        )
+        with phase("groupby"):
+            grouped = (
+                dataframe.groupby("user", as_index=False)[["total_tokens", "cost"]]
+                .sum()
+                .sort_values("user", ignore_index=True)
+            )
         return grouped
 
-    def tokens_by_model(self) -> pd.DataFrame:
-        """Return the total number of tokens consumed per model."""
+    def tokens_by_model(self, start_date: str | None = None, end_date: str | None = None) -> pd.DataFrame:
+        """Return the total number of tokens consumed, and their cost, per model."""
 
-        dataframe = self._load_dataframe()
+        key = self._date_key(start_date, end_date)
+        return self._cached("tokens_by_model", key, lambda: self._tokens_by_model(start_date, end_date))
+
+    def _tokens_by_model(self, start_date: str | None, end_date: str | None) -> pd.DataFrame:
+        dataframe = self._aggregate_source("tokens_by_model", start_date, end_date)
         if dataframe.empty:
-            return pd.DataFrame(columns=["model", "total_tokens"])
+            return pd.DataFrame(columns=["model", "total_tokens", "cost"])
 
-        grouped = (
-            dataframe.groupby("model", as_index=False)["total_tokens"]
-            .sum()
-            .sort_values("model", ignore_index=True)
-        )
+        with phase("groupby"):
+            grouped = (
+                dataframe.groupby("model", as_index=False)[["total_tokens", "cost"]]
+                .sum()
+                .sort_values("model", ignore_index=True)
+            )
         return grouped
 
-    def get_raw_data(self, start_date: str | None = None, end_date: str | None = None, user: str | None = None, model: str | None = None) -> pd.DataFrame:
-        """Return raw usage data with optional filtering by date range, user, and model."""
-        
-        dataframe = self._load_dataframe()
-        if dataframe.empty:
-            return pd.DataFrame(columns=self._dataframe_columns())
+    def usage_series(
+        self,
+        group_by: str | None = None,
+        metric: str = "total_tokens",
+        start_date: str | None = None,
+        end_date: str | None = None,
+        key: str | None = None,
+        max_points: int | None = None,
+    ) -> pd.DataFrame:
+        """Return daily ``metric`` with 7/30-day moving averages and month-to-date totals.
+
+        Series are per ``user`` or ``model`` (or one ``all`` series when
+        ``group_by`` is ``None``). Statistics are computed over the full
+        history and only then narrowed to the requested window and ``key``,
+        so the first days of a window still average over earlier days. With
+        ``max_points``, each series is reduced with LTTB on ``metric``.
+        """
+
+        if group_by is not None and group_by not in SERIES_GROUPS:
+            raise ValueError(f"Unsupported group_by '{group_by}'")
+        if metric not in SERIES_METRICS:
+            raise ValueError(f"Unsupported metric '{metric}'")
+        params = (group_by, metric, *self._date_key(start_date, end_date), key or None, max_points)
+        return self._cached(
+            "usage_series",
+            params,
+            lambda: downsample(
+                self._usage_series(group_by, metric, start_date, end_date, key),
+                "date",
+                metric,
+                max_points,
+                group_by or "series",
+            ),
+        )
+
+    def _usage_series(
+        self, group_by: str | None, metric: str, start_date: str | None, end_date: str | None, key: str | None
+    ) -> pd.DataFrame:
+        def load_daily() -> pd.DataFrame:
+            with phase("groupby"):
+                return daily_matrix(self._load_rollup("usage_series"), group_by, metric)
+
+        source = self._repository.source_key()
+        if self._series_cache is not None and source is not None:
+            daily, statistics = self._series_cache.statistics(
+                source, self._repository.dataset_version(), group_by, metric, load_daily
+            )
+        else:
+            daily = load_daily()
+            with phase("rolling"):
+                statistics = compute_statistics(daily)
+
+        start_dt, end_dt = self._date_bounds(start_date, end_date)
+        days = slice(start_dt.floor("D") if start_dt is not None else None, end_dt)
+        columns = [column for column in daily.columns if not key or column == key]
+        with phase("filter"):
+            daily = daily.loc[days].reindex(columns=columns)
+            statistics = {name: frame.loc[days].reindex(columns=columns) for name, frame in statistics.items()}
+        with phase("rolling"):
+            return to_long(statistics, daily, group_by, metric)
+
+    def usage_anomalies(
+        self,
+        group_by: str = "user",
+        metric: str = "total_tokens",
+        z_threshold: float = 3.0,
+        start_date: str | None = None,
+    ) -> pd.DataFrame:
+        """Return recent days whose ``metric`` deviates from a series' norm by at least ``z_threshold``.
+
+        A day is reported when either its z-score against the running mean
+        and standard deviation of earlier days, or against their
+        exponentially weighted counterparts, reaches the threshold in absolute
+        value. Rows are ordered newest first, then by the larger z-score.
+        """
+
+        if group_by not in SERIES_GROUPS:
+            raise ValueError(f"Unsupported group_by '{group_by}'")
+        if metric not in SERIES_METRICS:
+            raise ValueError(f"Unsupported metric '{metric}'")
+        if z_threshold <= 0:
+            raise ValueError("z_threshold must be positive")
+        params = (group_by, metric, float(z_threshold), self._date_key(start_date, None)[0])
+        return self._cached(
+            "usage_anomalies", params, lambda: self._usage_anomalies(group_by, metric, z_threshold, start_date)
+        )
+
+    def _usage_anomalies(self, group_by: str, metric: str, z_threshold: float, start_date: str | None) -> pd.DataFrame:
+        def load_daily() -> pd.DataFrame:
+            with phase("groupby"):
+                return daily_matrix(self._load_rollup("usage_anomalies"), group_by, metric)
+
+        source = self._repository.source_key()
+        if self._anomaly_detector is not None and source is not None:
+            scores = self._anomaly_detector.scores(
+                source, self._repository.dataset_version(), group_by, metric, load_daily
+            )
+        else:
+            # Nothing to resume from: score the whole history with a throwaway,
+            # but configured, detector.
+            detector = AnomalyDetector(resolve_anomaly_min_days(), resolve_anomaly_ewma_alpha())
+            scores = detector.scores("", "", group_by, metric, load_daily)
+
+        with phase("filter"):
+            strongest = scores[["z_score", "ewma_z_score"]].abs().max(axis=1)
+            anomalies = scores.assign(_strength=strongest)[strongest >= z_threshold]
+            start_dt, _ = self._date_bounds(start_date, None)
+            if start_dt is not None:
+                anomalies = anomalies[anomalies["date"] >= start_dt.floor("D")]
+        with phase("sort"):
+            anomalies = anomalies.sort_values(["date", "_strength"], ascending=False, ignore_index=True)
+        anomalies = anomalies.drop(columns="_strength")
+        anomalies["date"] = anomalies["date"].dt.date
+        # Undefined scores (flat or too short histories) are reported as null.
+        return anomalies.astype(object).where(anomalies.notna(), None)
+
+    def compare_periods(
+        self,
+        start_date: str,
+        end_date: str,
+        group_by: str = "user",
+        metric: str = "total_tokens",
+        previous_start_date: str | None = None,
+        previous_end_date: str | None = None,
+        offset_days: int | None = None,
+    ) -> tuple[pd.DataFrame, Period, Period]:
+        """Compare ``metric`` per ``group_by`` between a window of whole days and an earlier one.
+
+        Returns the comparison (see :func:`period_comparison.compare_periods`)
+        and the two periods it covers (``change_pct`` is None where the previous
+        value is zero); by default the previous period is the
+        same number of days right before the current one.
+        """
+
+        if group_by not in SERIES_GROUPS:
+            raise ValueError(f"Unsupported group_by '{group_by}'")
+        if metric not in SERIES_METRICS:
+            raise ValueError(f"Unsupported metric '{metric}'")
+        current, previous = resolve_periods(start_date, end_date, previous_start_date, previous_end_date, offset_days)
+        params = (group_by, metric, str(current), str(previous))
+
+        def compute() -> pd.DataFrame:
+            rollup = self._load_rollup("compare_periods")
+            with phase("groupby"):
+                comparison = compare_periods(rollup, group_by, metric, current, previous)
+            return comparison.astype(object).where(comparison.notna(), None)
+
+        return self._cached("compare_periods", params, compute), current, previous
+
+    def get_raw_data(
+        self,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        user: str | None = None,
+        model: str | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> pd.DataFrame:
+        """Return raw usage data with optional filtering by date range, user, and model.
+
+        ``fields`` narrows the result to those columns, and only they (plus
+        the columns the filters and ordering need) are read from the source.
+        """
+
+        fields = self._validate_fields(fields)
+        params = (*self._date_key(start_date, end_date), user or None, model or None, fields)
+        return self._cached(
+            "get_raw_data", params, lambda: self._get_raw_data(start_date, end_date, user, model, fields)
+        )
+
+    def _get_raw_data(
+        self,
+        start_date: str | None,
+        end_date: str | None,
+        user: str | None,
+        model: str | None,
+        fields: tuple[str, ...] | None = None,
+    ) -> pd.DataFrame:
+        table = self._repository.get_columnar_table()
+        if table is not None:
+            start_dt, end_dt = self._date_bounds(start_date, end_date)
+            equals = {column: value for column, value in (("user", user), ("model", model)) if value}
+            with phase("filter"):
+                mask = columnar_aggregates.row_mask(table, start_dt, end_dt, equals)
+            ROWS_SCANNED.inc(table.rows, operation="get_raw_data")
+            with phase("sort"):
+                # Plain strings, as from CSV: categoricals would sort by dictionary order.
+                return columnar_aggregates.select_rows(table, mask, categorical=False, columns=fields)
+
+        matches = list(self._iter_matches("get_raw_data", start_date, end_date, user, model, fields))
+        if not matches:
+            return pd.DataFrame(columns=list(fields or self._dataframe_columns()))
+        dataframe = matches[0] if len(matches) == 1 else pd.concat(matches, ignore_index=True)
         
-        # Apply date filtering if provided
-        if start_date:
-            start_dt = pd.to_datetime(start_date, utc=True)
-            dataframe = dataframe[dataframe["date"] >= start_dt]
+        # Sort by date descending (newest first)
+        with phase("sort"):
+            dataframe = dataframe.sort_values("date", ascending=False, ignore_index=True)
         
+        return dataframe if fields is None else dataframe[list(fields)]
+
+    def iter_raw_data(
+        self,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        user: str | None = None,
+        model: str | None = None,
+        fields: Sequence[str] | None = None,
+        chunk_rows: int = 100_000,
+    ) -> Iterator[pd.DataFrame]:
+        """Return an iterator over the rows :meth:`get_raw_data` selects, at most ``chunk_rows`` at a time.
+
+        Rows come in source order and nothing is sorted or cached, so memory
+        stays bounded by one chunk of the source however many rows match;
+        meant for exports. The arguments are validated before this returns,
+        and at least one, possibly empty, dataframe is yielded.
+        """
+
+        fields = self._validate_fields(fields)
+        self._date_bounds(start_date, end_date)
+        if chunk_rows <= 0:
+            raise ValueError("chunk_rows must be positive")
+        return self._iter_raw_data(start_date, end_date, user, model, fields, chunk_rows)
+
+    def _iter_raw_data(
+        self,
+        start_date: str | None,
+        end_date: str | None,
+        user: str | None,
+        model: str | None,
+        fields: tuple[str, ...] | None,
+        chunk_rows: int,
+    ) -> Iterator[pd.DataFrame]:
+        table = self._repository.get_columnar_table()
+        if table is None:
+            empty = True
+            for dataframe in self._iter_matches("export", start_date, end_date, user, model, fields):
+                for start in range(0, len(dataframe), chunk_rows):
+                    part = dataframe.iloc[start : start + chunk_rows]
+                    empty = False
+                    yield part if fields is None else part[list(fields)]
+            if empty:
+                yield pd.DataFrame(columns=list(fields or self._dataframe_columns()))
+            return
+
+        start_dt, end_dt = self._date_bounds(start_date, end_date)
+        equals = {column: value for column, value in (("user", user), ("model", model)) if value}
+        with phase("filter"):
+            indices = np.flatnonzero(columnar_aggregates.row_mask(table, start_dt, end_dt, equals))
+        ROWS_SCANNED.inc(table.rows, operation="export")
+        # A selection without rows still yields one empty chunk, which carries the columns.
+        for start in range(0, max(len(indices), 1), chunk_rows):
+            yield table.take(indices[start : start + chunk_rows], fields, categorical=False)
+
+    def _iter_matches(
+        self,
+        operation: str,
+        start_date: str | None,
+        end_date: str | None,
+        user: str | None,
+        model: str | None,
+        fields: tuple[str, ...] | None,
+    ) -> Iterator[pd.DataFrame]:
+        # Columns to load: the requested ones plus what filtering and sorting read.
+        columns = None
+        if fields is not None:
+            needed = {*fields, "date", *(column for column, value in (("user", user), ("model", model)) if value)}
+            columns = [column for column in self._dataframe_columns() if column in needed]
+
+        # Filter chunk by chunk so that chunked repositories never hold more
+        # than one unfiltered chunk in memory.
+        for dataframe in self._iter_dataframes(operation, columns):
+            # Apply date filtering if provided
+            dataframe = self._filter_by_date(dataframe, start_date, end_date)
+
+            with phase("filter"):
+                # Apply user filtering if provided
+                if user:
+                    dataframe = dataframe[dataframe["user"] == user]
+
+                # Apply model filtering if provided
+                if model:
+                    dataframe = dataframe[dataframe["model"] == model]
+            yield dataframe
+
+    def raw_data_page(
+        self,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        user: str | None = None,
+        model: str | None = None,
+        sort_by: str = "date",
+        descending: bool = True,
+        offset: int = 0,
+        limit: int = 100,
+        fields: Sequence[str] | None = None,
+    ) -> tuple[pd.DataFrame, int]:
+        """Return one page of filtered raw rows ordered by ``sort_by``, and the total row count.
+
+        The sorted result is cached per filter, ordering and ``fields``, so
+        moving between pages only slices it.
+        """
+
+        if sort_by not in self._dataframe_columns():
+            raise ValueError(f"Unsupported sort column '{sort_by}'")
+        if offset < 0 or limit <= 0:
+            raise ValueError("offset must not be negative and limit must be positive")
+        fields = self._validate_fields(fields)
+        # The sort column is loaded even when it is not among the returned fields.
+        loaded = None if fields is None else (*fields, *([sort_by] if sort_by not in fields else []))
+        filters = (*self._date_key(start_date, end_date), user or None, model or None, fields)
+
+        def compute() -> pd.DataFrame:
+            rows = self.get_raw_data(start_date, end_date, user, model, loaded)
+            ordered = self._sort_raw_data(rows, sort_by, descending)
+            return ordered if fields is None else ordered[list(fields)]
+
+        ordered = self._cached("raw_data_sorted", (*filters, sort_by, descending), compute)
+        return ordered.iloc[offset : offset + limit].reset_index(drop=True), len(ordered)
+
+    @staticmethod
+    def _sort_raw_data(dataframe: pd.DataFrame, sort_by: str, descending: bool) -> pd.DataFrame:
+        if sort_by == "date" and descending:
+            # get_raw_data already returns the newest rows first.
+            return dataframe
+        with phase("sort"):
+            return dataframe.sort_values(sort_by, ascending=not descending, kind="stable", ignore_index=True)
+
+    @classmethod
+    def _validate_fields(cls, fields: Sequence[str] | None) -> tuple[str, ...] | None:
+        if not fields:
+            return None
+        unknown = [field for field in fields if field not in cls._dataframe_columns()]
+        if unknown:
+            raise ValueError(f"Unsupported fields: {', '.join(unknown)}")
+        return tuple(dict.fromkeys(fields))
+
+    def raw_data_summary(
+        self, start_date: str | None = None, end_date: str | None = None, user: str | None = None, model: str | None = None
+    ) -> dict[str, float | int]:
+        """Return row count, distinct users and token, request and cost sums for the raw-data filters.
+
+        Whole-day windows are answered from the daily rollup, so the summary
+        never materialises the matching raw rows.
+        """
+
+        params = (*self._date_key(start_date, end_date), user or None, model or None)
+        return self._cached(
+            "raw_data_summary", params, lambda: self._raw_data_summary(start_date, end_date, user, model)
+        )
+
+    def _raw_data_summary(
+        self, start_date: str | None, end_date: str | None, user: str | None, model: str | None
+    ) -> dict[str, float | int]:
+        dataframe = self._aggregate_source("raw_data_summary", start_date, end_date)
+        with phase("filter"):
+            if user:
+                dataframe = dataframe[dataframe["user"] == user]
+            if model:
+                dataframe = dataframe[dataframe["model"] == model]
+        with phase("groupby"):
+            return self._summarize(dataframe)
+
+    @staticmethod
+    def _summarize(dataframe: pd.DataFrame) -> dict[str, float | int]:
+        records = int(dataframe["events"].sum()) if "events" in dataframe.columns else len(dataframe)
+        return {
+            "records": records,
+            "users": int(dataframe["user"].nunique()),
+            "total_tokens": int(dataframe["total_tokens"].sum()),
+            "requests": int(dataframe["requests"].sum()),
+            "cost": float(dataframe["cost"].sum()),
+        }
+
+    def batch(self, queries: Sequence[BatchQuery]) -> dict[str, pd.DataFrame | dict[str, float | int]]:
+        """Answer every query of a batch, keyed by query id in request order.
+
+        ``raw_data`` queries share a single pass over the raw rows and
+        whole-day ``raw_data_summary`` queries a single pass over the daily
+        rollup, so a batch costs about one scan however many queries it
+        holds. Other queries go through the regular, cached methods.
+        """
+
+        ids = [query.id for query in queries]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Query ids must be unique")
+        queries = [replace(query, fields=self._validate_fields(query.fields)) for query in queries]
+
+        raw = [query for query in queries if query.kind == "raw_data"]
+        summaries = [
+            query
+            for query in queries
+            if query.kind == "raw_data_summary"
+            and self._is_day_aligned(query.start_date)
+            and self._is_day_aligned(query.end_date)
+        ]
+        results: dict[str, pd.DataFrame | dict[str, float | int]] = {}
+        if raw:
+            results.update(self._batch_raw_data(raw))
+        if summaries:
+            results.update(self._batch_summaries(summaries))
+        for query in queries:
+            if query.id in results:
+                continue
+            if query.kind == "raw_data_summary":
+                results[query.id] = self.raw_data_summary(query.start_date, query.end_date, query.user, query.model)
+            else:
+                results[query.id] = getattr(self, query.kind)(query.start_date, query.end_date)
+        return {query_id: results[query_id] for query_id in ids}
+
+    def _batch_raw_data(self, queries: Sequence[BatchQuery]) -> dict[str, pd.DataFrame]:
+        users = pd.Index(sorted({query.user for query in queries if query.user}))
+        models = pd.Index(sorted({query.model for query in queries if query.model}))
+        bounds = {query.id: self._date_bounds(query.start_date, query.end_date) for query in queries}
+        columns = None
+        if all(query.fields is not None for query in queries):
+            needed = {"date", "user", "model", *(field for query in queries for field in query.fields)}
+            columns = [column for column in self._dataframe_columns() if column in needed]
+
+        parts: dict[str, list[pd.DataFrame]] = {query.id: [] for query in queries}
+        for dataframe in self._iter_dataframes("batch", columns):
+            with phase("filter"):
+                selector = ChunkSelector(dataframe, users, models)
+                for query in queries:
+                    rows = selector.positions(query, *bounds[query.id])
+                    if len(rows):
+                        parts[query.id].append(dataframe.iloc[rows])
+
+        results = {}
+        with phase("sort"):
+            for query in queries:
+                selected = parts[query.id]
+                if not selected:
+                    dataframe = pd.DataFrame(columns=list(query.fields or columns or self._dataframe_columns()))
+                else:
+                    dataframe = selected[0] if len(selected) == 1 else pd.concat(selected, ignore_index=True)
+                    dataframe = dataframe.sort_values("date", ascending=False, kind="stable", ignore_index=True)
+                if query.fields is not None:
+                    dataframe = dataframe[list(query.fields)]
+                results[query.id] = dataframe if query.limit is None else dataframe.head(query.limit)
+        return results
+
+    def _batch_summaries(self, queries: Sequence[BatchQuery]) -> dict[str, dict[str, float | int]]:
+        rollup = self._load_rollup("batch")
+        users = pd.Index(sorted({query.user for query in queries if query.user}))
+        models = pd.Index(sorted({query.model for query in queries if query.model}))
+        with phase("filter"):
+            selector = ChunkSelector(rollup, users, models)
+            selected = {
+                query.id: rollup.iloc[selector.positions(query, *self._date_bounds(query.start_date, query.end_date))]
+                for query in queries
+            }
+        with phase("groupby"):
+            return {query_id: self._summarize(dataframe) for query_id, dataframe in selected.items()}
+
+    def _cached(self, method: str, params: Hashable, compute: Callable[[], Any]) -> Any:
+        source = self._repository.source_key()
+        if self._result_cache is None or source is None:
+            return compute()
+        version = self._repository.dataset_version()
+        return self._result_cache.get_or_compute(source, version, method, params, compute)
+
+    @classmethod
+    def _date_key(cls, start_date: str | None, end_date: str | None) -> tuple[int | None, int | None]:
+        # Equivalent spellings ("2025-01-01" vs "2025-01-01T00:00:00Z") share an entry.
+        start_dt, end_dt = cls._date_bounds(start_date, end_date)
+        return (
+            start_dt.value if start_dt is not None else None,
+            end_dt.value if end_dt is not None else None,
+        )
+
+    @staticmethod
+    def _date_bounds(start_date: str | None, end_date: str | None) -> tuple[pd.Timestamp | None, pd.Timestamp | None]:
+        start_dt = pd.to_datetime(start_date, utc=True) if start_date else None
+        end_dt = None
         if end_date:
             # If end_date is just a date (no time), set it to end of day
             end_dt = pd.to_datetime(end_date, utc=True)
             if end_dt.time() == pd.Timestamp("00:00:00").time():
                 end_dt = end_dt.replace(hour=23, minute=59, second=59, microsecond=999999)
-            dataframe = dataframe[dataframe["date"] <= end_dt]
-        
-        # Apply user filtering if provided
-        if user:
-            dataframe = dataframe[dataframe["user"] == user]
-        
-        # Apply model filtering if provided
-        if model:
-            dataframe = dataframe[dataframe["model"] == model]
-        
-        # Sort by date descending (newest first)
-        dataframe = dataframe.sort_values("date", ascending=False, ignore_index=True)
-        
+        return start_dt, end_dt
+
+    @classmethod
+    def _filter_by_date(cls, dataframe: pd.DataFrame, start_date: str | None, end_date: str | None) -> pd.DataFrame:
+        start_dt, end_dt = cls._date_bounds(start_date, end_date)
+        with phase("filter"):
+            if start_dt is not None:
+                dataframe = dataframe[dataframe["date"] >= start_dt]
+            if end_dt is not None:
+                dataframe = dataframe[dataframe["date"] <= end_dt]
         return dataframe
 
-    def _load_dataframe(self) -> pd.DataFrame:
-        events = self._repository.get_events()
-        if not events:
-            return pd.DataFrame(columns=self._dataframe_columns())
+    @staticmethod
+    def _is_day_aligned(value: str | None) -> bool:
+        return value is None or pd.to_datetime(value, utc=True).time() == pd.Timestamp("00:00:00").time()
 
-        return pd.DataFrame.from_records(
-            (self._event_to_dict(event) for event in events),
-            columns=self._dataframe_columns(),
-        )
+    def _aggregate_source(self, operation: str, start_date: str | None, end_date: str | None) -> pd.DataFrame:
+        if self._is_day_aligned(start_date) and self._is_day_aligned(end_date):
+            return self._filter_by_date(self._load_rollup(operation), start_date, end_date)
 
-    @staticmethod
-    def _event_to_dict(event: UsageEventDTO) -> dict[str, Any]:
-        if hasattr(event, "model_dump"):
-            return event.model_dump(mode="python")  # type: ignore[call-arg]
-        return event.dict()
+        table = self._repository.get_columnar_table()
+        if table is None:
+            return self._filter_by_date(self._load_dataframe(operation), start_date, end_date)
+
+        # Sub-day windows on a columnar store: mask the timestamp array and
+        # roll up only the selected rows, without building a raw dataframe.
+        start_dt, end_dt = self._date_bounds(start_date, end_date)
+        with phase("filter"):
+            mask = columnar_aggregates.row_mask(table, start_dt, end_dt)
+        ROWS_SCANNED.inc(table.rows, operation=operation)
+        with phase("groupby"):
+            return columnar_aggregates.daily_rollup(table, mask)
+
+    def _load_rollup(self, operation: str) -> pd.DataFrame:
+        # A service instance answers one request (or one CLI run), so loaded
+        # data is kept for the lifetime of the instance.
+        if self._rollup is None:
+            self._rollup = self._repository.get_daily_rollup()
+        ROWS_SCANNED.inc(len(self._rollup), operation=operation)
+        return self._rollup
+
+    def _load_dataframe(self, operation: str) -> pd.DataFrame:
+        if self._dataframe is None:
+            self._dataframe = self._repository.get_dataframe()
+        ROWS_SCANNED.inc(len(self._dataframe), operation=operation)
+        return self._dataframe
+
+    def _iter_dataframes(self, operation: str, columns: Sequence[str] | None = None) -> Iterator[pd.DataFrame]:
+        if self._dataframe is not None:
+            chunks = [self._dataframe if columns is None else self._dataframe[list(columns)]]
+        else:
+            chunks = self._repository.iter_dataframes(columns)
+        for dataframe in chunks:
+            ROWS_SCANNED.inc(len(dataframe), operation=operation)
+            if not dataframe.empty:
+                yield dataframe
 
     @staticmethod
     def _dataframe_columns() -> Sequence[str]:
@@ -123,5 +677,5 @@ class UsageAnalyticsService:
             "output_tokens",
             "total_tokens",
             "requests",
+            "cost",
         ]
-
@@ -0,0 +1,195 @@
+"""Validation, de-duplication and merging of uploaded usage exports."""
+
+from __future__ import annotations
+
+import tempfile
+import threading
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from app.observability.metrics import INGESTED_ROWS
+from app.repositories import DatasetRegistry
+from app.repositories.chunked_csv_usage_repository import DEFAULT_CHUNK_ROWS
+from app.repositories.csv_usage_repository import (
+    CSV_DATE_FORMAT,
+    EXPORT_COLUMNS,
+    NUMERIC_COLUMNS,
+    USAGE_COLUMNS,
+    CSVUsageRepository,
+    append_usage_rows,
+    normalize_usage_frame,
+)
+from app.repositories.pricing import PriceTable
+
+
+# Rejected rows listed in a response; the count covers all of them.
+MAX_REPORTED_REJECTIONS = 20
+_REQUIRED_DIMENSIONS = ["User", "Kind", "Model"]
+_RAW_COUNTERS = [raw for raw, column in zip(EXPORT_COLUMNS, USAGE_COLUMNS) if column in NUMERIC_COLUMNS]
+
+
+class IngestUnavailableError(RuntimeError):
+    """Raised when the dataset cannot accept uploads in the current configuration."""
+
+
+@dataclass
+class IngestStats:
+    """Outcome of one upload."""
+
+    dataset: str
+    received: int = 0
+    accepted: int = 0
+    rejected: int = 0
+    duplicates: int = 0
+    dataset_version: str | None = None
+    rejections: list[dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def iter_upload_chunks(path: str | Path, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Yield the export columns of an uploaded CSV as text, ``chunk_rows`` rows at a time.
+
+    Raises :class:`ValueError` when the header lacks any export column.
+    """
+
+    header = pd.read_csv(path, nrows=0).columns
+    missing = set(EXPORT_COLUMNS) - set(header)
+    if missing:
+        raise ValueError(f"Upload is missing required columns: {', '.join(sorted(missing))}")
+    with pd.read_csv(path, chunksize=chunk_rows, usecols=EXPORT_COLUMNS, dtype=str) as reader:
+        yield from reader
+
+
+def validate_usage_rows(raw: pd.DataFrame, price_table: PriceTable) -> tuple[pd.DataFrame, pd.DataFrame, pd.Series]:
+    """Split a text chunk of an export into valid and rejected rows.
+
+    Returns the valid rows normalised to the usage schema, the same rows as
+    export text (what gets persisted, with timestamps rewritten in the
+    export's own format) and the rejection reason of every other row,
+    indexed by its position in the upload.
+    """
+
+    reasons = pd.Series(None, index=raw.index, dtype=object)
+
+    def reject(mask: pd.Series, reason: str) -> None:
+        reasons[mask & reasons.isna()] = reason
+
+    dates = pd.to_datetime(raw["Date"], utc=True, errors="coerce", format="ISO8601")
+    reject(dates.isna(), "invalid Date")
+    for column in _REQUIRED_DIMENSIONS:
+        reject(raw[column].isna() | (raw[column].str.strip() == ""), f"missing {column}")
+    counters = raw[_RAW_COUNTERS].apply(pd.to_numeric, errors="coerce")
+    for column in _RAW_COUNTERS:
+        reject(raw[column].notna() & counters[column].isna(), f"invalid {column}")
+        reject(counters[column] < 0, f"negative {column}")
+
+    valid = reasons.isna()
+    raw_valid = raw[valid].assign(Date=dates[valid].dt.strftime(CSV_DATE_FORMAT))
+    typed = raw_valid.assign(**{column: counters.loc[valid, column] for column in _RAW_COUNTERS})
+    events = normalize_usage_frame(typed, "upload", CSV_DATE_FORMAT, price_table)
+    return events, raw_valid, reasons[~valid]
+
+
+def row_hashes(events: pd.DataFrame) -> np.ndarray:
+    """Hash each normalised row over the export columns; equal rows hash equally."""
+
+    return pd.util.hash_pandas_object(events[USAGE_COLUMNS], index=False).to_numpy()
+
+
+class UsageIngestor:
+    """Merges uploads into datasets, one upload per dataset at a time.
+
+    A row is a duplicate when every export column equals an existing row or
+    an earlier row of the same upload. The hashes of each dataset's rows are
+    kept per version, so consecutive uploads only hash the rows they add.
+
+    Accepted rows are staged on disk chunk by chunk and appended to the
+    source in chunks, so an upload costs about one chunk of memory on top of
+    the hash index. The staged file is also what a store-backed dataset
+    ingests into its new version. Only when the registry holds the dataset as
+    a dataframe are the normalised rows also kept, to be folded into it
+    without a reload; they then become part of the resident dataset anyway.
+    """
+
+    def __init__(self, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> None:
+        if chunk_rows <= 0:
+            raise ValueError("chunk_rows must be positive")
+        self._chunk_rows = chunk_rows
+        self._hashes: dict[str, tuple[str, np.ndarray]] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def ingest(self, registry: DatasetRegistry, dataset_id: str, upload: str | Path) -> IngestStats:
+        """Validate the CSV at ``upload`` and merge its new rows into ``dataset_id``."""
+
+        if registry.attach_only:
+            raise IngestUnavailableError("This worker only attaches to published datasets; upload to the loader")
+        source = registry.source_path(dataset_id)
+        if not source.is_dir() and source.suffix != ".csv":
+            raise IngestUnavailableError(f"Cannot append to compressed export {source.name}; configure a directory")
+        with self._lock:
+            lock = self._locks.setdefault(dataset_id, threading.Lock())
+
+        with lock, tempfile.TemporaryDirectory(prefix="usage-ingest-") as tmp_dir:
+            repository = registry.repository(dataset_id)
+            known = self._known_hashes(dataset_id, repository.dataset_version(), repository)
+            keep_events = registry.holds_dataframe(dataset_id)
+            staged = Path(tmp_dir) / "accepted.csv"
+            stats = IngestStats(dataset_id)
+            events: list[pd.DataFrame] = []
+            for raw in iter_upload_chunks(upload, self._chunk_rows):
+                stats.received += len(raw)
+                valid, raw_valid, reasons = validate_usage_rows(raw, repository.price_table)
+                stats.rejected += len(reasons)
+                for position, reason in reasons.head(MAX_REPORTED_REJECTIONS - len(stats.rejections)).items():
+                    # Line 1 is the header.
+                    stats.rejections.append({"line": int(position) + 2, "reason": reason})
+
+                hashes = row_hashes(valid)
+                duplicate = np.isin(hashes, known) | pd.Series(hashes).duplicated().to_numpy()
+                stats.duplicates += int(duplicate.sum())
+                if not duplicate.all():
+                    raw_valid[~duplicate].to_csv(staged, mode="a", header=not stats.accepted, index=False)
+                    stats.accepted += int((~duplicate).sum())
+                    if keep_events:
+                        events.append(valid[~duplicate])
+                    known = np.union1d(known, hashes[~duplicate])
+
+            if stats.accepted:
+
+                def persist() -> None:
+                    with pd.read_csv(staged, dtype=str, chunksize=self._chunk_rows) as staged_rows:
+                        append_usage_rows(source, staged_rows)
+
+                merged = pd.concat(events, ignore_index=True) if events else None
+                version = registry.merge(dataset_id, merged, persist, staged)
+                self._hashes[dataset_id] = (version, known)
+                stats.dataset_version = version
+            else:
+                stats.dataset_version = repository.dataset_version()
+
+        for result in ("accepted", "rejected", "duplicates"):
+            INGESTED_ROWS.inc(getattr(stats, result), dataset=dataset_id, result=result)
+        return stats
+
+    def memory_usage(self) -> dict[str, Any]:
+        """Return the bytes held by the row-hash index kept for de-duplication, per dataset."""
+
+        datasets = {dataset_id: int(hashes.nbytes) for dataset_id, (_, hashes) in self._hashes.items()}
+        return {"entries": len(datasets), "bytes": sum(datasets.values()), "datasets": datasets}
+
+    def _known_hashes(self, dataset_id: str, version: str, repository: CSVUsageRepository) -> np.ndarray:
+        cached = self._hashes.get(dataset_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        chunks = [row_hashes(chunk) for chunk in repository.iter_dataframes(USAGE_COLUMNS)]
+        known = np.unique(np.concatenate(chunks)) if chunks else np.empty(0, dtype=np.uint64)
+        self._hashes[dataset_id] = (version, known)
+        return known
@@ -0,0 +1,170 @@
+"""Environment-driven configuration shared by the API and command-line tools."""
+
+from __future__ import annotations
+
+import tempfile
+from os import getenv
+from pathlib import Path
+
+
+DEFAULT_CSV_PATH = Path(__file__).resolve().parent / "data" / "usage.csv"
+
+
+def resolve_csv_path() -> Path:
+    """Return the CSV path configured for usage analytics."""
+
+    csv_path = getenv("USAGE_CSV_PATH")
+    if csv_path:
+        return Path(csv_path)
+    return DEFAULT_CSV_PATH
+
+
+def resolve_snapshot_dir() -> Path | None:
+    """Return the directory holding precomputed report snapshots, if configured."""
+
+    snapshot_dir = getenv("USAGE_SNAPSHOT_DIR")
+    if snapshot_dir:
+        return Path(snapshot_dir)
+    return None
+
+
+def resolve_metrics_enabled() -> bool:
+    """Return whether request phase timing and metrics recording are switched on."""
+
+    return getenv("USAGE_METRICS_ENABLED", "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def resolve_allocation_profiling_enabled() -> bool:
+    """Return whether requests may ask for a tracemalloc profile of their allocations."""
+
+    return getenv("USAGE_ALLOCATION_PROFILING", "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def resolve_store_dir() -> Path | None:
+    """Return the directory for the on-disk columnar store; enables chunked ingestion when set."""
+
+    store_dir = getenv("USAGE_STORE_DIR")
+    if store_dir:
+        return Path(store_dir)
+    return None
+
+
+def resolve_store_attach_only() -> bool:
+    """Return whether workers only map versions published into the store instead of reading the CSV."""
+
+    return getenv("USAGE_STORE_ATTACH_ONLY", "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def resolve_chunk_rows(default: int = 100_000) -> int:
+    """Return the number of CSV rows ingested per chunk."""
+
+    return int(getenv("USAGE_CHUNK_ROWS", default))
+
+
+DEFAULT_DATASET_ID = "default"
+
+
+def resolve_dataset_paths() -> dict[str, Path]:
+    """Return the configured dataset ids mapped to their CSV paths.
+
+    ``USAGE_DATASETS`` holds comma-separated ``id=path`` pairs, e.g.
+    ``team-a=/data/a.csv,team-b=/data/b.csv``. The ``default`` dataset always
+    exists and points at :func:`resolve_csv_path` unless overridden there.
+    """
+
+    datasets = {DEFAULT_DATASET_ID: resolve_csv_path()}
+    for entry in getenv("USAGE_DATASETS", "").split(","):
+        if not entry.strip():
+            continue
+        dataset_id, separator, path = entry.partition("=")
+        if not separator or not dataset_id.strip() or not path.strip():
+            raise ValueError(f"Invalid USAGE_DATASETS entry {entry!r}; expected 'id=path'")
+        datasets[dataset_id.strip()] = Path(path.strip())
+    return datasets
+
+
+def resolve_dataset_memory_budget(default_mb: int = 1024) -> int:
+    """Return the memory budget in bytes for datasets kept loaded in the process."""
+
+    return int(float(getenv("USAGE_DATASET_MEMORY_BUDGET_MB", default_mb)) * 1024 * 1024)
+
+
+def resolve_result_cache_size(default: int = 256) -> int:
+    """Return how many query results the service keeps cached; ``0`` disables the cache."""
+
+    return int(getenv("USAGE_RESULT_CACHE_SIZE", default))
+
+
+def resolve_result_cache_ttl(default: float = 300.0) -> float:
+    """Return how long, in seconds, a cached query result stays valid."""
+
+    return float(getenv("USAGE_RESULT_CACHE_TTL_SECONDS", default))
+
+
+def resolve_compression_min_bytes(default: int = 1024) -> int:
+    """Return the smallest response body, in bytes, worth compressing."""
+
+    return int(getenv("USAGE_COMPRESSION_MIN_BYTES", default))
+
+
+DEFAULT_PRICE_TABLE_PATH = Path(__file__).resolve().parent / "data" / "prices.json"
+
+
+def resolve_price_table_path() -> Path:
+    """Return the JSON price table used to compute per-row cost."""
+
+    price_table = getenv("USAGE_PRICE_TABLE")
+    if price_table:
+        return Path(price_table)
+    return DEFAULT_PRICE_TABLE_PATH
+
+
+def resolve_anomaly_z_threshold(default: float = 3.0) -> float:
+    """Return the absolute z-score from which a day is reported as anomalous."""
+
+    return float(getenv("USAGE_ANOMALY_Z_THRESHOLD", default))
+
+
+def resolve_anomaly_min_days(default: int = 7) -> int:
+    """Return how many active days a series needs before its days are scored."""
+
+    return int(getenv("USAGE_ANOMALY_MIN_DAYS", default))
+
+
+def resolve_anomaly_ewma_alpha(default: float = 0.3) -> float:
+    """Return the smoothing factor of the exponentially weighted mean and variance."""
+
+    return float(getenv("USAGE_ANOMALY_EWMA_ALPHA", default))
+
+
+def resolve_events_poll_interval(default: float = 2.0) -> float:
+    """Return how often, in seconds, the update stream checks datasets for a new version."""
+
+    return float(getenv("USAGE_EVENTS_POLL_SECONDS", default))
+
+
+def resolve_ingest_max_bytes(default_mb: int = 100) -> int:
+    """Return the largest accepted CSV upload, in bytes."""
+
+    return int(float(getenv("USAGE_INGEST_MAX_MB", default_mb)) * 1024 * 1024)
+
+
+def resolve_export_dir() -> Path:
+    """Return the directory where background exports write their files."""
+
+    export_dir = getenv("USAGE_EXPORT_DIR")
+    if export_dir:
+        return Path(export_dir)
+    return Path(tempfile.gettempdir()) / "usage-exports"
+
+
+def resolve_export_workers(default: int = 2) -> int:
+    """Return how many exports run at the same time."""
+
+    return int(getenv("USAGE_EXPORT_WORKERS", default))
+
+
+def resolve_export_retention(default_hours: float = 24.0) -> float:
+    """Return how long, in seconds, finished exports stay available for download."""
+
+    return float(getenv("USAGE_EXPORT_RETENTION_HOURS", default_hours)) * 3600
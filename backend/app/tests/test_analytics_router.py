@@ -1,9 +1,15 @@
 from __future__ import annotations
 
+from pathlib import Path
+
 import pandas as pd
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
+from app.benchmarks.synthetic import SyntheticUsageSpec, write_usage_csv
+from app.repositories import CSVUsageRepository
+from app.services import UsageAnalyticsService
+
 from app.routers.analytics import (
     analytics_router,
     get_usage_analytics_service,
@@ -19,7 +25,7 @@ class DummyUsageAnalyticsService:
             ]
         )
 
-    def get_raw_data(self, start_date: str | None = None, end_date: str | None = None, user: str | None = None, model: str | None = None) -> pd.DataFrame:
+    def get_raw_data(self, start_date: str | None = None, end_date: str | None = None, user: str | None = None, model: str | None = None, fields: list[str] | None = None) -> pd.DataFrame:
         # Return test data that can be filtered
         all_data = [
             {
@@ -246,3 +252,67 @@ def test_raw_data_endpoint_filters_by_all_parameters_including_model() -> None:
     assert data[0]["user"] == "alice"
     assert data[0]["model"] == "gpt-4"
 
+
+
+def test_raw_data_endpoint_pages_with_total_count_and_summary(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=120, users=3, days=2, seed=3))
+    app = FastAPI()
+    app.include_router(analytics_router)
+    app.dependency_overrides[get_usage_analytics_service] = lambda: UsageAnalyticsService(CSVUsageRepository(csv_path))
+    client = TestClient(app)
+
+    response = client.get("/analytics/raw_data", params={"sort_by": "requests", "offset": 100, "limit": 50})
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == "120"
+    page = response.json()
+    assert len(page) == 20
+    assert [row["requests"] for row in page] == sorted((row["requests"] for row in page), reverse=True)
+
+    summary = client.get("/analytics/raw_data/summary").json()
+    assert summary["records"] == 120
+    assert summary["users"] == 3
+    assert client.get("/analytics/raw_data", params={"sort_by": "password"}).status_code == 422
+
+
+def test_raw_data_endpoint_returns_only_requested_fields(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=50, users=2, days=2, seed=4))
+    app = FastAPI()
+    app.include_router(analytics_router)
+    app.dependency_overrides[get_usage_analytics_service] = lambda: UsageAnalyticsService(CSVUsageRepository(csv_path))
+    client = TestClient(app)
+
+    response = client.get("/analytics/raw_data", params={"fields": "date,user,model,total_tokens"})
+    assert response.status_code == 200
+    assert len(response.json()) == 50
+    assert set(response.json()[0]) == {"date", "user", "model", "total_tokens"}
+    assert client.get("/analytics/raw_data", params={"fields": "date,secret"}).status_code == 422
+
+
+def test_batch_endpoint_returns_results_keyed_by_query_id(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=200, users=3, days=3, seed=5))
+    app = FastAPI()
+    app.include_router(analytics_router)
+    app.dependency_overrides[get_usage_analytics_service] = lambda: UsageAnalyticsService(CSVUsageRepository(csv_path))
+    client = TestClient(app)
+    user = client.get("/analytics/tokens_per_user").json()[0]["user"]
+
+    response = client.post(
+        "/analytics/batch",
+        json={
+            "queries": [
+                {"id": "rows", "query": "raw_data", "user": user, "fields": ["date", "user"], "limit": 3},
+                {"id": "summary", "query": "raw_data_summary", "user": user},
+                {"id": "users", "query": "tokens_per_user"},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert len(results["rows"]) == 3 and {row["user"] for row in results["rows"]} == {user}
+    assert results["summary"]["users"] == 1
+    assert len(results["users"]) == 3
+
+    assert client.post("/analytics/batch", json={"queries": []}).status_code == 422
+    assert client.post("/analytics/batch", json={"queries": [{"id": "a", "query": "drop"}]}).status_code == 422
+    unknown_field = {"queries": [{"id": "a", "query": "raw_data", "fields": ["secret"]}]}
+    assert client.post("/analytics/batch", json=unknown_field).status_code == 422
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.observability.metrics import ANOMALY_UPDATES, REGISTRY, set_enabled
+from app.repositories import CSVUsageRepository
+from app.routers.analytics import analytics_router, get_usage_analytics_service
+from app.services import UsageAnalyticsService
+from app.services.anomaly_detection import AnomalyDetector, SeriesState
+
+
+@pytest.fixture(autouse=True)
+def _metrics() -> None:
+    set_enabled(True)
+    REGISTRY.clear()
+    yield
+    set_enabled(False)
+    REGISTRY.clear()
+
+
+def _daily(days: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2025-01-01", periods=days, freq="D", tz="UTC", name="date")
+    values = rng.normal(1000, 50, size=(days, 3)).round()
+    values[:5, 2] = 0  # the third series starts later
+    return pd.DataFrame(values, index=index, columns=["a", "b", "c"])
+
+
+def test_running_state_matches_batch_statistics() -> None:
+    daily = _daily(40)
+    state = SeriesState.empty(daily.columns)
+    for row in daily.to_numpy():
+        state = state.fold(row, alpha=0.3)
+
+    active = daily["c"].iloc[5:]
+    assert state.count.tolist() == [40, 40, 35]
+    np.testing.assert_allclose(state.mean, [daily["a"].mean(), daily["b"].mean(), active.mean()])
+    np.testing.assert_allclose(state.m2 / (state.count - 1), [daily["a"].var(), daily["b"].var(), active.var()])
+    assert state.ewma[0] == pytest.approx(daily["a"].ewm(alpha=0.3, adjust=False).mean().iloc[-1])
+
+
+def test_incremental_update_matches_full_rebuild() -> None:
+    daily = _daily(60)
+    incremental = AnomalyDetector(recent_days=10)
+    incremental.scores("usage.csv", "v1", "user", "total_tokens", lambda: daily.iloc[:50])
+    # The newest day of v1 was still receiving rows; v2 completes it and appends more.
+    grown = daily.copy()
+    grown.iloc[49, 0] += 5
+    grown["d"] = 0.0
+    grown.iloc[-1, 3] = 10.0
+    resumed = incremental.scores("usage.csv", "v2", "user", "total_tokens", lambda: grown)
+    rebuilt = AnomalyDetector(recent_days=10).scores("usage.csv", "v2", "user", "total_tokens", lambda: grown)
+
+    assert ANOMALY_UPDATES.value(mode="incremental") == 1
+    key = ["date", "user"]
+    pd.testing.assert_frame_equal(
+        resumed.sort_values(key, ignore_index=True), rebuilt.sort_values(key, ignore_index=True), check_like=True
+    )
+
+    changed = grown.copy()
+    changed.iloc[20, 1] += 1
+    incremental.scores("usage.csv", "v3", "user", "total_tokens", lambda: changed)
+    # v1, the fresh rebuild and v3, whose folded history changed.
+    assert ANOMALY_UPDATES.value(mode="full") == 3
+
+
+def test_backfilled_day_rebuilds_the_state() -> None:
+    daily = _daily(20)
+    detector = AnomalyDetector(recent_days=5)
+    detector.scores("usage.csv", "v1", "user", "total_tokens", lambda: daily)
+    # An upload backfills an old day; the last folded day is unchanged.
+    backfilled = daily.copy()
+    backfilled.iloc[5, 0] = 100_000.0
+    resumed = detector.scores("usage.csv", "v2", "user", "total_tokens", lambda: backfilled)
+    rebuilt = AnomalyDetector(recent_days=5).scores("usage.csv", "v2", "user", "total_tokens", lambda: backfilled)
+
+    # v1, v2 and the fresh rebuild.
+    assert ANOMALY_UPDATES.value(mode="full") == 3 and ANOMALY_UPDATES.value(mode="incremental") == 0
+    pd.testing.assert_frame_equal(resumed, rebuilt)
+
+
+def _write_jump_csv(csv_path: Path) -> Path:
+    """Thirty days of two users' usage, with alice jumping tenfold on the last day."""
+
+    days = pd.date_range("2025-01-01", periods=30, freq="D")
+    rng = np.random.default_rng(1)
+    tokens = [int(value) for value in rng.normal(1000, 100, size=30)]
+    tokens[-1] = 10_000
+    pd.DataFrame(
+        {
+            "Date": [day.strftime("%Y-%m-%dT12:00:00.000Z") for day in days] * 2,
+            "User": ["alice@example.com"] * 30 + ["bob@example.com"] * 30,
+            "Kind": "Included",
+            "Model": "gpt-4",
+            "Max Mode": "No",
+            "Input (w/ Cache Write)": 0,
+            "Input (w/o Cache Write)": 0,
+            "Cache Read": 0,
+            "Output Tokens": 0,
+            "Total Tokens": tokens + [1000 + day % 3 for day in range(30)],
+            "Requests": 1,
+        }
+    ).to_csv(csv_path, index=False)
+    return csv_path
+
+
+def test_endpoint_reports_a_tenfold_jump(tmp_path: Path) -> None:
+    csv_path = _write_jump_csv(tmp_path / "usage.csv")
+    app = FastAPI()
+    app.include_router(analytics_router)
+    app.dependency_overrides[get_usage_analytics_service] = lambda: UsageAnalyticsService(
+        CSVUsageRepository(csv_path), anomaly_detector=AnomalyDetector()
+    )
+    client = TestClient(app)
+
+    payload = client.get("/analytics/anomalies").json()
+    assert (payload[0]["date"], payload[0]["user"]) == ("2025-01-30", "alice@example.com")
+    assert all(row["user"] == "alice@example.com" for row in payload)
+    assert payload[0]["value"] == 10_000
+    assert payload[0]["z_score"] > 10
+
+    assert client.get("/analytics/anomalies", params={"z_threshold": 1000}).json() == []
+    assert client.get("/analytics/anomalies", params={"z_threshold": 0}).status_code == 422
+
+
+def test_service_without_detector_uses_configured_settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    service = UsageAnalyticsService(CSVUsageRepository(_write_jump_csv(tmp_path / "usage.csv")))
+    assert not service.usage_anomalies().empty
+
+    # Thirty days of history never reach the configured minimum, so nothing is scored.
+    monkeypatch.setenv("USAGE_ANOMALY_MIN_DAYS", "40")
+    assert service.usage_anomalies().empty
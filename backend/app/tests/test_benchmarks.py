@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+
+import httpx
+import pandas as pd
+import pytest
+
+from app.benchmarks.load import main as load_main
+from app.benchmarks.load import parse_mix, run_load
+from app.benchmarks.suite import BenchmarkResult, compare_to_baseline, results_to_document, run_suite
+from app.benchmarks.synthetic import SyntheticUsageSpec, generate_usage_dataframe, write_usage_csv
+from app.main import create_app
+from app.repositories import CSVUsageRepository
+
+
+def test_synthetic_generator_is_seeded_and_skewed() -> None:
+    spec = SyntheticUsageSpec(rows=5_000, users=20, models=4, days=10, skew=1.5, seed=7)
+
+    first = generate_usage_dataframe(spec)
+    second = generate_usage_dataframe(spec)
+
+    pd.testing.assert_frame_equal(first, second)
+    assert len(first) == 5_000
+    assert first["User"].nunique() <= 20
+    assert first["Model"].nunique() <= 4
+    counts = first["User"].value_counts()
+    assert counts.iloc[0] > 5 * counts.iloc[-1]
+
+
+def test_synthetic_csv_is_readable_by_repository(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=300, days=3))
+
+    events = CSVUsageRepository(csv_path).get_events()
+
+    assert len(events) == 300
+    assert all(event.total_tokens >= event.output_tokens for event in events)
+
+
+def test_compare_to_baseline_flags_only_regressions_above_threshold() -> None:
+    baseline = results_to_document(
+        [
+            BenchmarkResult(case="service.tokens_per_user", rows=10, seconds=1.0, peak_bytes=1000),
+            BenchmarkResult(case="service.tokens_by_model", rows=10, seconds=1.0, peak_bytes=1000),
+        ]
+    )
+    current = [
+        BenchmarkResult(case="service.tokens_per_user", rows=10, seconds=1.1, peak_bytes=1500),
+        BenchmarkResult(case="service.tokens_by_model", rows=10, seconds=0.5, peak_bytes=900),
+        BenchmarkResult(case="service.events_per_day", rows=10, seconds=9.0, peak_bytes=9000),
+    ]
+
+    regressions = compare_to_baseline(current, baseline, threshold=0.2)
+
+    assert [(regression.key, regression.metric) for regression in regressions] == [
+        ("10/service.tokens_per_user", "peak_bytes"),
+    ]
+
+
+def test_run_suite_measures_every_case(tmp_path: Path) -> None:
+    results = run_suite([200], tmp_path, repeat=1, track_memory=False)
+
+    cases = {result.case for result in results}
+    assert "repository.get_events" in cases
+    assert "service.tokens_per_user" in cases
+    assert "route./analytics/raw_data" in cases
+    assert all(result.rows == 200 and result.seconds > 0 for result in results)
+
+
+def test_parse_mix_validates_endpoints_and_weights() -> None:
+    assert parse_mix("raw_data=2,anomalies") == {"raw_data": 2.0, "anomalies": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("unknown=1")
+    with pytest.raises(ValueError):
+        parse_mix("raw_data=0")
+
+
+def test_run_load_reports_percentiles_per_endpoint(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=500, days=5))
+    monkeypatch.setenv("USAGE_CSV_PATH", str(csv_path))
+
+    async def load() -> tuple:
+        transport = httpx.ASGITransport(app=create_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await run_load(client, {"tokens_per_user": 1, "raw_data[user]": 1}, concurrency=3, duration=0.3)
+
+    reports, elapsed = asyncio.run(load())
+
+    assert elapsed >= 0.3
+    assert {report.endpoint for report in reports} == {"tokens_per_user", "raw_data[user]"}
+    for report in reports:
+        assert report.requests > 0 and report.errors == 0
+        assert 0 < report.p50_ms <= report.p95_ms <= report.p99_ms <= report.max_ms
+
+
+def test_load_cli_writes_report(tmp_path: Path) -> None:
+    output = tmp_path / "load.json"
+
+    assert load_main(["--rows", "300", "--duration", "0.2", "--concurrency", "2", "--output", str(output)]) == 0
+
+    document = json.loads(output.read_text(encoding="utf-8"))
+    assert document["total"]["requests"] == sum(report["requests"] for report in document["endpoints"].values())
+    assert document["total"]["error_rate"] == 0
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from app.benchmarks.synthetic import SyntheticUsageSpec, write_usage_csv
+from app.repositories import ChunkedCSVUsageRepository, CSVUsageRepository
+from app.repositories import chunked_csv_usage_repository as chunked_module
+from app.repositories.shared_store import read_version_header
+from app.services import UsageAnalyticsService
+
+
+@pytest.fixture
+def usage_csv(tmp_path: Path) -> Path:
+    return write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=1_000, users=7, days=5, seed=3))
+
+
+def test_chunked_repository_matches_eager_aggregates(usage_csv: Path, tmp_path: Path) -> None:
+    eager = UsageAnalyticsService(CSVUsageRepository(usage_csv))
+    chunked = UsageAnalyticsService(ChunkedCSVUsageRepository(usage_csv, tmp_path / "store", chunk_rows=128))
+
+    for method in ("events_per_day", "tokens_per_user", "tokens_by_model"):
+        pd.testing.assert_frame_equal(getattr(chunked, method)(), getattr(eager, method)())
+    pd.testing.assert_frame_equal(
+        chunked.tokens_per_user(start_date="2025-01-02", end_date="2025-01-03"),
+        eager.tokens_per_user(start_date="2025-01-02", end_date="2025-01-03"),
+    )
+
+
+def test_chunked_repository_filters_raw_rows_across_chunks(usage_csv: Path, tmp_path: Path) -> None:
+    eager = UsageAnalyticsService(CSVUsageRepository(usage_csv))
+    chunked = UsageAnalyticsService(ChunkedCSVUsageRepository(usage_csv, tmp_path / "store", chunk_rows=100))
+    user = "user00001@example.com"
+
+    expected = eager.get_raw_data(user=user, start_date="2025-01-02T12:00:00Z")
+    actual = chunked.get_raw_data(user=user, start_date="2025-01-02T12:00:00Z")
+
+    assert len(actual) == len(expected) > 0
+    assert actual["date"].is_monotonic_decreasing
+    assert actual["total_tokens"].sum() == expected["total_tokens"].sum()
+    assert set(actual["user"].astype(str)) == {user}
+
+
+def test_chunked_repository_reuses_store_for_same_csv_version(
+    usage_csv: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    store_root = tmp_path / "store"
+    ChunkedCSVUsageRepository(usage_csv, store_root, chunk_rows=256).get_daily_rollup()
+
+    def fail_ingest(self: ChunkedCSVUsageRepository, version: str) -> None:
+        raise AssertionError("the store should have been reused")
+
+    monkeypatch.setattr(ChunkedCSVUsageRepository, "ingest", fail_ingest)
+    repository = ChunkedCSVUsageRepository(usage_csv, store_root, chunk_rows=256)
+
+    assert len(repository.get_dataframe()) == 1_000
+    assert [len(chunk) for chunk in repository.iter_dataframes()] == [256, 256, 256, 232]
+    version_dir = store_root / repository.dataset_version()
+    assert (version_dir / "events" / "user.bin").stat().st_size == 1_000 * 4
+
+
+def test_csv_changed_mid_ingest_is_stored_under_its_new_version(
+    usage_csv: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    store_root = tmp_path / "store"
+    repository = ChunkedCSVUsageRepository(usage_csv, store_root, chunk_rows=256)
+    stale_version = repository.dataset_version()
+    normalize = chunked_module.normalize_usage_frame
+    rewritten = []
+
+    def rewriting_normalize(*args, **kwargs):
+        if not rewritten:
+            rewritten.append(write_usage_csv(usage_csv, SyntheticUsageSpec(rows=1_200, users=7, days=5, seed=4)))
+        return normalize(*args, **kwargs)
+
+    monkeypatch.setattr(chunked_module, "normalize_usage_frame", rewriting_normalize)
+    table = repository.get_columnar_table()
+
+    current_version = ChunkedCSVUsageRepository(usage_csv, store_root).dataset_version()
+    assert table.rows == 1_200
+    assert table.metadata["dataset_version"] == current_version != stale_version
+    assert not (store_root / stale_version).exists()
+    assert read_version_header(store_root, usage_csv)["dataset_version"] == current_version
+
+
+def test_raw_data_fields_are_projected_on_every_backend(usage_csv: Path, tmp_path: Path) -> None:
+    fields = ["total_tokens", "user", "date"]
+    user = "user00002@example.com"
+    expected = UsageAnalyticsService(CSVUsageRepository(usage_csv)).get_raw_data(user=user)[fields]
+
+    for repository in (
+        CSVUsageRepository(usage_csv),
+        ChunkedCSVUsageRepository(usage_csv, tmp_path / "store", chunk_rows=100),
+    ):
+        actual = UsageAnalyticsService(repository).get_raw_data(user=user, fields=fields)
+        assert list(actual.columns) == fields
+        pd.testing.assert_frame_equal(actual.astype({"user": str}), expected)
+
+    page, total = UsageAnalyticsService(CSVUsageRepository(usage_csv)).raw_data_page(
+        sort_by="requests", limit=5, fields=["user"]
+    )
+    assert list(page.columns) == ["user"]
+    assert total == 1_000
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.benchmarks.synthetic import SyntheticUsageSpec, write_usage_csv
+from app.cli.build_store import main as build_store_main
+from app.repositories import ChunkedCSVUsageRepository, CSVUsageRepository
+from app.repositories.columnar_store import ColumnarTable, ColumnarTableWriter
+from app.repositories.csv_usage_repository import build_daily_rollup
+from app.services import UsageAnalyticsService
+from app.services.columnar_aggregates import daily_rollup, row_mask
+
+
+def test_columnar_table_round_trips_through_memory_mapped_columns(tmp_path: Path) -> None:
+    frame = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2024-01-01T12:00:00Z", "2024-01-02T09:30:00Z", "2024-01-02T10:00:00Z"], utc=True),
+            "user": ["alice", "bob", "alice"],
+            "tokens": [10, 20, 30],
+        }
+    )
+    writer = ColumnarTableWriter(tmp_path / "table", {"date": "timestamp", "user": "dictionary", "tokens": "int64"})
+    writer.append(frame.iloc[:2])
+    writer.append(frame.iloc[2:])
+    table = writer.close({"source": "test"})
+
+    assert isinstance(table.read_array("tokens"), np.memmap)
+    assert table.read_array("user").dtype == np.dtype("<i4")
+    assert table.dictionary("user") == ["alice", "bob"]
+    assert table.metadata == {"source": "test"}
+    pd.testing.assert_frame_equal(table.read(categorical=False), frame, check_dtype=False)
+    assert list(table.take(np.array([2]))["tokens"]) == [30]
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_array_groupbys_match_pandas_rollup(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=2_000, users=9, days=6, seed=11))
+    repository = ChunkedCSVUsageRepository(csv_path, tmp_path / "store", chunk_rows=500)
+    table = repository.get_columnar_table()
+    frame = CSVUsageRepository(csv_path).get_dataframe()
+
+    pd.testing.assert_frame_equal(daily_rollup(table), build_daily_rollup(frame))
+
+    start = pd.Timestamp("2025-01-03T06:00:00Z")
+    mask = row_mask(table, start=start, equals={"user": "user00002@example.com"})
+    expected = frame[(frame["date"] >= start) & (frame["user"] == "user00002@example.com")]
+    assert int(mask.sum()) == len(expected)
+    assert not row_mask(table, equals={"user": "nobody@example.com"}).any()
+
+
+def test_service_answers_sub_day_windows_from_arrays(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=1_500, users=5, days=4, seed=5))
+    columnar = UsageAnalyticsService(ChunkedCSVUsageRepository(csv_path, tmp_path / "store"))
+    eager = UsageAnalyticsService(CSVUsageRepository(csv_path))
+    window = {"start_date": "2025-01-01T15:30:00Z", "end_date": "2025-01-03T08:00:00Z"}
+
+    for method in ("events_per_day", "tokens_per_user", "tokens_by_model"):
+        pd.testing.assert_frame_equal(getattr(columnar, method)(**window), getattr(eager, method)(**window))
+
+    raw = columnar.get_raw_data(model="auto", **window)
+    expected = eager.get_raw_data(model="auto", **window)
+    assert raw["date"].tolist() == expected["date"].tolist()
+
+
+def test_build_store_cli_prepares_store_for_workers(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=300, days=2))
+    store_dir = tmp_path / "store"
+
+    assert build_store_main(["--csv", str(csv_path), "--store-dir", str(store_dir), "--chunk-rows", "64"]) == 0
+
+    version = CSVUsageRepository(csv_path).dataset_version()
+    assert ColumnarTable(store_dir / version / "events").rows == 300
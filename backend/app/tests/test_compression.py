@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import gzip
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from app.benchmarks.synthetic import SyntheticUsageSpec, write_usage_csv
+from app.compression import CODECS, CompressionMiddleware, EncodedPayloadCache, negotiate_encoding
+from app.main import create_app
+from app.observability.metrics import CACHE_REQUESTS, COMPRESSION_RATIO, REGISTRY, set_enabled
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics() -> None:
+    yield
+    set_enabled(False)
+    REGISTRY.clear()
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        (None, "identity"),
+        ("gzip, deflate", "gzip"),
+        ("gzip;q=0, deflate", "identity"),
+        # The wildcard gets the server's preferred codec, zstd when zstandard is installed.
+        ("*;q=0.5", next(iter(CODECS))),
+        ("deflate;q=1.0, GZIP;q=0.2", "gzip"),
+    ],
+)
+def test_negotiate_encoding(header: str | None, expected: str) -> None:
+    assert negotiate_encoding(header) == expected
+
+
+def test_encoded_payload_is_reused_while_its_owner_lives() -> None:
+    class Owner:
+        pass
+
+    owner = Owner()
+    cache = EncodedPayloadCache()
+    calls: list[int] = []
+
+    def serialize() -> bytes:
+        calls.append(1)
+        return b'{"user":"alice@example.com"}' * 100
+
+    first, encoding = cache.get_or_encode(owner, "gzip", serialize)
+    second, _ = cache.get_or_encode(owner, "gzip", serialize)
+    plain, plain_encoding = cache.get_or_encode(owner, "identity", serialize)
+
+    assert encoding == "gzip" and second is first
+    assert plain_encoding == "identity" and gzip.decompress(first) == plain
+    assert calls == [1]
+    del owner
+    assert len(cache) == 0
+
+
+def test_small_bodies_are_not_compressed() -> None:
+    body, encoding = EncodedPayloadCache().get_or_encode(object(), "gzip", lambda: b"[]", min_bytes=1024)
+    assert (body, encoding) == (b"[]", "identity")
+
+
+def test_cached_raw_data_is_served_precompressed(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=500, users=3, days=2))
+    monkeypatch.setenv("USAGE_CSV_PATH", str(csv_path))
+    client = TestClient(create_app(metrics_enabled=True))
+
+    responses = [client.get("/analytics/raw_data", headers={"Accept-Encoding": "gzip"}) for _ in range(2)]
+    plain = client.get("/analytics/raw_data", headers={"Accept-Encoding": "identity"})
+
+    assert [response.headers["content-encoding"] for response in responses] == ["gzip", "gzip"]
+    assert responses[0].json() == responses[1].json() == plain.json()
+    assert "content-encoding" not in plain.headers
+    assert CACHE_REQUESTS.value(cache="encoded_payload", result="hit") == 2
+    assert COMPRESSION_RATIO.count(encoding="gzip") == 1
+
+
+def test_middleware_compresses_other_responses() -> None:
+    app = FastAPI()
+
+    @app.get("/large")
+    def large() -> Response:
+        return Response(content="x" * 5000, media_type="text/plain")
+
+    client = TestClient(CompressionMiddleware(app, min_bytes=100))
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < 5000
+    assert response.text == "x" * 5000
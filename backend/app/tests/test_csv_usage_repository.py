@@ -4,9 +4,12 @@ from datetime import datetime, timezone
 from pathlib import Path
 
 import pandas as pd
+import pytest
 
+from app.benchmarks.synthetic import SyntheticUsageSpec, write_usage_csv
 from app.dto.usage_event import UsageEventDTO
-from app.repositories import CSVUsageRepository
+from app.repositories import ChunkedCSVUsageRepository, CSVUsageRepository
+from app.repositories.csv_usage_repository import CSV_DATE_FORMAT, EVENT_COLUMNS, parse_usage_dates
 
 
 def test_csv_usage_repository_parses_rows(tmp_path: Path) -> None:
@@ -47,3 +50,82 @@ def test_csv_usage_repository_parses_rows(tmp_path: Path) -> None:
     assert event.output_tokens == 15
     assert event.total_tokens == 25
     assert event.requests == 1
+
+
+def test_csv_usage_repository_reads_gzip_exports(tmp_path: Path) -> None:
+    spec = SyntheticUsageSpec(rows=200, days=2, seed=6)
+    plain = write_usage_csv(tmp_path / "usage.csv", spec)
+    compressed = write_usage_csv(tmp_path / "usage.csv.gz", spec)
+
+    assert compressed.stat().st_size < plain.stat().st_size / 2
+    pd.testing.assert_frame_equal(
+        CSVUsageRepository(compressed).get_dataframe(), CSVUsageRepository(plain).get_dataframe()
+    )
+
+
+def test_csv_usage_repository_reads_zstd_exports(tmp_path: Path) -> None:
+    zstandard = pytest.importorskip("zstandard")
+    spec = SyntheticUsageSpec(rows=200, days=2, seed=6)
+    plain = write_usage_csv(tmp_path / "usage.csv", spec)
+    compressed = tmp_path / "usage.csv.zst"
+    compressed.write_bytes(zstandard.ZstdCompressor().compress(plain.read_bytes()))
+
+    assert compressed.stat().st_size < plain.stat().st_size / 2
+    pd.testing.assert_frame_equal(
+        CSVUsageRepository(compressed).get_dataframe(), CSVUsageRepository(plain).get_dataframe()
+    )
+    chunked = ChunkedCSVUsageRepository(compressed, tmp_path / "store", chunk_rows=64)
+    assert chunked.get_columnar_table().rows == 200
+
+
+def test_csv_usage_repository_reads_a_directory_of_exports(tmp_path: Path) -> None:
+    exports = tmp_path / "exports"
+    write_usage_csv(exports / "2025-01.csv.gz", SyntheticUsageSpec(rows=150, days=2, seed=1))
+    write_usage_csv(exports / "2025-02.csv", SyntheticUsageSpec(rows=100, days=2, seed=2))
+    (exports / "notes.txt").write_text("ignored")
+
+    repository = CSVUsageRepository(exports, max_workers=2)
+    chunked = ChunkedCSVUsageRepository(exports, tmp_path / "store", chunk_rows=64)
+    version = repository.dataset_version()
+
+    assert len(repository.get_dataframe()) == 250
+    assert chunked.get_columnar_table().rows == 250
+    write_usage_csv(exports / "2025-03.csv", SyntheticUsageSpec(rows=10, days=1, seed=3))
+    assert repository.dataset_version() != version
+
+    with pytest.raises(FileNotFoundError):
+        CSVUsageRepository(tmp_path / "store").get_dataframe()
+
+
+def test_typed_parsing_matches_inferred_parsing(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=300, days=3, seed=2))
+    raw = pd.read_csv(csv_path)
+    raw["Extra"] = "ignored"
+    raw.to_csv(csv_path, index=False)
+
+    typed = CSVUsageRepository(csv_path).get_dataframe()
+
+    pd.testing.assert_frame_equal(typed, CSVUsageRepository(csv_path, typed=False).get_dataframe())
+    assert list(typed.columns) == EVENT_COLUMNS
+
+
+def test_parse_usage_dates_falls_back_for_other_layouts() -> None:
+    zulu = parse_usage_dates(pd.Series(["2025-09-25T19:08:55.643Z", "2025-09-26T00:00:00.000Z"]), CSV_DATE_FORMAT)
+    offset = parse_usage_dates(pd.Series(["2025-09-25 22:08:55.643+03:00"]), CSV_DATE_FORMAT)
+
+    assert str(zulu.dtype) == "datetime64[ns, UTC]"
+    assert zulu.iloc[0] == offset.iloc[0] == pd.Timestamp("2025-09-25T19:08:55.643Z")
+
+
+def test_column_projection_reads_only_requested_columns(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=300, users=3, days=2, seed=6))
+    repository = CSVUsageRepository(csv_path)
+    full = repository.get_dataframe()
+
+    narrow = repository.get_dataframe(["date", "user", "total_tokens"])
+    priced = repository.get_dataframe(["user", "cost"])
+
+    pd.testing.assert_frame_equal(narrow, full[["date", "user", "total_tokens"]])
+    pd.testing.assert_frame_equal(priced, full[["user", "cost"]])
+    with pytest.raises(ValueError):
+        repository.get_dataframe(["password"])
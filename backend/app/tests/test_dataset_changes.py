@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from app.benchmarks.synthetic import SyntheticUsageSpec, write_usage_csv
+from app.repositories import CSVUsageRepository, DatasetRegistry
+from app.routers.analytics import _dataset_change_events
+from app.services.dataset_changes import SCOPE_ALL, SCOPE_NONE, SCOPE_RANGE, DatasetChangeFeed
+
+
+def _bump_mtime(path: Path) -> None:
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def _append_day(csv_path: Path, day: str) -> None:
+    rows = pd.read_csv(csv_path)
+    extra = rows.head(3).assign(Date=f"{day}T10:00:00.000Z")
+    pd.concat([rows, extra]).to_csv(csv_path, index=False)
+    _bump_mtime(csv_path)
+
+
+def test_feed_reports_the_range_of_changed_days(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=300, users=3, days=5, seed=1))
+    registry = DatasetRegistry({"default": csv_path}, memory_budget_bytes=10 * 1024 * 1024)
+    feed = DatasetChangeFeed()
+
+    initial = feed.poll(registry, "default")
+    assert initial.scope == SCOPE_ALL
+    assert feed.poll(registry, "default") is initial
+
+    _append_day(csv_path, "2025-01-09")
+    appended = feed.poll(registry, "default")
+    assert (appended.scope, appended.start_date, appended.end_date) == (SCOPE_RANGE, "2025-01-09", "2025-01-09")
+    assert appended.previous_version == initial.version
+
+    _bump_mtime(csv_path)
+    touched = feed.poll(registry, "default")
+    assert touched.scope == SCOPE_NONE
+    assert touched.version != appended.version
+
+
+def test_slow_load_of_one_dataset_does_not_block_polls_of_others(tmp_path: Path) -> None:
+    sources = {
+        name: write_usage_csv(tmp_path / f"{name}.csv", SyntheticUsageSpec(rows=200, users=2, days=3, seed=seed))
+        for seed, name in enumerate(("slow", "fast"))
+    }
+    loading, release = threading.Event(), threading.Event()
+
+    class SlowRegistry(DatasetRegistry):
+        def repository(self, dataset_id: str) -> CSVUsageRepository:
+            if dataset_id == "slow":
+                loading.set()
+                release.wait(5)
+            return super().repository(dataset_id)
+
+    registry = SlowRegistry(sources, memory_budget_bytes=10 * 1024 * 1024)
+    feed = DatasetChangeFeed()
+    slow_poll = threading.Thread(target=feed.poll, args=(registry, "slow"))
+    slow_poll.start()
+    fast_changes = []
+    fast_poll = threading.Thread(target=lambda: fast_changes.append(feed.poll(registry, "fast")))
+    try:
+        assert loading.wait(5)
+        fast_poll.start()
+        fast_poll.join(2)
+        assert not fast_poll.is_alive() and fast_changes[0].scope == SCOPE_ALL
+    finally:
+        release.set()
+        slow_poll.join()
+        fast_poll.join()
+    assert feed.poll(registry, "slow").scope == SCOPE_ALL
+
+
+def test_stream_announces_versions_and_widens_after_missed_ones(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=200, users=2, days=3, seed=2))
+    registry = DatasetRegistry({"default": csv_path}, memory_budget_bytes=10 * 1024 * 1024)
+    feed = DatasetChangeFeed()
+
+    async def read(last_version: str | None, count: int, between=None) -> list[str]:
+        stream = _dataset_change_events(registry, feed, "default", last_version, poll_seconds=0.01)
+        messages = [await anext(stream)]
+        if between is not None:
+            between()
+        while len(messages) < count:
+            messages.append(await anext(stream))
+        await stream.aclose()
+        return messages
+
+    first, second = asyncio.run(read(None, 2, lambda: _append_day(csv_path, "2025-01-06")))
+    assert first.startswith("id: ") and "event: dataset_version" in first
+    change = json.loads(second.split("data: ", 1)[1])
+    assert (change["scope"], change["start_date"]) == (SCOPE_RANGE, "2025-01-06")
+
+    (stale,) = asyncio.run(read("an-old-version", 1))
+    assert json.loads(stale.split("data: ", 1)[1])["scope"] == SCOPE_ALL
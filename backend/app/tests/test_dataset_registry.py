@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.benchmarks.synthetic import SyntheticUsageSpec, write_usage_csv
+from app.observability.metrics import DATASET_EVICTIONS, DATASET_LOADS, REGISTRY, set_enabled
+from app.repositories import CSVUsageRepository, DatasetRegistry, UnknownDatasetError
+from app.repositories.dataset_registry import frame_nbytes
+from app.routers.analytics import analytics_router
+from app.services import UsageAnalyticsService
+
+
+@pytest.fixture(autouse=True)
+def _metrics() -> None:
+    set_enabled(True)
+    REGISTRY.clear()
+    yield
+    set_enabled(False)
+    REGISTRY.clear()
+
+
+@pytest.fixture
+def sources(tmp_path: Path) -> dict[str, Path]:
+    return {
+        "a": write_usage_csv(tmp_path / "a.csv", SyntheticUsageSpec(rows=400, users=4, days=3, seed=1)),
+        "b": write_usage_csv(tmp_path / "b.csv", SyntheticUsageSpec(rows=400, users=6, days=3, seed=2)),
+    }
+
+
+def test_registry_serves_each_dataset_from_memory(sources: dict[str, Path]) -> None:
+    registry = DatasetRegistry(sources, memory_budget_bytes=10 * 1024 * 1024)
+
+    for dataset_id, csv_path in sources.items():
+        cached = UsageAnalyticsService(registry.repository(dataset_id)).tokens_per_user()
+        expected = UsageAnalyticsService(CSVUsageRepository(csv_path)).tokens_per_user()
+        pd.testing.assert_frame_equal(cached, expected)
+    repository = registry.repository("a")
+
+    assert repository.source_key() == CSVUsageRepository(sources["a"]).source_key() == str(sources["a"])
+    assert DATASET_LOADS.value(dataset="a", reason="initial") == 1
+    assert registry.resident_bytes > 0
+    with pytest.raises(UnknownDatasetError):
+        registry.repository("missing")
+
+
+def test_registry_evicts_least_recently_used_dataset_over_budget(sources: dict[str, Path]) -> None:
+    single = frame_nbytes(CSVUsageRepository(sources["a"]).get_dataframe())
+    registry = DatasetRegistry(sources, memory_budget_bytes=int(single * 1.5))
+
+    registry.repository("a")
+    registry.repository("b")
+    assert [entry["loaded"] for entry in registry.stats()] == [False, True]
+    assert DATASET_EVICTIONS.value(dataset="a") == 1
+
+    registry.repository("a")
+    assert DATASET_LOADS.value(dataset="a", reason="after_eviction") == 1
+
+
+def test_registry_reloads_when_the_source_changes(sources: dict[str, Path]) -> None:
+    registry = DatasetRegistry(sources, memory_budget_bytes=10 * 1024 * 1024)
+    first = registry.repository("a").dataset_version()
+
+    write_usage_csv(sources["a"], SyntheticUsageSpec(rows=50, days=1, seed=9))
+    stat = sources["a"].stat()
+    os.utime(sources["a"], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert registry.repository("a").dataset_version() != first
+    assert len(registry.repository("a").get_dataframe()) == 50
+    assert DATASET_LOADS.value(dataset="a", reason="version_change") == 1
+
+
+def test_endpoints_select_dataset_by_id(sources: dict[str, Path], monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("USAGE_CSV_PATH", str(sources["a"]))
+    monkeypatch.setenv("USAGE_DATASETS", f"b={sources['b']}")
+    app = FastAPI()
+    app.include_router(analytics_router)
+    client = TestClient(app)
+
+    default_users = client.get("/analytics/tokens_per_user").json()
+    b_users = client.get("/analytics/tokens_per_user", params={"dataset": "b"}).json()
+    missing = client.get("/analytics/raw_data", params={"dataset": "nope"})
+    datasets = client.get("/analytics/datasets").json()
+
+    assert len(default_users) == 4
+    assert len(b_users) == 6
+    assert missing.status_code == 404
+    assert {entry["dataset"]: entry["loaded"] for entry in datasets} == {"default": True, "b": True}
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.benchmarks.synthetic import SyntheticUsageSpec, write_usage_csv
+from app.repositories import CSVUsageRepository
+from app.routers.analytics import analytics_router, get_usage_analytics_service
+from app.services import UsageAnalyticsService
+from app.services.downsampling import downsample, lttb_indices
+
+
+def test_lttb_keeps_endpoints_and_peaks() -> None:
+    x = np.arange(1000, dtype="float64")
+    y = np.sin(x / 50)
+    y[437] = 25.0
+
+    indices = lttb_indices(x, y, 50)
+
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+    assert 437 in indices
+    np.testing.assert_array_equal(lttb_indices(x[:10], y[:10], 50), np.arange(10))
+    with pytest.raises(ValueError):
+        lttb_indices(x, y, 2)
+
+
+def test_downsample_reduces_each_series_separately() -> None:
+    dates = pd.date_range("2024-01-01", periods=200, freq="D", tz="UTC")
+    frame = pd.DataFrame(
+        {
+            "date": np.tile(dates, 2),
+            "user": np.repeat(["alice", "bob"], 200),
+            "tokens": np.arange(400, dtype="float64") % 17,
+        }
+    )
+
+    reduced = downsample(frame, "date", "tokens", 20, group_by="user")
+
+    assert reduced.groupby("user").size().tolist() == [20, 20]
+    assert reduced.groupby("user")["date"].is_monotonic_increasing.all()
+    assert downsample(frame, "date", "tokens", None) is frame
+
+
+def test_time_series_endpoints_accept_max_points(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=3000, users=3, days=90, seed=9))
+    app = FastAPI()
+    app.include_router(analytics_router)
+    app.dependency_overrides[get_usage_analytics_service] = lambda: UsageAnalyticsService(CSVUsageRepository(csv_path))
+    client = TestClient(app)
+
+    full = client.get("/analytics/events_per_day").json()
+    reduced = client.get("/analytics/events_per_day", params={"max_points": 30}).json()
+    assert len(full) == 90
+    assert len(reduced) == 30
+    assert reduced[0] == full[0] and reduced[-1] == full[-1]
+
+    series = client.get("/analytics/usage_series", params={"group_by": "user", "max_points": 25}).json()
+    assert len(series) == 3 * 25
+    assert client.get("/analytics/events_per_day", params={"max_points": 2}).status_code == 422
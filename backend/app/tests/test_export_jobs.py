@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.benchmarks.synthetic import SyntheticUsageSpec, write_usage_csv
+from app.observability.metrics import EXPORT_JOBS, EXPORTED_ROWS, REGISTRY, set_enabled
+from app.repositories import ChunkedCSVUsageRepository, CSVUsageRepository
+from app.routers.analytics import analytics_router, get_export_jobs, get_usage_analytics_service
+from app.services import UsageAnalyticsService
+from app.services import export_jobs
+from app.services.export_jobs import ExportJob, ExportJobManager, ExportQueueFullError, UnknownExportJobError
+
+
+@pytest.fixture(autouse=True)
+def _metrics() -> None:
+    set_enabled(True)
+    REGISTRY.clear()
+    yield
+    set_enabled(False)
+    REGISTRY.clear()
+
+
+def _wait(job: ExportJob, timeout: float = 10.0) -> ExportJob:
+    deadline = time.monotonic() + timeout
+    while not job.finished:
+        assert time.monotonic() < deadline, f"export still {job.status}"
+        time.sleep(0.01)
+    return job
+
+
+def _read_export(path: Path) -> pd.DataFrame:
+    exported = pd.read_csv(path)
+    exported["date"] = pd.to_datetime(exported["date"], utc=True)
+    return exported.sort_values(["date", "user", "total_tokens"], ignore_index=True)
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_export_streams_the_filtered_rows(tmp_path: Path, chunked: bool) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=2000, users=4, days=30, seed=8))
+    repository = (
+        ChunkedCSVUsageRepository(csv_path, tmp_path / "store", chunk_rows=300) if chunked else CSVUsageRepository(csv_path)
+    )
+    service = UsageAnalyticsService(repository)
+    fields = ["date", "user", "model", "total_tokens", "cost"]
+    manager = ExportJobManager(tmp_path / "exports")
+
+    chunks = service.iter_raw_data("2025-01-05", "2025-01-20", fields=fields, chunk_rows=250)
+    job = _wait(manager.submit("default", "csv", {}, lambda: chunks))
+
+    expected = service.get_raw_data("2025-01-05", "2025-01-20", fields=fields)
+    assert job.status == "succeeded" and job.rows == len(expected)
+    assert job.path == tmp_path / "exports" / f"{job.id}.csv" and job.bytes == job.path.stat().st_size
+    exported = _read_export(job.path)
+    expected = expected.sort_values(["date", "user", "total_tokens"], ignore_index=True)
+    pd.testing.assert_frame_equal(exported[["date", "user"]], expected[["date", "user"]].astype({"user": object}))
+    assert exported["cost"].sum() == pytest.approx(expected["cost"].sum())
+    assert EXPORTED_ROWS.value(format="csv") == len(expected)
+
+    empty = _wait(manager.submit("default", "csv", {}, lambda: service.iter_raw_data(user="nobody", fields=fields)))
+    assert empty.rows == 0 and list(pd.read_csv(empty.path).columns) == fields
+    with pytest.raises(ValueError):
+        service.iter_raw_data(fields=["kind", "nope"])
+    manager.shutdown()
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_parquet_export_keeps_one_schema_across_chunks(tmp_path: Path, chunked: bool) -> None:
+    pytest.importorskip("pyarrow")
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=2000, users=4, days=30, seed=8))
+    repository = (
+        ChunkedCSVUsageRepository(csv_path, tmp_path / "store", chunk_rows=300) if chunked else CSVUsageRepository(csv_path)
+    )
+    service = UsageAnalyticsService(repository)
+    fields = ["date", "user", "model", "total_tokens", "cost"]
+    manager = ExportJobManager(tmp_path / "exports")
+
+    def chunks() -> Iterator[pd.DataFrame]:
+        # An empty first chunk leaves pandas nothing to infer the string columns from.
+        yield from service.iter_raw_data(user="nobody", fields=fields)
+        yield from service.iter_raw_data("2025-01-05", "2025-01-20", fields=fields, chunk_rows=250)
+
+    job = _wait(manager.submit("default", "parquet", {}, chunks))
+
+    expected = service.get_raw_data("2025-01-05", "2025-01-20", fields=fields)
+    assert job.status == "succeeded" and job.rows == len(expected)
+    assert job.path.suffix == ".parquet"
+    exported = pd.read_parquet(job.path).sort_values(["date", "user", "total_tokens"], ignore_index=True)
+    expected = expected.sort_values(["date", "user", "total_tokens"], ignore_index=True)
+    assert list(exported.columns) == fields
+    pd.testing.assert_frame_equal(
+        exported[["date", "user", "total_tokens"]],
+        expected[["date", "user", "total_tokens"]].astype({"user": object}),
+        check_dtype=False,
+    )
+    assert exported["cost"].sum() == pytest.approx(expected["cost"].sum())
+
+    empty = _wait(manager.submit("default", "parquet", {}, lambda: service.iter_raw_data(user="nobody", fields=fields)))
+    assert empty.status == "succeeded" and list(pd.read_parquet(empty.path).columns) == fields
+    manager.shutdown()
+
+
+def test_jobs_can_be_cancelled_while_queued_or_running(tmp_path: Path) -> None:
+    manager = ExportJobManager(tmp_path / "exports", max_workers=1, max_pending=2)
+    release = threading.Event()
+
+    def blocking() -> Iterator[pd.DataFrame]:
+        yield pd.DataFrame({"value": [1, 2]})
+        release.wait(5)
+        yield pd.DataFrame({"value": [3]})
+
+    running = manager.submit("default", "csv", {}, blocking)
+    queued = manager.submit("default", "csv", {}, blocking)
+    with pytest.raises(ExportQueueFullError):
+        manager.submit("default", "csv", {}, blocking)
+
+    assert manager.cancel(queued.id).status == "cancelled"
+    while running.status != "running":
+        time.sleep(0.01)
+    manager.cancel(running.id)
+    release.set()
+    assert _wait(running).status == "cancelled"
+    # Only the jobs' metadata is left.
+    assert sorted(path.name for path in (tmp_path / "exports").iterdir()) == sorted(
+        f"{job.id}.json" for job in (running, queued)
+    )
+    assert EXPORT_JOBS.value(format="csv", status="cancelled") == 2
+    manager.shutdown()
+
+
+def test_failed_and_expired_jobs(tmp_path: Path) -> None:
+    now = [1000.0]
+    manager = ExportJobManager(tmp_path / "exports", retention_seconds=60, clock=lambda: now[0])
+
+    def broken() -> Iterator[pd.DataFrame]:
+        yield pd.DataFrame({"value": [1]})
+        raise OSError("disk full")
+
+    failed = _wait(manager.submit("default", "csv", {}, broken))
+    assert (failed.status, failed.error) == ("failed", "disk full")
+    done = _wait(manager.submit("default", "csv", {}, lambda: iter([pd.DataFrame({"value": [1]})])))
+    assert done.expires_at == 1060.0
+    assert {job.id for job in manager.jobs()} == {failed.id, done.id}
+
+    now[0] = 1061.0
+    with pytest.raises(UnknownExportJobError):
+        manager.get(done.id)
+    assert manager.jobs() == [] and not done.path.exists()
+    with pytest.raises(ValueError):
+        manager.submit("default", "xlsx", {}, broken)
+    manager.shutdown()
+
+
+def test_workers_sharing_a_directory_see_and_keep_each_others_jobs(tmp_path: Path) -> None:
+    now = [1000.0]
+    root = tmp_path / "exports"
+    first = ExportJobManager(root, retention_seconds=60, clock=lambda: now[0])
+    release = threading.Event()
+
+    def blocking() -> Iterator[pd.DataFrame]:
+        yield pd.DataFrame({"value": [1]})
+        release.wait(5)
+        yield pd.DataFrame({"value": [2]})
+
+    done = _wait(first.submit("default", "csv", {}, lambda: iter([pd.DataFrame({"value": [1, 2]})])))
+    running = first.submit("default", "csv", {}, blocking)
+    while running.status != "running":
+        time.sleep(0.01)
+
+    # A second worker starting up on the same directory deletes nothing it does not own.
+    second = ExportJobManager(root, retention_seconds=60, clock=lambda: now[0])
+    assert done.path.exists() and any(root.glob(f"{running.id}.csv.part"))
+    seen = second.get(done.id)
+    assert (seen.status, seen.rows, seen.path) == ("succeeded", 2, done.path)
+    assert {job.id for job in second.jobs()} == {done.id, running.id}
+
+    assert second.cancel(running.id).status == "running"
+    release.set()
+    assert _wait(running).status == "cancelled"
+    assert second.get(running.id).status == "cancelled"
+
+    # Files without metadata are only removed once older than the retention period.
+    orphan = root / f"{'0' * 32}.csv"
+    orphan.write_text("value\n1\n")
+    second.purge_expired()
+    assert orphan.exists()
+    now[0] = orphan.stat().st_mtime + 61
+    second.purge_expired()
+    assert not orphan.exists()
+    with pytest.raises(UnknownExportJobError):
+        second.get(done.id)
+    assert not done.path.exists() and list(root.iterdir()) == []
+    first.shutdown()
+    second.shutdown()
+
+
+def test_jobs_of_stopped_workers_are_reported_as_failed(tmp_path: Path) -> None:
+    now = [1000.0]
+    root = tmp_path / "exports"
+    root.mkdir()
+    dead_pid = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True).stdout
+    owners = {
+        "exited": {**export_jobs._OWNER, "pid": int(dead_pid)},
+        # A restarted container reuses the pid of the worker that ran the job.
+        "restarted": {**export_jobs._OWNER, "process": "0" * 32},
+        "other host": {**export_jobs._OWNER, "host": "elsewhere", "pid": int(dead_pid)},
+    }
+    jobs = {}
+    for index, (name, owner) in enumerate(owners.items()):
+        job = ExportJob(f"{index:032x}", "default", "csv", {}, status="running", created_at=now[0])
+        (root / f"{job.id}.json").write_text(json.dumps({**job.to_dict(), "path": None, "owner": owner}))
+        (root / f"{job.id}.csv.part").write_text("value\n1\n")
+        jobs[name] = job.id
+
+    manager = ExportJobManager(root, retention_seconds=60, clock=lambda: now[0])
+    statuses = {job.id: job.status for job in manager.jobs()}
+    assert statuses == {jobs["exited"]: "failed", jobs["restarted"]: "failed", jobs["other host"]: "running"}
+    failed = manager.get(jobs["exited"])
+    assert f"pid {int(dead_pid)}" in failed.error and failed.expires_at == now[0] + 60
+    assert not (root / f"{jobs['exited']}.csv.part").exists()
+    assert (root / f"{jobs['other host']}.csv.part").exists()
+
+    now[0] += 61
+    manager.purge_expired()
+    with pytest.raises(UnknownExportJobError):
+        manager.get(jobs["restarted"])
+    manager.shutdown()
+
+
+def test_export_endpoints(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=500, users=3, days=10, seed=2))
+    monkeypatch.setenv("USAGE_EXPORT_DIR", str(tmp_path / "exports"))
+    app = FastAPI()
+    app.include_router(analytics_router)
+    app.dependency_overrides[get_usage_analytics_service] = lambda: UsageAnalyticsService(CSVUsageRepository(csv_path))
+    client = TestClient(app)
+
+    response = client.post("/analytics/exports", json={"user": "user00000@example.com", "fields": ["date", "user", "cost"]})
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    assert response.headers["Location"] == f"/analytics/exports/{job_id}"
+    assert response.json()["filters"] == {"user": "user00000@example.com", "fields": ["date", "user", "cost"]}
+
+    _wait(get_export_jobs().get(job_id))
+    status = client.get(f"/analytics/exports/{job_id}").json()
+    assert status["status"] == "succeeded" and status["rows"] > 0
+    download = client.get(f"/analytics/exports/{job_id}/download")
+    assert download.status_code == 200
+    assert download.headers["content-type"].startswith("text/csv")
+    assert download.text.splitlines()[0] == "date,user,cost"
+    assert len(download.text.splitlines()) == status["rows"] + 1
+    assert client.delete(f"/analytics/exports/{job_id}").json()["status"] == "succeeded"
+    assert [job["id"] for job in client.get("/analytics/exports").json()][0] == job_id
+
+    assert client.get("/analytics/exports/missing").status_code == 404
+    assert client.get("/analytics/exports/missing/download").status_code == 404
+    assert client.post("/analytics/exports", json={"fields": ["nope"]}).status_code == 422
+    assert client.post("/analytics/exports", json={"start_date": "someday"}).status_code == 422
+    assert client.post("/analytics/exports", json={"format": "xlsx"}).status_code == 422
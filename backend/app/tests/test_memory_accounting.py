@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from app.benchmarks.synthetic import SyntheticUsageSpec, write_usage_csv
+from app.main import create_app
+from app.observability.memory import AllocationProfiler, deep_sizeof
+from app.repositories import DatasetRegistry
+from app.routers.analytics import get_dataset_registry, get_result_cache
+from app.services.result_cache import ResultCache
+
+
+def test_deep_sizeof_counts_contents_once() -> None:
+    words = [str(index) * 1000 for index in range(10)]
+    assert deep_sizeof(words) >= 10 * 1000
+    assert deep_sizeof([words, words]) < deep_sizeof(words) + 200
+
+    frame = pd.DataFrame({"user": words, "tokens": np.arange(10)})
+    assert deep_sizeof({"frame": frame}) >= int(frame.memory_usage(deep=True).sum())
+    assert deep_sizeof(np.zeros(1000)) == 8000
+
+
+def test_registry_reports_frames_columns_and_mapped_tables(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=2000, users=5, days=20, seed=1))
+    in_memory = DatasetRegistry({"default": csv_path}, 100 * 1024 * 1024)
+    in_memory.repository("default")
+    stored = DatasetRegistry({"default": csv_path}, 100 * 1024 * 1024, tmp_path / "store")
+    stored.repository("default")
+
+    [dataset] = in_memory.memory_usage()
+    dataframe = dataset["dataframe"]
+    assert dataframe["bytes"] == dataframe["index"] + sum(dataframe["columns"].values())
+    assert dataset["bytes"] == dataframe["bytes"] + dataset["rollup"]["bytes"]
+    assert dataframe["columns"]["user"] > dataframe["columns"]["total_tokens"] == 2000 * 8
+    # One pydantic object per row weighs far more than the columnar frame.
+    assert dataset["events_dto_bytes"] > dataframe["bytes"]
+
+    [dataset] = stored.memory_usage()
+    table = dataset["table"]
+    assert "dataframe" not in dataset and table["rows"] == 2000
+    assert table["columns"]["date"] == table["columns"]["total_tokens"] == 2000 * 8
+    assert set(table["dictionaries"]) >= {"user", "model"}
+    assert dataset["bytes"] == dataset["rollup"]["bytes"]
+
+
+def test_memory_endpoint_and_allocation_profiles(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=1000, users=3, days=10, seed=2))
+    registry = DatasetRegistry({"default": csv_path}, 100 * 1024 * 1024)
+    result_cache = ResultCache()
+    app = create_app(allocation_profiling=True)
+    app.dependency_overrides[get_dataset_registry] = lambda: registry
+    app.dependency_overrides[get_result_cache] = lambda: result_cache
+    client = TestClient(app)
+
+    assert "x-allocation-profile" not in client.get("/analytics/tokens_per_user").headers
+    profiled = client.get("/analytics/raw_data", headers={"X-Profile-Allocations": "1"})
+    profile_id = profiled.headers["X-Allocation-Profile"]
+
+    report = client.get("/admin/memory").json()
+    [dataset] = report["datasets"]
+    assert dataset["dataset"] == "default" and dataset["dataframe"]["columns"]
+    assert report["caches"]["result_cache"]["methods"].keys() >= {"tokens_per_user", "get_raw_data"}
+    assert report["caches"]["encoded_payloads"]["bytes"] > 0
+    assert report["accounted_bytes"] >= dataset["bytes"] + report["caches"]["result_cache"]["bytes"]
+    if sys.platform == "linux":
+        assert report["process"]["rss_bytes"] > 0
+
+    assert client.get("/admin/memory/allocations").json()[0]["id"] == profile_id
+    profile = client.get(f"/admin/memory/allocations/{profile_id}").json()
+    assert profile["request"] == "GET /analytics/raw_data"
+    assert profile["peak_bytes"] > 0 and profile["sites"]
+    assert client.get("/admin/memory/allocations/missing").status_code == 404
+
+
+def test_profiler_points_at_allocation_sites_and_profiles_one_block_at_a_time() -> None:
+    profiler = AllocationProfiler(top=5)
+
+    with profiler.profile("build") as profile_id:
+        with profiler.profile("nested") as nested_id:
+            kept = [bytearray(1024) for _ in range(2000)]
+
+    assert nested_id is None
+    profile = profiler.get(profile_id)
+    assert profile["net_bytes"] >= 2000 * 1024
+    assert profile["sites"][0]["traceback"][0].startswith(__file__)
+    assert profile["sites"][0]["count_diff"] >= 2000
+    assert [entry["id"] for entry in profiler.profiles()] == [profile_id]
+    del kept
+
+    with pytest.raises(ValueError):
+        AllocationProfiler(top=0)
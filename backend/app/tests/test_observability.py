@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import create_app
+from app.observability import REGISTRY, phase, set_enabled
+from app.observability.metrics import Counter, Histogram, MetricsRegistry
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics() -> Iterator[None]:
+    yield
+    set_enabled(False)
+    REGISTRY.clear()
+
+
+@pytest.fixture
+def usage_csv(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    csv_path = tmp_path / "usage.csv"
+    pd.DataFrame(
+        {
+            "Date": ["2024-01-01T12:00:00.000Z", "2024-01-02T09:00:00.000Z"],
+            "User": ["alice@example.com", "bob@example.com"],
+            "Kind": ["chat", "chat"],
+            "Model": ["gpt-4", "gpt-4"],
+            "Max Mode": ["No", "No"],
+            "Input (w/ Cache Write)": [10, 5],
+            "Input (w/o Cache Write)": [0, 0],
+            "Cache Read": [0, 0],
+            "Output Tokens": [15, 10],
+            "Total Tokens": [25, 15],
+            "Requests": [1, 2],
+        }
+    ).to_csv(csv_path, index=False)
+    monkeypatch.setenv("USAGE_CSV_PATH", str(csv_path))
+    return csv_path
+
+
+def test_registry_renders_prometheus_text_format() -> None:
+    set_enabled(True)
+    registry = MetricsRegistry()
+    counter = registry.register(Counter("demo_total", "Demo counter.", ("route",)))
+    histogram = registry.register(Histogram("demo_seconds", "Demo histogram.", buckets=(0.1, 1.0)))
+
+    counter.inc(route='/a"b')
+    counter.inc(2, route='/a"b')
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+
+    assert registry.render().splitlines() == [
+        "# HELP demo_total Demo counter.",
+        "# TYPE demo_total counter",
+        'demo_total{route="/a\\"b"} 3.0',
+        "# HELP demo_seconds Demo histogram.",
+        "# TYPE demo_seconds histogram",
+        'demo_seconds_bucket{le="0.1"} 1',
+        'demo_seconds_bucket{le="1.0"} 2',
+        'demo_seconds_bucket{le="+Inf"} 2',
+        "demo_seconds_sum 0.55",
+        "demo_seconds_count 2",
+    ]
+
+
+def test_enabled_app_reports_server_timing_and_metrics(usage_csv: Path) -> None:
+    client = TestClient(create_app(metrics_enabled=True))
+
+    response = client.get("/analytics/raw_data", params={"user": "alice@example.com"})
+
+    assert response.status_code == 200
+    phases = {entry.split(";")[0] for entry in response.headers["Server-Timing"].split(", ")}
+    assert {"csv_parse", "filter", "sort", "json_encode", "total"} <= phases
+    assert "dto_build" not in phases
+
+    exposition = client.get("/metrics").text
+    assert 'usage_http_requests_total{route="/analytics/raw_data",method="GET",status="200"} 1.0' in exposition
+    assert 'usage_rows_scanned_total{operation="get_raw_data"} 2.0' in exposition
+    assert "usage_dataset_load_duration_seconds_count 1" in exposition
+
+
+def test_disabled_app_skips_timing(usage_csv: Path) -> None:
+    client = TestClient(create_app(metrics_enabled=False))
+
+    response = client.get("/analytics/tokens_per_user")
+
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
+    assert "usage_http_requests_total{" not in client.get("/metrics").text
+    with phase("noop") as timer:
+        pass
+    assert type(timer).__name__ == "_NoopTimer"
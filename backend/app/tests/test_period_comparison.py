@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.benchmarks.synthetic import SyntheticUsageSpec, write_usage_csv
+from app.observability.metrics import REGISTRY, ROWS_SCANNED, set_enabled
+from app.repositories import CSVUsageRepository
+from app.routers.analytics import analytics_router, get_usage_analytics_service
+from app.services import UsageAnalyticsService
+from app.services.period_comparison import Period, compare_periods, resolve_periods
+
+
+@pytest.fixture(autouse=True)
+def _metrics() -> None:
+    set_enabled(True)
+    REGISTRY.clear()
+    yield
+    set_enabled(False)
+    REGISTRY.clear()
+
+
+def _window_totals(events: pd.DataFrame, group_by: str, metric: str, first: str, last: str) -> pd.Series:
+    days = events["date"].dt.floor("D")
+    selected = events[(days >= pd.Timestamp(first, tz="UTC")) & (days <= pd.Timestamp(last, tz="UTC"))]
+    return selected.groupby(group_by)[metric].sum()
+
+
+def test_default_previous_period_is_the_days_right_before() -> None:
+    current, previous = resolve_periods("2025-01-11", "2025-01-20")
+
+    assert str(current) == "2025-01-11/2025-01-20"
+    assert str(previous) == "2025-01-01/2025-01-10"
+    assert str(resolve_periods("2025-01-11", "2025-01-20", offset_days=7)[1]) == "2025-01-04/2025-01-13"
+
+    with pytest.raises(ValueError):
+        resolve_periods("2025-01-20", "2025-01-11")
+    with pytest.raises(ValueError):
+        resolve_periods("2025-01-11T12:00:00Z", "2025-01-20")
+    with pytest.raises(ValueError):
+        resolve_periods("2025-01-11", "2025-01-20", previous_start_date="2025-01-01")
+    with pytest.raises(ValueError):
+        resolve_periods("2025-01-11", "2025-01-20", "2025-01-01", "2025-01-05", offset_days=3)
+
+
+def test_comparison_matches_sums_over_the_events(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=3000, users=5, days=20, seed=4))
+    repository = CSVUsageRepository(csv_path)
+    service = UsageAnalyticsService(repository)
+    events = repository.get_dataframe()
+
+    comparison, current, previous = service.compare_periods("2025-01-11", "2025-01-20", "model", "cost")
+
+    assert str(previous) == "2025-01-01/2025-01-10"
+    assert list(comparison.columns) == ["model", "current", "previous", "change", "change_pct"]
+    changes = comparison["change"].abs().tolist()
+    assert changes == sorted(changes, reverse=True)
+    expected_current = _window_totals(events, "model", "cost", "2025-01-11", "2025-01-20")
+    expected_previous = _window_totals(events, "model", "cost", "2025-01-01", "2025-01-10")
+    for row in comparison.to_dict("records"):
+        assert row["current"] == pytest.approx(expected_current.get(row["model"], 0.0))
+        assert row["previous"] == pytest.approx(expected_previous.get(row["model"], 0.0))
+        assert row["change_pct"] == pytest.approx(100 * row["change"] / row["previous"])
+
+    assert ROWS_SCANNED.value(operation="compare_periods") == len(service._load_rollup("rollup"))
+
+    with pytest.raises(ValueError):
+        service.compare_periods("2025-01-11", "2025-01-20", "kind")
+
+
+def test_overlapping_periods_and_new_groups() -> None:
+    rollup = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2025-01-01", "2025-01-02", "2025-01-03", "2025-01-03"], utc=True),
+            "user": ["a", "a", "a", "b"],
+            "total_tokens": [10, 20, 30, 5],
+        }
+    )
+    day = lambda value: pd.Timestamp(value, tz="UTC")  # noqa: E731
+
+    comparison = compare_periods(
+        rollup,
+        "user",
+        "total_tokens",
+        Period(day("2025-01-02"), day("2025-01-03")),
+        Period(day("2025-01-01"), day("2025-01-02")),
+    )
+
+    assert comparison.to_dict("list") == {
+        "user": ["a", "b"],
+        "current": [50, 5],
+        "previous": [30, 0],
+        "change": [20, 5],
+        "change_pct": [pytest.approx(200 / 3), pytest.approx(float("nan"), nan_ok=True)],
+    }
+
+
+def test_compare_endpoint_reports_periods_and_validates(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=500, users=3, days=20, seed=6))
+    app = FastAPI()
+    app.include_router(analytics_router)
+    app.dependency_overrides[get_usage_analytics_service] = lambda: UsageAnalyticsService(CSVUsageRepository(csv_path))
+    client = TestClient(app)
+
+    response = client.get(
+        "/analytics/compare",
+        params={"start_date": "2025-01-15", "end_date": "2025-01-20", "previous_start_date": "2025-01-01", "previous_end_date": "2025-01-03"},
+    )
+    assert response.status_code == 200
+    assert response.headers["X-Current-Period"] == "2025-01-15/2025-01-20"
+    assert response.headers["X-Previous-Period"] == "2025-01-01/2025-01-03"
+    assert set(response.json()[0]) == {"user", "current", "previous", "change", "change_pct"}
+
+    shifted = client.get("/analytics/compare", params={"start_date": "2025-01-15", "end_date": "2025-01-20", "offset_days": 20})
+    assert shifted.status_code == 200
+    assert all(row["previous"] == 0 and row["change_pct"] is None for row in shifted.json())
+
+    assert client.get("/analytics/compare", params={"start_date": "2025-01-15"}).status_code == 422
+    assert client.get("/analytics/compare", params={"start_date": "2025-01-20", "end_date": "2025-01-15"}).status_code == 422
+    assert (
+        client.get("/analytics/compare", params={"start_date": "2025-01-15", "end_date": "2025-01-20", "metric": "kind"}).status_code
+        == 422
+    )
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from app.benchmarks.synthetic import SyntheticUsageSpec, write_usage_csv
+from app.repositories import ChunkedCSVUsageRepository, CSVUsageRepository
+from app.repositories.pricing import PriceTable
+from app.services import UsageAnalyticsService
+
+
+PRICES = PriceTable.from_dict(
+    {
+        "free_kinds": ["Errored, Not Charged"],
+        "prices": [
+            {"model": "*", "max_mode": "*", "input": 1, "cache_write": 2, "cache_read": 0.5, "output": 4},
+            {"model": "gpt-5", "max_mode": "Yes", "input": 10, "cache_write": 20, "cache_read": 5, "output": 40},
+        ],
+    }
+)
+
+
+def test_compute_cost_resolves_rates_per_model_and_max_mode() -> None:
+    frame = pd.DataFrame(
+        {
+            "kind": ["Included", "Included", "Errored, Not Charged"],
+            "model": ["gpt-5", "gpt-5", "auto"],
+            "max_mode": ["Yes", "No", "No"],
+            "input_without_cache": [1_000_000, 1_000_000, 1_000_000],
+            "input_with_cache": [1_000_000, 0, 0],
+            "cache_read": [0, 2_000_000, 0],
+            "output_tokens": [500_000, 0, 0],
+        }
+    )
+
+    assert PRICES.compute_cost(frame).tolist() == pytest.approx([50.0, 2.0, 0.0])
+    assert PRICES.fingerprint != PriceTable.from_dict({"prices": []}).fingerprint
+
+
+def test_cost_sums_match_across_eager_rollup_and_columnar_paths(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=800, users=5, days=4, seed=12))
+    eager = CSVUsageRepository(csv_path, price_table=PRICES)
+    chunked = ChunkedCSVUsageRepository(csv_path, tmp_path / "store", chunk_rows=100, price_table=PRICES)
+
+    expected = eager.get_dataframe().groupby("user")["cost"].sum()
+    for repository in (eager, chunked):
+        service = UsageAnalyticsService(repository)
+        by_user = service.tokens_per_user().set_index("user")["cost"]
+        sub_day = service.tokens_per_user(start_date="2025-01-02T12:00:00Z")
+        pd.testing.assert_series_equal(by_user, expected, check_names=False)
+        assert 0 < sub_day["cost"].sum() < by_user.sum()
+    assert service.events_per_day()["cost"].sum() == pytest.approx(expected.sum())
+
+
+def test_price_table_changes_the_dataset_version(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=10, days=1))
+
+    assert CSVUsageRepository(csv_path, price_table=PRICES).dataset_version() != CSVUsageRepository(csv_path).dataset_version()
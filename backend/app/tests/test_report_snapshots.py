@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.cli.precompute import main as precompute_main
+from app.repositories import CSVUsageRepository, DatasetRegistry
+from app.routers.analytics import analytics_router, get_dataset_registry, get_usage_analytics_service
+from app.services.report_snapshots import ReportSnapshotStore
+
+
+def _write_usage_csv(csv_path: Path) -> None:
+    pd.DataFrame(
+        {
+            "Date": ["2024-01-01T12:00:00.000Z", "2024-01-05T09:00:00.000Z", "2024-01-10T09:00:00.000Z"],
+            "User": ["alice@example.com", "bob@example.com", "alice@example.com"],
+            "Kind": ["chat", "chat", "chat"],
+            "Model": ["gpt-4", "gpt-3.5", "gpt-4"],
+            "Max Mode": ["No", "No", "No"],
+            "Input (w/ Cache Write)": [10, 5, 2],
+            "Input (w/o Cache Write)": [0, 0, 0],
+            "Cache Read": [0, 0, 0],
+            "Output Tokens": [15, 10, 3],
+            "Total Tokens": [25, 15, 5],
+            "Requests": [1, 2, 5],
+        }
+    ).to_csv(csv_path, index=False)
+
+
+def _without_cost(records: list[dict]) -> list[dict]:
+    return [{key: value for key, value in record.items() if key != "cost"} for record in records]
+
+
+def test_precompute_writes_versioned_snapshots_for_each_window(tmp_path: Path) -> None:
+    csv_path = tmp_path / "usage.csv"
+    _write_usage_csv(csv_path)
+    output_dir = tmp_path / "snapshots"
+
+    exit_code = precompute_main(["--csv", str(csv_path), "--output-dir", str(output_dir), "--window", "7"])
+
+    assert exit_code == 0
+    store = ReportSnapshotStore(output_dir)
+    dataset_version = CSVUsageRepository(csv_path).dataset_version()
+    manifest = store.load_manifest(dataset_version)
+    assert manifest is not None
+    assert manifest["reports"]["tokens_per_user"]["last_7d"] == {
+        "start_date": "2024-01-04",
+        "end_date": "2024-01-10",
+        "rows": 2,
+        "files": {"json": "tokens_per_user__last_7d.json"},
+    }
+
+    all_time = json.loads(store.read_json(dataset_version, "tokens_per_user"))
+    windowed = json.loads(store.read_json(dataset_version, "tokens_per_user", "last_7d"))
+    assert _without_cost(all_time) == [
+        {"user": "alice@example.com", "total_tokens": 30},
+        {"user": "bob@example.com", "total_tokens": 15},
+    ]
+    assert _without_cost(windowed) == [
+        {"user": "alice@example.com", "total_tokens": 5},
+        {"user": "bob@example.com", "total_tokens": 15},
+    ]
+
+
+def test_aggregate_endpoint_serves_matching_snapshot_without_computing(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    csv_path = tmp_path / "usage.csv"
+    _write_usage_csv(csv_path)
+    output_dir = tmp_path / "snapshots"
+    precompute_main(["--csv", str(csv_path), "--output-dir", str(output_dir)])
+    monkeypatch.setenv("USAGE_CSV_PATH", str(csv_path))
+    monkeypatch.setenv("USAGE_SNAPSHOT_DIR", str(output_dir))
+
+    class FailingService:
+        def tokens_by_model(self) -> pd.DataFrame:
+            raise AssertionError("snapshot should have been served")
+
+    app = FastAPI()
+    app.include_router(analytics_router)
+    app.dependency_overrides[get_usage_analytics_service] = FailingService
+    client = TestClient(app)
+
+    response = client.get("/analytics/tokens_by_model")
+
+    assert response.status_code == 200
+    assert "X-Report-Snapshot" in response.headers
+    assert _without_cost(response.json()) == [
+        {"model": "gpt-3.5", "total_tokens": 15},
+        {"model": "gpt-4", "total_tokens": 30},
+    ]
+    assert client.get("/analytics/snapshots/tokens_by_model?window=last_30d").status_code == 404
+
+
+def test_snapshot_lookup_uses_the_injected_registry(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    csv_path = tmp_path / "usage.csv"
+    _write_usage_csv(csv_path)
+    output_dir = tmp_path / "snapshots"
+    precompute_main(["--csv", str(csv_path), "--output-dir", str(output_dir)])
+    # The environment names no usable dataset; only the overridden registry knows the CSV.
+    monkeypatch.setenv("USAGE_CSV_PATH", str(tmp_path / "missing.csv"))
+    monkeypatch.setenv("USAGE_SNAPSHOT_DIR", str(output_dir))
+    registry = DatasetRegistry({"default": csv_path}, 100 * 1024 * 1024)
+
+    app = FastAPI()
+    app.include_router(analytics_router)
+    app.dependency_overrides[get_dataset_registry] = lambda: registry
+    client = TestClient(app)
+
+    for path in ("/analytics/events_per_day", "/analytics/tokens_per_user", "/analytics/snapshots/tokens_by_model"):
+        assert "X-Report-Snapshot" in client.get(path).headers
+
+
+def test_snapshot_hit_does_not_load_the_dataset(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    csv_path = tmp_path / "usage.csv"
+    _write_usage_csv(csv_path)
+    output_dir = tmp_path / "snapshots"
+    precompute_main(["--csv", str(csv_path), "--output-dir", str(output_dir)])
+    monkeypatch.setenv("USAGE_CSV_PATH", str(csv_path))
+    monkeypatch.setenv("USAGE_SNAPSHOT_DIR", str(output_dir))
+    loads: list[str] = []
+    load = DatasetRegistry._load
+
+    def recording_load(dataset_id: str, version: str, source: CSVUsageRepository):
+        loads.append(dataset_id)
+        return load(dataset_id, version, source)
+
+    monkeypatch.setattr(DatasetRegistry, "_load", staticmethod(recording_load))
+    app = FastAPI()
+    app.include_router(analytics_router)
+    client = TestClient(app)
+
+    for report in ("events_per_day", "tokens_per_user", "tokens_by_model"):
+        assert "X-Report-Snapshot" in client.get(f"/analytics/{report}").headers
+    assert loads == []
+
+    client.get("/analytics/raw_data/summary")
+    assert loads == ["default"]
+
+
+def test_snapshot_is_ignored_once_the_csv_changes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    csv_path = tmp_path / "usage.csv"
+    _write_usage_csv(csv_path)
+    output_dir = tmp_path / "snapshots"
+    precompute_main(["--csv", str(csv_path), "--output-dir", str(output_dir)])
+    with csv_path.open("a", encoding="utf-8") as handle:
+        handle.write("2024-01-11T09:00:00.000Z,carol@example.com,chat,gpt-4,No,1,0,0,1,2,1\n")
+    monkeypatch.setenv("USAGE_CSV_PATH", str(csv_path))
+    monkeypatch.setenv("USAGE_SNAPSHOT_DIR", str(output_dir))
+
+    app = FastAPI()
+    app.include_router(analytics_router)
+    client = TestClient(app)
+
+    response = client.get("/analytics/tokens_per_user")
+
+    assert "X-Report-Snapshot" not in response.headers
+    assert {row["user"] for row in response.json()} == {
+        "alice@example.com",
+        "bob@example.com",
+        "carol@example.com",
+    }
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from app.benchmarks.synthetic import SyntheticUsageSpec, write_usage_csv
+from app.repositories import CSVUsageRepository
+from app.services import UsageAnalyticsService
+from app.services.result_cache import ResultCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def usage_csv(tmp_path: Path) -> Path:
+    return write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=300, users=4, days=3, seed=4))
+
+
+def test_repeated_queries_are_served_from_the_cache(usage_csv: Path) -> None:
+    cache = ResultCache()
+    first = UsageAnalyticsService(CSVUsageRepository(usage_csv), cache).tokens_per_user(start_date="2025-01-02")
+    second = UsageAnalyticsService(CSVUsageRepository(usage_csv), cache).tokens_per_user(
+        start_date="2025-01-02T00:00:00Z"
+    )
+
+    assert second is first
+    assert cache.stats() == {"tokens_per_user": {"hit": 1, "miss": 1}}
+    pd.testing.assert_frame_equal(
+        first, UsageAnalyticsService(CSVUsageRepository(usage_csv)).tokens_per_user(start_date="2025-01-02")
+    )
+
+
+def test_new_dataset_version_invalidates_results(usage_csv: Path) -> None:
+    cache = ResultCache()
+    service = UsageAnalyticsService(CSVUsageRepository(usage_csv), cache)
+    before = service.get_raw_data(user="user00001@example.com")
+
+    write_usage_csv(usage_csv, SyntheticUsageSpec(rows=20, users=2, days=1, seed=8))
+    stat = usage_csv.stat()
+    os.utime(usage_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    after = UsageAnalyticsService(CSVUsageRepository(usage_csv), cache).get_raw_data(user="user00001@example.com")
+
+    assert len(after) < len(before)
+    assert len(cache) == 1
+
+
+def test_entries_expire_and_least_recently_used_are_evicted() -> None:
+    clock = FakeClock()
+    cache = ResultCache(max_entries=2, ttl_seconds=10, clock=clock)
+    calls: list[str] = []
+
+    def compute(name: str):
+        return lambda: calls.append(name) or name
+
+    for name in ("a", "b", "a", "c", "b"):
+        cache.get_or_compute("src", "v1", "method", name, compute(name))
+    assert calls == ["a", "b", "c", "b"]
+
+    clock.now = 11
+    cache.get_or_compute("src", "v1", "method", "b", compute("b"))
+    assert calls[-1] == "b" and len(calls) == 5
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.benchmarks.synthetic import SyntheticUsageSpec, write_usage_csv
+from app.observability.metrics import REGISTRY, SERIES_UPDATES, set_enabled
+from app.repositories import CSVUsageRepository
+from app.routers.analytics import analytics_router, get_usage_analytics_service
+from app.services import UsageAnalyticsService
+from app.services.rolling_series import RollingSeriesCache, compute_statistics, first_changed_row
+
+
+@pytest.fixture(autouse=True)
+def _metrics() -> None:
+    set_enabled(True)
+    REGISTRY.clear()
+    yield
+    set_enabled(False)
+    REGISTRY.clear()
+
+
+def _daily(days: int, seed: int = 0, start: str = "2025-01-20") -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=days, freq="D", tz="UTC", name="date")
+    return pd.DataFrame(rng.integers(0, 100, size=(days, 2)).astype("float64"), index=index, columns=["a", "b"])
+
+
+def test_statistics_average_calendar_days_and_reset_monthly() -> None:
+    daily = _daily(20)
+    statistics = compute_statistics(daily)
+
+    assert statistics["ma_7d"].iloc[10, 0] == pytest.approx(daily["a"].iloc[4:11].mean())
+    assert statistics["ma_30d"].iloc[10, 0] == pytest.approx(daily["a"].iloc[:11].mean())
+    february = daily.index.get_loc(pd.Timestamp("2025-02-01", tz="UTC"))
+    assert statistics["mtd"].iloc[february - 1, 1] == pytest.approx(daily["b"].iloc[:february].sum())
+    assert statistics["mtd"].iloc[february + 2, 1] == pytest.approx(daily["b"].iloc[february : february + 3].sum())
+
+
+def test_incremental_update_matches_full_recompute() -> None:
+    cache = RollingSeriesCache()
+    previous = _daily(60)
+    cache.statistics("usage.csv", "v1", "user", "total_tokens", lambda: previous)
+
+    current = pd.concat([previous, _daily(5, seed=1, start="2025-03-21")])
+    current.iloc[57, 0] += 1
+    current["c"] = 0.0
+    current.iloc[-1, 2] = 7.0
+    assert first_changed_row(previous, current) == 57
+
+    _, statistics = cache.statistics("usage.csv", "v2", "user", "total_tokens", lambda: current)
+    expected = compute_statistics(current)
+    for name, frame in expected.items():
+        pd.testing.assert_frame_equal(statistics[name], frame)
+
+    cache.statistics("usage.csv", "v2", "user", "total_tokens", lambda: current)
+    cache.statistics("usage.csv", "v3", "user", "total_tokens", lambda: current.iloc[3:])
+    assert SERIES_UPDATES.value(mode="incremental") == 1
+    assert SERIES_UPDATES.value(mode="unchanged") == 1
+    assert SERIES_UPDATES.value(mode="full") == 2
+
+
+def test_window_keeps_history_for_moving_averages(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=2000, users=3, days=45, seed=3))
+    service = UsageAnalyticsService(CSVUsageRepository(csv_path), series_cache=RollingSeriesCache())
+
+    full = service.usage_series("user", "cost")
+    user = full["user"].iloc[0]
+    window = service.usage_series("user", "cost", start_date="2025-02-01", end_date="2025-02-05", key=user)
+
+    assert list(window.columns) == ["date", "user", "cost", "ma_7d", "ma_30d", "mtd"]
+    assert len(window) == 5
+    expected = full[(full["user"] == user) & (full["date"] >= window["date"].iloc[0])].head(5)
+    pd.testing.assert_frame_equal(window, expected.reset_index(drop=True))
+    with pytest.raises(ValueError):
+        service.usage_series("kind")
+
+
+def test_usage_series_endpoint_validates_parameters(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=200, users=2, days=10, seed=5))
+    app = FastAPI()
+    app.include_router(analytics_router)
+    app.dependency_overrides[get_usage_analytics_service] = lambda: UsageAnalyticsService(CSVUsageRepository(csv_path))
+    client = TestClient(app)
+
+    response = client.get("/analytics/usage_series", params={"metric": "requests"})
+    assert response.status_code == 200
+    payload = response.json()
+    assert len(payload) == 10
+    assert set(payload[0]) == {"date", "series", "requests", "ma_7d", "ma_30d", "mtd"}
+
+    assert client.get("/analytics/usage_series", params={"metric": "kind"}).status_code == 422
+    assert client.get("/analytics/usage_series", params={"group_by": "kind"}).status_code == 422
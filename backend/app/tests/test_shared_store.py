@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import gc
+import threading
+from pathlib import Path
+
+import pytest
+
+from app.benchmarks.synthetic import SyntheticUsageSpec, write_usage_csv
+from app.cli.build_store import main as build_store_main
+from app.repositories import ChunkedCSVUsageRepository, DatasetRegistry, PublishedStoreRepository
+from app.repositories.shared_store import read_version_header, stored_versions
+
+
+def test_concurrent_workers_ingest_a_version_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=500, days=3))
+    store_dir = tmp_path / "store"
+    ingestions = []
+    original_ingest = ChunkedCSVUsageRepository.ingest
+
+    def counting_ingest(self: ChunkedCSVUsageRepository, version: str):
+        ingestions.append(version)
+        return original_ingest(self, version)
+
+    monkeypatch.setattr(ChunkedCSVUsageRepository, "ingest", counting_ingest)
+    barrier = threading.Barrier(4)
+    rows: list[int] = []
+
+    def worker() -> None:
+        barrier.wait()
+        rows.append(ChunkedCSVUsageRepository(csv_path, store_dir, chunk_rows=64).get_columnar_table().rows)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert rows == [500] * 4
+    assert len(ingestions) == 1
+    assert read_version_header(store_dir, csv_path)["dataset_version"] == ingestions[0]
+
+
+def test_attach_only_registry_follows_published_versions(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=300, days=2, seed=1))
+    store_dir = tmp_path / "store"
+    registry = DatasetRegistry({"default": csv_path}, 1 << 30, store_dir, chunk_rows=64, attach_only=True)
+    with pytest.raises(FileNotFoundError):
+        registry.repository("default")
+
+    assert build_store_main(["--csv", str(csv_path), "--store-dir", str(store_dir)]) == 0
+    first = registry.repository("default")
+    assert first.get_columnar_table().rows == 300
+
+    # A rewritten CSV is not seen until the loader publishes it.
+    write_usage_csv(csv_path, SyntheticUsageSpec(rows=450, days=2, seed=2))
+    assert registry.repository("default").dataset_version() == first.dataset_version()
+
+    assert build_store_main(["--csv", str(csv_path), "--store-dir", str(store_dir)]) == 0
+    second = registry.repository("default")
+    assert second.dataset_version() != first.dataset_version()
+    assert second.get_columnar_table().rows == 450
+    assert len(second.get_dataframe(["user"])) == 450
+
+
+def test_published_repository_never_parses_the_csv(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=200, days=2))
+    store_dir = tmp_path / "store"
+    version = ChunkedCSVUsageRepository(csv_path, store_dir).dataset_version()
+    build_store_main(["--csv", str(csv_path), "--store-dir", str(store_dir)])
+    csv_path.unlink()
+
+    repository = PublishedStoreRepository(csv_path, store_dir)
+    assert repository.dataset_version() == version
+    assert repository.get_daily_rollup()["requests"].sum() > 0
+
+
+def test_publishing_prunes_superseded_versions_nobody_maps(tmp_path: Path) -> None:
+    csv_path = tmp_path / "usage.csv"
+    other_path = write_usage_csv(tmp_path / "other.csv", SyntheticUsageSpec(rows=50, days=2))
+    store_dir = tmp_path / "store"
+    other = ChunkedCSVUsageRepository(other_path, store_dir)
+    other.get_columnar_table()
+
+    def publish(rows: int) -> ChunkedCSVUsageRepository:
+        write_usage_csv(csv_path, SyntheticUsageSpec(rows=rows, days=3))
+        repository = ChunkedCSVUsageRepository(csv_path, store_dir, chunk_rows=64)
+        repository.get_columnar_table()
+        return repository
+
+    held = publish(100)
+    first = held.dataset_version()
+    second = publish(110).dataset_version()
+    third = publish(120).dataset_version()
+    # The first version is still mapped by ``held``; the second is the one just replaced.
+    assert set(stored_versions(store_dir, csv_path)) == {first, second, third}
+    assert held.get_columnar_table().read(["total_tokens"]).shape == (100, 1)
+
+    del held
+    gc.collect()
+    fourth = publish(130).dataset_version()
+    assert set(stored_versions(store_dir, csv_path)) == {third, fourth}
+    assert not (store_dir / first).exists()
+    assert stored_versions(store_dir, other_path) == [other.dataset_version()]
@@ -1,10 +1,17 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
+from pathlib import Path
 
+import pandas as pd
+import pytest
+
+from app.benchmarks.synthetic import SyntheticUsageSpec, write_usage_csv
 from app.dto.usage_event import UsageEventDTO
-from app.repositories import CSVUsageRepository
+from app.observability.metrics import REGISTRY, ROWS_SCANNED, set_enabled
+from app.repositories import ChunkedCSVUsageRepository, CSVUsageRepository
 from app.services import UsageAnalyticsService
+from app.services.batch_queries import BatchQuery
 
 
 class DummyCSVUsageRepository(CSVUsageRepository):
@@ -66,8 +73,8 @@ def test_events_per_day_aggregates_requests() -> None:
 
     dataframe = service.events_per_day()
 
-    assert list(dataframe.columns) == ["date", "requests_count"]
-    assert dataframe.to_dict(orient="records") == [
+    assert list(dataframe.columns) == ["date", "requests_count", "cost"]
+    assert dataframe[["date", "requests_count"]].to_dict(orient="records") == [
         {"date": datetime(2024, 1, 1, tzinfo=timezone.utc).date(), "requests_count": 3},
         {"date": datetime(2024, 1, 2, tzinfo=timezone.utc).date(), "requests_count": 5},
     ]
@@ -314,7 +321,7 @@ def test_get_raw_data_returns_empty_dataframe_when_no_matches() -> None:
     assert len(dataframe) == 0
     assert list(dataframe.columns) == [
         "date", "user", "kind", "model", "max_mode", "input_with_cache",
-        "input_without_cache", "cache_read", "output_tokens", "total_tokens", "requests"
+        "input_without_cache", "cache_read", "output_tokens", "total_tokens", "requests", "cost"
     ]
 
 
@@ -472,3 +479,103 @@ def test_get_raw_data_filters_by_all_parameters() -> None:
     assert dataframe.iloc[0]["model"] == "gpt-4"
     assert dataframe.iloc[0]["date"] == datetime(2024, 1, 2, 9, 0, tzinfo=timezone.utc)
 
+
+def test_raw_data_page_sorts_and_slices_the_filtered_rows(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=500, users=4, days=5, seed=2))
+    service = UsageAnalyticsService(CSVUsageRepository(csv_path))
+    everything = service.get_raw_data(start_date="2025-01-02")
+
+    page, total = service.raw_data_page(start_date="2025-01-02", sort_by="total_tokens", descending=False, offset=10, limit=20)
+
+    expected = everything.sort_values("total_tokens", kind="stable", ignore_index=True).iloc[10:30]
+    assert total == len(everything)
+    assert page["total_tokens"].tolist() == expected["total_tokens"].tolist()
+    newest, _ = service.raw_data_page(limit=1)
+    assert newest.iloc[0]["date"] == service.get_raw_data()["date"].max()
+
+
+def test_raw_data_summary_matches_the_raw_rows(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=500, users=4, days=5, seed=2))
+    service = UsageAnalyticsService(CSVUsageRepository(csv_path))
+
+    for start_date in ("2025-01-02", "2025-01-02T06:00:00Z"):
+        rows = service.get_raw_data(start_date=start_date, model="auto")
+        summary = service.raw_data_summary(start_date=start_date, model="auto")
+
+        assert summary["records"] == len(rows)
+        assert summary["users"] == rows["user"].nunique()
+        assert summary["total_tokens"] == rows["total_tokens"].sum()
+        assert summary["requests"] == rows["requests"].sum()
+        assert summary["cost"] == pytest.approx(rows["cost"].sum())
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_batch_matches_individual_queries_with_one_scan(tmp_path: Path, chunked: bool) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=800, users=5, days=6, seed=4))
+    repository = (
+        ChunkedCSVUsageRepository(csv_path, tmp_path / "store", chunk_rows=300) if chunked else CSVUsageRepository(csv_path)
+    )
+    single = UsageAnalyticsService(CSVUsageRepository(csv_path))
+    users = sorted(single.tokens_per_user()["user"])
+    queries = [BatchQuery(f"raw-{user}", "raw_data", start_date="2025-01-02", user=user) for user in users]
+    queries += [
+        BatchQuery("auto", "raw_data", model="auto", end_date="2025-01-03T12:00:00Z", fields=("date", "total_tokens")),
+        BatchQuery("pair", "raw_data", user=users[0], model="auto", limit=5),
+        BatchQuery("nobody", "raw_data", user="nobody@example.com"),
+        BatchQuery("summary", "raw_data_summary", start_date="2025-01-02", user=users[1]),
+        BatchQuery("summary-hours", "raw_data_summary", start_date="2025-01-02T06:00:00Z", model="auto"),
+        BatchQuery("models", "tokens_by_model", end_date="2025-01-04"),
+    ]
+
+    set_enabled(True)
+    REGISTRY.clear()
+    try:
+        results = UsageAnalyticsService(repository).batch(queries)
+        # One pass over the rows for the raw queries and one over the rollup for the summary.
+        assert ROWS_SCANNED.value(operation="batch") == 800 + len(repository.get_daily_rollup())
+    finally:
+        set_enabled(False)
+        REGISTRY.clear()
+
+    def same_rows(actual, expected) -> None:
+        key = list(expected.columns)
+        assert list(actual.columns) == key
+        assert actual["date"].is_monotonic_decreasing
+        pd.testing.assert_frame_equal(
+            actual.astype(str).sort_values(key, ignore_index=True),
+            expected.astype(str).sort_values(key, ignore_index=True),
+        )
+
+    assert list(results) == [query.id for query in queries]
+    for user in users:
+        same_rows(results[f"raw-{user}"], single.get_raw_data(start_date="2025-01-02", user=user))
+    same_rows(results["auto"], single.get_raw_data(end_date="2025-01-03T12:00:00Z", model="auto", fields=["date", "total_tokens"]))
+    assert len(results["pair"]) == 5
+    assert results["nobody"].empty
+    assert results["summary"] == single.raw_data_summary(start_date="2025-01-02", user=users[1])
+    assert results["summary-hours"] == single.raw_data_summary(start_date="2025-01-02T06:00:00Z", model="auto")
+    pd.testing.assert_frame_equal(results["models"], single.tokens_by_model(end_date="2025-01-04"))
+
+    with pytest.raises(ValueError):
+        UsageAnalyticsService(repository).batch([BatchQuery("a", "raw_data"), BatchQuery("a", "raw_data")])
+
+
+@pytest.mark.parametrize("sort_by", ["user", "model"])
+def test_raw_data_page_sorts_store_backed_names_by_value(tmp_path: Path, sort_by: str) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=400, users=4, days=5, seed=5))
+    # Later-seen names sort first, so store dictionaries are in reverse value order.
+    rows = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    for column in ("User", "Model"):
+        names = rows[column].unique()
+        rows[column] = rows[column].map({name: f"{column.lower()}-{chr(ord('z') - index)}" for index, name in enumerate(names)})
+    rows.to_csv(csv_path, index=False)
+    eager = UsageAnalyticsService(CSVUsageRepository(csv_path))
+    stored = UsageAnalyticsService(ChunkedCSVUsageRepository(csv_path, tmp_path / "store", chunk_rows=100))
+
+    for descending in (False, True):
+        expected, total = eager.raw_data_page(sort_by=sort_by, descending=descending, offset=50, limit=200)
+        page, stored_total = stored.raw_data_page(sort_by=sort_by, descending=descending, offset=50, limit=200)
+
+        assert stored_total == total == 400
+        assert page[sort_by].tolist() == expected[sort_by].tolist()
+        assert page[sort_by].is_monotonic_decreasing if descending else page[sort_by].is_monotonic_increasing
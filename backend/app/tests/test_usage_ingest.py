@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.benchmarks.synthetic import SyntheticUsageSpec, write_usage_csv
+from app.observability.metrics import DATASET_LOADS, INGESTED_ROWS, REGISTRY, set_enabled
+from app.repositories import ChunkedCSVUsageRepository, CSVUsageRepository, DatasetRegistry
+from app.repositories.csv_usage_repository import append_usage_rows
+from app.repositories.shared_store import read_version_header
+from app.routers.analytics import analytics_router, get_dataset_registry, get_usage_ingestor
+from app.services import UsageAnalyticsService
+from app.services.usage_ingest import IngestUnavailableError, UsageIngestor
+
+
+@pytest.fixture(autouse=True)
+def _metrics() -> None:
+    set_enabled(True)
+    REGISTRY.clear()
+    yield
+    set_enabled(False)
+    REGISTRY.clear()
+
+
+def _upload(tmp_path: Path, existing: pd.DataFrame) -> Path:
+    new = existing.head(3).assign(Date=["2025-03-01T10:00:00.000Z", "2025-03-01T11:00:00.000Z", "2025-03-02T09:30:00Z"])
+    invalid = existing.head(4).copy()
+    invalid["Date"] = invalid["Date"].astype(object)
+    invalid.loc[invalid.index[0], "Date"] = "yesterday"
+    invalid.loc[invalid.index[1], "User"] = None
+    invalid["Total Tokens"] = invalid["Total Tokens"].astype(object)
+    invalid.loc[invalid.index[2], "Total Tokens"] = "-5"
+    invalid.loc[invalid.index[3], "Total Tokens"] = "many"
+    # Rows: 3 new, 1 repeated within the upload, 2 already in the dataset, 4 invalid.
+    rows = pd.concat([new, new.head(1), existing.tail(2), invalid], ignore_index=True)
+    path = tmp_path / "upload.csv"
+    rows.to_csv(path, index=False)
+    return path
+
+
+def test_upload_is_validated_deduplicated_and_merged_without_reload(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=400, users=4, days=20, seed=3))
+    registry = DatasetRegistry({"default": csv_path}, memory_budget_bytes=100 * 1024 * 1024)
+    before = UsageAnalyticsService(registry.repository("default")).tokens_per_user()
+
+    stats = UsageIngestor(chunk_rows=4).ingest(registry, "default", _upload(tmp_path, pd.read_csv(csv_path)))
+
+    assert (stats.received, stats.accepted, stats.duplicates, stats.rejected) == (10, 3, 3, 4)
+    assert [rejection["reason"] for rejection in stats.rejections] == [
+        "invalid Date",
+        "missing User",
+        "negative Total Tokens",
+        "invalid Total Tokens",
+    ]
+    assert stats.rejections[0]["line"] == 8
+    assert INGESTED_ROWS.value(dataset="default", result="accepted") == 3
+
+    assert registry.repository("default").dataset_version() == stats.dataset_version
+    merged = UsageAnalyticsService(registry.repository("default"))
+    assert DATASET_LOADS.value(dataset="default", reason="merge") == 1
+    assert DATASET_LOADS.value(dataset="default", reason="version_change") == 0
+    reloaded = UsageAnalyticsService(CSVUsageRepository(csv_path))
+    for method in ("events_per_day", "tokens_per_user", "tokens_by_model"):
+        pd.testing.assert_frame_equal(getattr(merged, method)(), getattr(reloaded, method)())
+    assert merged.tokens_per_user()["total_tokens"].sum() > before["total_tokens"].sum()
+
+    again = UsageIngestor().ingest(registry, "default", tmp_path / "upload.csv")
+    assert (again.accepted, again.duplicates, again.rejected) == (0, 6, 4)
+
+
+def test_directory_sources_receive_uploads_as_new_exports(tmp_path: Path) -> None:
+    exports = tmp_path / "exports"
+    exports.mkdir()
+    write_usage_csv(exports / "usage.csv", SyntheticUsageSpec(rows=100, days=5))
+    registry = DatasetRegistry({"default": exports}, memory_budget_bytes=100 * 1024 * 1024)
+
+    stats = UsageIngestor().ingest(registry, "default", _upload(tmp_path, pd.read_csv(exports / "usage.csv")))
+
+    uploads = sorted(exports.glob("upload-*.csv"))
+    assert stats.accepted == 3 and len(uploads) == 1
+    assert len(pd.read_csv(uploads[0])) == 3
+    assert len(registry.repository("default").get_dataframe()) == 103
+
+
+@pytest.mark.parametrize("directory", [False, True])
+def test_failed_append_leaves_the_source_untouched(tmp_path: Path, directory: bool) -> None:
+    source = tmp_path / "exports"
+    source.mkdir()
+    csv_path = write_usage_csv(source / "usage.csv", SyntheticUsageSpec(rows=50, days=3))
+    original = csv_path.read_bytes()
+    rows = pd.read_csv(csv_path).head(5)
+
+    def failing_chunks():
+        yield rows
+        raise OSError("No space left on device")
+
+    with pytest.raises(OSError):
+        append_usage_rows(source if directory else csv_path, failing_chunks())
+
+    assert csv_path.read_bytes() == original
+    assert [path.name for path in source.iterdir()] == ["usage.csv"]
+
+
+def test_store_backed_uploads_are_staged_on_disk_not_kept_in_memory(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=200, users=3, days=10, seed=5))
+    registry = DatasetRegistry({"default": csv_path}, 100 * 1024 * 1024, tmp_path / "store", chunk_rows=64)
+    merged_events = []
+    merge = registry.merge
+
+    def recording_merge(dataset_id: str, events: pd.DataFrame | None, persist, rows_path=None) -> str:
+        merged_events.append(events)
+        return merge(dataset_id, events, persist, rows_path)
+
+    monkeypatch.setattr(registry, "merge", recording_merge)
+
+    stats = UsageIngestor(chunk_rows=2).ingest(registry, "default", _upload(tmp_path, pd.read_csv(csv_path)))
+
+    assert stats.accepted == 3 and merged_events == [None]
+    assert len(pd.read_csv(csv_path)) == 203
+    stored = UsageAnalyticsService(registry.repository("default"))
+    reloaded = UsageAnalyticsService(CSVUsageRepository(csv_path))
+    pd.testing.assert_frame_equal(stored.tokens_per_user(), reloaded.tokens_per_user())
+
+
+@pytest.mark.parametrize("directory", [False, True])
+def test_store_backed_uploads_extend_the_stored_version_without_reingesting(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, directory: bool
+) -> None:
+    exports = tmp_path / "exports"
+    exports.mkdir()
+    csv_path = write_usage_csv(exports / "usage.csv", SyntheticUsageSpec(rows=300, users=4, days=10, seed=6))
+    source = exports if directory else csv_path
+    store_dir = tmp_path / "store"
+    registry = DatasetRegistry({"default": source}, 100 * 1024 * 1024, store_dir, chunk_rows=64)
+    registry.repository("default")
+
+    def fail_ingest(self: ChunkedCSVUsageRepository, version: str) -> None:
+        raise AssertionError("the upload should extend the stored version")
+
+    monkeypatch.setattr(ChunkedCSVUsageRepository, "ingest", fail_ingest)
+    stats = UsageIngestor(chunk_rows=2).ingest(registry, "default", _upload(tmp_path, pd.read_csv(csv_path)))
+
+    assert stats.accepted == 3
+    assert DATASET_LOADS.value(dataset="default", reason="merge") == 1
+    assert read_version_header(store_dir, source)["dataset_version"] == stats.dataset_version
+    stored = registry.repository("default")
+    assert stored.dataset_version() == stats.dataset_version
+    assert stored.get_columnar_table().rows == 303
+    rows = stored.get_dataframe()
+    expected = CSVUsageRepository(source).get_dataframe()
+    assert rows.groupby("user")["total_tokens"].sum().equals(expected.groupby("user")["total_tokens"].sum())
+    assert DATASET_LOADS.value(dataset="default", reason="version_change") == 0
+    reloaded = UsageAnalyticsService(CSVUsageRepository(source))
+    for method in ("events_per_day", "tokens_per_user", "tokens_by_model"):
+        pd.testing.assert_frame_equal(
+            getattr(UsageAnalyticsService(stored), method)(), getattr(reloaded, method)()
+        )
+
+
+def test_ingest_endpoint_streams_limits_and_reports(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=100, days=5))
+    upload = _upload(tmp_path, pd.read_csv(csv_path)).read_bytes()
+    registry = DatasetRegistry({"default": csv_path, "packed": tmp_path / "usage.csv.gz"}, 100 * 1024 * 1024)
+    app = FastAPI()
+    app.include_router(analytics_router)
+    app.dependency_overrides[get_dataset_registry] = lambda: registry
+    client = TestClient(app)
+
+    response = client.post("/analytics/ingest", content=upload, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    assert {key: response.json()[key] for key in ("accepted", "rejected", "duplicates")} == {
+        "accepted": 3,
+        "rejected": 4,
+        "duplicates": 3,
+    }
+
+    assert client.post("/analytics/ingest", content=b"Date,User\n2025-01-01,a\n").status_code == 422
+    assert client.post("/analytics/ingest", params={"dataset": "packed"}, content=upload).status_code == 409
+    monkeypatch.setenv("USAGE_INGEST_MAX_MB", str(len(upload) / 2 / 1024 / 1024))
+    assert client.post("/analytics/ingest", content=upload).status_code == 413
+
+
+def test_ingest_endpoint_runs_the_ingest_off_the_event_loop(tmp_path: Path) -> None:
+    csv_path = write_usage_csv(tmp_path / "usage.csv", SyntheticUsageSpec(rows=100, days=5))
+    registry = DatasetRegistry({"default": csv_path}, 100 * 1024 * 1024)
+    on_event_loop = []
+
+    class RecordingIngestor(UsageIngestor):
+        def ingest(self, registry: DatasetRegistry, dataset_id: str, upload: str | Path):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                on_event_loop.append(False)
+            else:
+                on_event_loop.append(True)
+            return super().ingest(registry, dataset_id, upload)
+
+    app = FastAPI()
+    app.include_router(analytics_router)
+    app.dependency_overrides[get_dataset_registry] = lambda: registry
+    app.dependency_overrides[get_usage_ingestor] = RecordingIngestor
+    client = TestClient(app)
+
+    upload = _upload(tmp_path, pd.read_csv(csv_path)).read_bytes()
+    assert client.post("/analytics/ingest", content=upload).json()["accepted"] == 3
+    assert on_event_loop == [False]
+
+
+def test_attach_only_workers_refuse_uploads(tmp_path: Path) -> None:
+    registry = DatasetRegistry({"default": tmp_path / "usage.csv"}, 0, tmp_path / "store", attach_only=True)
+
+    with pytest.raises(IngestUnavailableError):
+        UsageIngestor().ingest(registry, "default", tmp_path / "upload.csv")
@@ -1,3 +1,5 @@
+import json
+import threading
 import streamlit as st
 import pandas as pd
 import plotly.express as px
@@ -11,7 +13,101 @@ ANALYTICS_ENDPOINTS = {
     "tokens_per_user": "/analytics/tokens_per_user",
     "tokens_by_model": "/analytics/tokens_by_model",
     "raw_data": "/analytics/raw_data",
+    "raw_data_summary": "/analytics/raw_data/summary",
+    "usage_series": "/analytics/usage_series",
+    "updates": "/analytics/updates",
 }
+# Upper bound on points per line sent to Plotly; the backend downsamples with LTTB.
+CHART_MAX_POINTS = 1000
+# Rendered figures kept per process; each is keyed on the dataset version and its parameters.
+FIGURE_CACHE_ENTRIES = 64
+RAW_COLUMN_LABELS = {
+    "date": "Дата",
+    "user": "Пользователь",
+    "kind": "Тип",
+    "model": "Модель",
+    "max_mode": "Макс. режим",
+    "input_with_cache": "Ввод (с кэшем)",
+    "input_without_cache": "Ввод (без кэша)",
+    "cache_read": "Чтение кэша",
+    "output_tokens": "Выходные токены",
+    "total_tokens": "Всего токенов",
+    "requests": "Запросы",
+    "cost": "Стоимость, $",
+}
+METRIC_LABELS = {"total_tokens": "Токены", "cost": "Стоимость, $"}
+
+
+class DatasetUpdateListener:
+    """Background subscriber to the backend's Server-Sent Events stream of dataset versions.
+
+    Every announced change keeps its version and changed date range, so each
+    cached query can be keyed on the newest change that touches its own
+    window: queries outside the changed days keep hitting the cache. Only the
+    last ``MAX_CHANGES`` are kept; ``floor_version`` is the newest one dropped,
+    which every window must be treated as touched by.
+    """
+
+    MAX_CHANGES = 100
+
+    def __init__(self, url: str) -> None:
+        self._url = url
+        self._lock = threading.Lock()
+        self._changes: list[dict] = []
+        self._last_event_id = None
+        self.latest_version = None
+        self.floor_version = None
+        threading.Thread(target=self._run, name="dataset-updates", daemon=True).start()
+
+    def changes(self) -> list[dict]:
+        with self._lock:
+            return list(self._changes)
+
+    def _run(self) -> None:  # pragma: no cover - network loop
+        delay = 1.0
+        while True:
+            try:
+                headers = {"Last-Event-ID": self._last_event_id} if self._last_event_id else {}
+                with requests.get(self._url, headers=headers, stream=True, timeout=(5, 60)) as response:
+                    response.raise_for_status()
+                    delay = 1.0
+                    for line in response.iter_lines(decode_unicode=True):
+                        if line and line.startswith("data:"):
+                            self._record(json.loads(line[len("data:"):]))
+            except (requests.RequestException, ValueError):
+                pass
+            time.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    def _record(self, change: dict) -> None:
+        with self._lock:
+            # The first message only tells us the version the dashboard starts from.
+            if self._last_event_id is not None and change.get("scope") != "none":
+                self._changes.append(change)
+                if len(self._changes) > self.MAX_CHANGES:
+                    dropped = self._changes[: -self.MAX_CHANGES]
+                    self._changes = self._changes[-self.MAX_CHANGES:]
+                    self.floor_version = dropped[-1]["version"]
+            self._last_event_id = change["version"]
+            self.latest_version = change["version"]
+
+
+@st.cache_resource(show_spinner=False)
+def get_update_listener() -> DatasetUpdateListener:
+    return DatasetUpdateListener(f"{BACKEND_URL}{ANALYTICS_ENDPOINTS['updates']}")
+
+
+def data_version(start_date: str = None, end_date: str = None) -> str:
+    """Return a cache key part that changes only when a new dataset version touches the window."""
+
+    listener = get_update_listener()
+    for change in reversed(listener.changes()):
+        if change["scope"] == "all":
+            return change["version"]
+        if (end_date is None or change["start_date"] <= end_date) and (start_date is None or change["end_date"] >= start_date):
+            return change["version"]
+    # Changes older than the kept ones may have touched the window too.
+    return listener.floor_version or "initial"
 
 
 def fetch_dataframe(endpoint: str, params: dict = None) -> pd.DataFrame:
@@ -43,22 +139,27 @@ def fetch_dataframe(endpoint: str, params: dict = None) -> pd.DataFrame:
 
 
 @st.cache_data(show_spinner=False)
-def get_events_per_day() -> pd.DataFrame:
-    return fetch_dataframe(ANALYTICS_ENDPOINTS["events_per_day"])
+def get_events_per_day(max_points: int = None, version: str = "") -> pd.DataFrame:
+    params = {"max_points": max_points} if max_points else None
+    return fetch_dataframe(ANALYTICS_ENDPOINTS["events_per_day"], params)
 
 
 @st.cache_data(show_spinner=False)
-def get_tokens_per_user() -> pd.DataFrame:
+def get_tokens_per_user(version: str = "") -> pd.DataFrame:
     return fetch_dataframe(ANALYTICS_ENDPOINTS["tokens_per_user"])
 
 
 @st.cache_data(show_spinner=False)
-def get_tokens_by_model() -> pd.DataFrame:
+def get_tokens_by_model(version: str = "") -> pd.DataFrame:
     return fetch_dataframe(ANALYTICS_ENDPOINTS["tokens_by_model"])
 
 
 @st.cache_data(show_spinner=False)
-def get_raw_data(start_date: str = None, end_date: str = None, user: str = None, model: str = None) -> pd.DataFrame:
+def get_usage_series(metric: str = "total_tokens", version: str = "") -> pd.DataFrame:
+    return fetch_dataframe(ANALYTICS_ENDPOINTS["usage_series"], {"metric": metric, "max_points": CHART_MAX_POINTS})
+
+
+def _raw_data_filters(start_date: str = None, end_date: str = None, user: str = None, model: str = None) -> dict:
     params = {}
     if start_date:
         params["start_date"] = start_date
@@ -68,21 +169,140 @@ def get_raw_data(start_date: str = None, end_date: str = None, user: str = None,
         params["user"] = user
     if model:
         params["model"] = model
-    
-    return fetch_dataframe(ANALYTICS_ENDPOINTS["raw_data"], params)
+    return params
+
+
+@st.cache_data(show_spinner=False)
+def get_raw_data_page(start_date: str = None, end_date: str = None, user: str = None, model: str = None,
+                      sort_by: str = "date", descending: bool = True, offset: int = 0,
+                      limit: int = 100, version: str = "") -> tuple[pd.DataFrame, int]:
+    """Fetch one sorted page of raw rows and the total number of matching rows."""
+
+    params = _raw_data_filters(start_date, end_date, user, model)
+    params.update({"sort_by": sort_by, "descending": descending, "offset": offset, "limit": limit})
+    url = f"{BACKEND_URL}{ANALYTICS_ENDPOINTS['raw_data']}"
+    try:
+        response = requests.get(url, params=params, timeout=10)
+        response.raise_for_status()
+    except requests.RequestException as exc:  # pragma: no cover - runtime handling
+        st.error(f"Error loading {url}: {exc}")
+        return pd.DataFrame(), 0
+    return pd.DataFrame(response.json()), int(response.headers.get("X-Total-Count", 0))
+
+
+@st.cache_data(show_spinner=False)
+def get_raw_data_summary(start_date: str = None, end_date: str = None, user: str = None, model: str = None,
+                         version: str = "") -> dict:
+    url = f"{BACKEND_URL}{ANALYTICS_ENDPOINTS['raw_data_summary']}"
+    try:
+        response = requests.get(url, params=_raw_data_filters(start_date, end_date, user, model), timeout=10)
+        response.raise_for_status()
+    except requests.RequestException as exc:  # pragma: no cover - runtime handling
+        st.error(f"Error loading {url}: {exc}")
+        return {}
+    return response.json()
+
+
+@st.cache_data(show_spinner=False, max_entries=200)
+def get_raw_data_display(start_date: str = None, end_date: str = None, user: str = None, model: str = None,
+                         sort_by: str = "date", descending: bool = True, offset: int = 0,
+                         limit: int = 100, version: str = "") -> tuple[pd.DataFrame, int]:
+    """Return a raw-data page formatted for display (readable dates, Russian headers) and the total row count.
+
+    Cached on the same key as the page itself, so reruns that keep the page
+    skip the date formatting and renaming.
+    """
+
+    raw_df, total = get_raw_data_page(start_date, end_date, user, model, sort_by, descending, offset, limit, version)
+    display_df = raw_df
+    if "date" in display_df.columns:
+        display_df = display_df.assign(date=pd.to_datetime(display_df["date"]).dt.strftime("%Y-%m-%d %H:%M:%S"))
+    return display_df.rename(columns=RAW_COLUMN_LABELS), total
+
+
+# Figures are built once per dataset version and parameters and shared
+# between sessions; they must not be modified after they are returned.
+@st.cache_resource(show_spinner=False, max_entries=FIGURE_CACHE_ENTRIES)
+def events_figures(version: str = ""):
+    """Return the requests line chart and the cost bar chart (``None`` without cost data) for the events tab."""
+
+    events_df = get_events_per_day(version=version)
+    if events_df.empty:
+        return None, None
+    chart_df = get_events_per_day(CHART_MAX_POINTS, version) if len(events_df) > CHART_MAX_POINTS else events_df
+    line_fig = px.line(chart_df, x="date", y="requests_count", markers=True)
+    line_fig.update_layout(margin=dict(l=0, r=0, t=40, b=0))
+    cost_fig = None
+    if "cost" in events_df.columns:
+        cost_fig = px.bar(events_df, x="date", y="cost", labels={"cost": "Стоимость, $"})
+        cost_fig.update_layout(margin=dict(l=0, r=0, t=40, b=0))
+    return line_fig, cost_fig
+
+
+@st.cache_resource(show_spinner=False, max_entries=FIGURE_CACHE_ENTRIES)
+def usage_series_figures(metric: str, version: str = ""):
+    """Return the moving-average and month-to-date charts for ``metric``, or ``(None, None)`` without data."""
+
+    series_df = get_usage_series(metric, version)
+    if series_df.empty:
+        return None, None
+    ma_fig = px.line(series_df, x="date", y=[metric, "ma_7d", "ma_30d"], labels={"value": metric, "variable": ""})
+    ma_fig.update_layout(margin=dict(l=0, r=0, t=40, b=0))
+    mtd_fig = px.area(series_df, x="date", y="mtd", labels={"mtd": "С начала месяца"})
+    mtd_fig.update_layout(margin=dict(l=0, r=0, t=40, b=0))
+    return ma_fig, mtd_fig
+
+
+@st.cache_resource(show_spinner=False, max_entries=FIGURE_CACHE_ENTRIES)
+def tokens_per_user_figure(metric: str, version: str = ""):
+    tokens_user_df = get_tokens_per_user(version=version)
+    if tokens_user_df.empty or metric not in tokens_user_df.columns:
+        return None
+    bar_fig = px.bar(tokens_user_df, x="user", y=metric, text=metric)
+    bar_fig.update_traces(texttemplate="%{text:.0f}" if metric == "total_tokens" else "$%{text:.2f}", textposition="outside")
+    bar_fig.update_layout(margin=dict(l=0, r=0, t=40, b=0))
+    return bar_fig
+
+
+@st.cache_resource(show_spinner=False, max_entries=FIGURE_CACHE_ENTRIES)
+def tokens_by_model_figure(metric: str, version: str = ""):
+    tokens_model_df = get_tokens_by_model(version=version)
+    if tokens_model_df.empty or metric not in tokens_model_df.columns:
+        return None
+    pie_fig = px.pie(tokens_model_df, names="model", values=metric)
+    pie_fig.update_traces(textinfo="label+percent")
+    pie_fig.update_layout(margin=dict(l=0, r=0, t=40, b=0))
+    return pie_fig
 
 
 st.set_page_config(page_title="Cursor Usage Analytics", layout="wide")
 st.title("Cursor Usage Analytics Dashboard")
 
-# Add a refresh button to clear cache and reload data
+# Manual refresh, for when the update stream cannot reach the dashboard (e.g. behind a buffering proxy)
 if st.button("🔄 Обновить данные", help="Обновить данные из CSV файла"):
-    # Clear all cached data
+    # Clear all cached data and the figures built from it
     st.cache_data.clear()
+    for figures in (events_figures, usage_series_figures, tokens_per_user_figure, tokens_by_model_figure):
+        figures.clear()
     # Force rerun to reload all data
     st.rerun()
 
 
+@st.fragment(run_every=2)
+def watch_dataset_updates() -> None:
+    """Rerun the app once the backend announces a new dataset version; cached queries outside it stay valid."""
+
+    latest = get_update_listener().latest_version
+    if st.session_state.setdefault("dataset_version", latest) != latest:
+        st.session_state["dataset_version"] = latest
+        st.rerun()
+    if latest:
+        st.caption(f"🛰 Данные обновляются автоматически · версия `{latest}`")
+
+
+watch_dataset_updates()
+
+
 raw_data_tab, events_tab, users_tab, models_tab = st.tabs([
     "📊 Сырые данные",
     "📈 Events per day",
@@ -110,10 +330,11 @@ with raw_data_tab:
             help="Выберите дату окончания периода"
         )
     
-    # Get unique users and models for the filters
-    all_raw_data = get_raw_data()  # Get all data to extract unique values
-    unique_users = ["Все пользователи"] + sorted(all_raw_data["user"].unique().tolist()) if not all_raw_data.empty else ["Все пользователи"]
-    unique_models = ["Все модели"] + sorted(all_raw_data["model"].unique().tolist()) if not all_raw_data.empty else ["Все модели"]
+    # Users and models for the filters come from the (small) aggregate reports
+    users_df = get_tokens_per_user(version=data_version())
+    models_df = get_tokens_by_model(version=data_version())
+    unique_users = ["Все пользователи"] + (sorted(users_df["user"].tolist()) if not users_df.empty else [])
+    unique_models = ["Все модели"] + (sorted(models_df["model"].tolist()) if not models_df.empty else [])
     
     with col3:
         selected_user = st.selectbox(
@@ -135,52 +356,51 @@ with raw_data_tab:
     user_filter = selected_user if selected_user != "Все пользователи" else None
     model_filter = selected_model if selected_model != "Все модели" else None
     
-    # Fetch filtered data
-    raw_df = get_raw_data(start_date=start_date_str, end_date=end_date_str, user=user_filter, model=model_filter)
+    # Summary metrics are aggregated by the backend, not from downloaded rows
+    window_version = data_version(start_date_str, end_date_str)
+    summary = get_raw_data_summary(start_date=start_date_str, end_date=end_date_str, user=user_filter, model=model_filter,
+                                   version=window_version)
     
-    if not raw_df.empty:
-        # Display summary metrics
-        col1, col2, col3, col4 = st.columns(4)
+    if summary.get("records"):
+        col1, col2, col3, col4, col5 = st.columns(5)
         
         with col1:
-            st.metric("📝 Всего записей", len(raw_df))
+            st.metric("📝 Всего записей", f"{summary['records']:,}")
         
         with col2:
-            st.metric("👥 Пользователей", raw_df["user"].nunique())
+            st.metric("👥 Пользователей", summary["users"])
         
         with col3:
-            total_tokens = raw_df["total_tokens"].sum()
-            st.metric("🔢 Всего токенов", f"{total_tokens:,}")
+            st.metric("🔢 Всего токенов", f"{summary['total_tokens']:,}")
         
         with col4:
-            total_requests = raw_df["requests"].sum()
-            st.metric("📊 Всего запросов", f"{total_requests:,}")
-        
-        st.divider()
+            st.metric("📊 Всего запросов", f"{summary['requests']:,}")
         
-        # Format the dataframe for better display
-        display_df = raw_df.copy()
+        with col5:
+            st.metric("💵 Стоимость", f"${summary['cost']:,.2f}")
         
-        # Convert date to more readable format
-        if "date" in display_df.columns:
-            display_df["date"] = pd.to_datetime(display_df["date"]).dt.strftime("%Y-%m-%d %H:%M:%S")
+        st.divider()
         
-        # Rename columns to Russian
-        column_mapping = {
-            "date": "Дата",
-            "user": "Пользователь",
-            "kind": "Тип",
-            "model": "Модель",
-            "max_mode": "Макс. режим",
-            "input_with_cache": "Ввод (с кэшем)",
-            "input_without_cache": "Ввод (без кэша)",
-            "cache_read": "Чтение кэша",
-            "output_tokens": "Выходные токены",
-            "total_tokens": "Всего токенов",
-            "requests": "Запросы"
-        }
+        # Page controls; sorting happens on the backend
+        col1, col2, col3, col4 = st.columns([3, 2, 2, 2])
+        with col1:
+            sort_by = st.selectbox("↕️ Сортировка", options=list(RAW_COLUMN_LABELS), format_func=RAW_COLUMN_LABELS.get)
+        with col2:
+            descending = st.radio("Порядок", [True, False], horizontal=True,
+                                  format_func=lambda value: "По убыванию" if value else "По возрастанию")
+        with col3:
+            page_size = st.selectbox("Строк на странице", options=[50, 100, 250, 500], index=1)
+        page_count = max(1, -(-summary["records"] // page_size))
+        with col4:
+            page = st.number_input(f"Страница (из {page_count})", min_value=1, max_value=page_count, value=1)
         
-        display_df = display_df.rename(columns=column_mapping)
+        # Only the visible page is formatted, once per page and dataset version
+        display_df, total = get_raw_data_display(
+            start_date=start_date_str, end_date=end_date_str, user=user_filter, model=model_filter,
+            sort_by=sort_by, descending=descending, offset=(page - 1) * page_size, limit=page_size,
+            version=window_version,
+        )
+        st.caption(f"Строки {(page - 1) * page_size + 1:,}–{(page - 1) * page_size + len(display_df):,} из {total:,}")
         
         # Display the table
         st.dataframe(
@@ -194,6 +414,7 @@ with raw_data_tab:
                 "Всего токенов": st.column_config.NumberColumn("Всего токенов", format="%d"),
                 "Выходные токены": st.column_config.NumberColumn("Выходные токены", format="%d"),
                 "Запросы": st.column_config.NumberColumn("Запросы", format="%d"),
+                "Стоимость, $": st.column_config.NumberColumn("Стоимость, $", format="$%.4f"),
             }
         )
     else:
@@ -201,29 +422,38 @@ with raw_data_tab:
 
 with events_tab:
     st.header("Events per day")
-    events_df = get_events_per_day()
-    if not events_df.empty:
-        line_fig = px.line(events_df, x="date", y="requests_count", markers=True)
-        line_fig.update_layout(margin=dict(l=0, r=0, t=40, b=0))
+    events_df = get_events_per_day(version=data_version())
+    line_fig, cost_fig = events_figures(data_version())
+    if line_fig is not None:
         st.plotly_chart(line_fig, use_container_width=True)
+    if cost_fig is not None:
+        st.plotly_chart(cost_fig, use_container_width=True)
     st.dataframe(events_df, use_container_width=True)
 
+    st.subheader("Скользящие средние")
+    series_metric = st.radio("Показатель", ["total_tokens", "cost"], horizontal=True, key="series_metric",
+                             format_func=METRIC_LABELS.get)
+    ma_fig, mtd_fig = usage_series_figures(series_metric, data_version())
+    if ma_fig is not None:
+        st.plotly_chart(ma_fig, use_container_width=True)
+        st.plotly_chart(mtd_fig, use_container_width=True)
+
 with users_tab:
     st.header("Tokens per user")
-    tokens_user_df = get_tokens_per_user()
-    if not tokens_user_df.empty:
-        bar_fig = px.bar(tokens_user_df, x="user", y="total_tokens", text="total_tokens")
-        bar_fig.update_traces(texttemplate="%{text:.0f}", textposition="outside")
-        bar_fig.update_layout(margin=dict(l=0, r=0, t=40, b=0))
+    tokens_user_df = get_tokens_per_user(version=data_version())
+    user_metric = st.radio("Показатель", ["total_tokens", "cost"], horizontal=True, key="user_metric",
+                           format_func=METRIC_LABELS.get)
+    bar_fig = tokens_per_user_figure(user_metric, data_version())
+    if bar_fig is not None:
         st.plotly_chart(bar_fig, use_container_width=True)
     st.dataframe(tokens_user_df, use_container_width=True)
 
 with models_tab:
     st.header("Tokens by model")
-    tokens_model_df = get_tokens_by_model()
-    if not tokens_model_df.empty:
-        pie_fig = px.pie(tokens_model_df, names="model", values="total_tokens")
-        pie_fig.update_traces(textinfo="label+percent")
-        pie_fig.update_layout(margin=dict(l=0, r=0, t=40, b=0))
+    tokens_model_df = get_tokens_by_model(version=data_version())
+    model_metric = st.radio("Показатель", ["total_tokens", "cost"], horizontal=True, key="model_metric",
+                            format_func=METRIC_LABELS.get)
+    pie_fig = tokens_by_model_figure(model_metric, data_version())
+    if pie_fig is not None:
         st.plotly_chart(pie_fig, use_container_width=True)
     st.dataframe(tokens_model_df, use_container_width=True)